@@ -0,0 +1,73 @@
+"""Benchmark: on-disk artifact cache (``func/artifact_cache.py``).
+
+Builds the files of a synthetic study without cache, then with an empty
+cache (build + store) and again with the filled cache (fresh ``ArtifactCache``
+object, as after a restart or in another worker process). Finally several
+processes build the same plates at once into a cache smaller than the study,
+so entries are written, read and evicted concurrently; every process must get
+the files of the uncached build.
+
+Run from the project root:
+    python bench/bench_artifact_cache.py [n_plates] [processes]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ms_planner  # noqa: E402
+from bench_study import make_manifest  # noqa: E402
+from func.artifact_cache import ArtifactCache  # noqa: E402
+
+SETTINGS = ms_planner.merge_settings(
+    ms_planner.DEFAULT_SETTINGS, {"xcalibur": {"date_injection": "20260101", "seed": 1, "qc_every": 24}}
+)
+
+
+def run(n_plates, cache):
+    start = time.perf_counter()
+    result = ms_planner.plan_study(io.StringIO(make_manifest(n_plates)), SETTINGS, max_workers=1, combined=False, cache=cache)
+    return time.perf_counter() - start, [plate["files"] for plate in result["plates"]]
+
+
+def _worker(args):
+    n_plates, directory, max_bytes = args
+    return run(n_plates, ArtifactCache(directory, max_bytes))[1]
+
+
+def main(n_plates=24, processes=4):
+    legacy, files = run(n_plates, None)
+    with tempfile.TemporaryDirectory() as directory:
+        cold, cold_files = run(n_plates, ArtifactCache(directory))
+        warm_cache = ArtifactCache(directory)
+        warm, warm_files = run(n_plates, warm_cache)
+        stats = warm_cache.stats()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Room for about half of the plates: concurrent writes, hits and evictions
+        max_bytes = stats["bytes"] // 2
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_worker, [(n_plates, directory, max_bytes)] * processes))
+        shared = time.perf_counter() - start
+        shared_stats = ArtifactCache(directory, max_bytes).stats()
+
+    print(f"{n_plates} plates, {stats['entries']} entries, {stats['bytes'] / 2**20:.1f} MiB on disk")
+    print(f"  no cache   : {legacy:7.2f} s")
+    print(f"  cold cache : {cold:7.2f} s (identical: {cold_files == files})")
+    print(f"  warm cache : {warm:7.2f} s ({legacy / warm:5.1f}x, identical: {warm_files == files})")
+    print(
+        f"  {processes} processes, cache of {max_bytes / 2**20:.1f} MiB: {shared:.2f} s, "
+        f"{shared_stats['entries']} entries left, identical: {all(result == files for result in results)}"
+    )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 24,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+    )
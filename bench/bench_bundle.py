@@ -0,0 +1,68 @@
+"""Benchmark: ZIP bundle of a large study.
+
+Compares the streamed bundle (``ms_planner.write_study_bundle``: plates built
+concurrently, written to the archive as they finish) with building every file
+first and zipping the result in memory (kept below as ``legacy_bundle``).
+Reports the wall time and the peak of traced Python memory (plates in this
+process, so tracemalloc sees all of them).
+
+Run from the project root:
+    python bench/bench_bundle.py [n_plates]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ms_planner  # noqa: E402
+from bench_study import make_manifest  # noqa: E402
+
+SETTINGS = ms_planner.merge_settings(ms_planner.DEFAULT_SETTINGS, {"xcalibur": {"date_injection": "20260101", "seed": 1}})
+
+
+def legacy_bundle(path, manifest):
+    """Every artifact in memory, then one archive in memory, then to disk."""
+    result = ms_planner.plan_study(io.StringIO(manifest), SETTINGS, max_workers=1)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for plate in result["plates"]:
+            for name, data in plate["files"].items():
+                archive.writestr(name, data)
+        for name, data in result["study"].items():
+            archive.writestr(name, data)
+    with open(path, "wb") as handle:
+        handle.write(buffer.getvalue())
+
+
+def streamed_bundle(path, manifest):
+    ms_planner.write_study_bundle(path, io.StringIO(manifest), SETTINGS, max_workers=1)
+
+
+def measure(function, manifest):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bundle.zip")
+        tracemalloc.start()
+        start = time.perf_counter()
+        function(path, manifest)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with zipfile.ZipFile(path) as archive:
+            n_files = len(archive.namelist())
+        return elapsed, peak / 2**20, n_files, os.path.getsize(path) / 2**20
+
+
+def main(n_plates=100):
+    manifest = make_manifest(n_plates)
+    for name, function in [("legacy", legacy_bundle), ("streamed", streamed_bundle)]:
+        elapsed, peak_mb, n_files, size_mb = measure(function, manifest)
+        print(f"{name:>9}: {elapsed:6.2f} s, peak {peak_mb:7.1f} MiB, {n_files} files, {size_mb:.1f} MiB archive")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,68 @@
+"""Benchmark: Chronos XML export.
+
+Compares ``iter_xml_chunks`` (pretty-printed XML written from the column
+arrays) against the previous export (``iterrows`` into an ElementTree, then
+``minidom`` pretty-printing, kept below as ``legacy_xml``) for Chronos queues of
+growing length, and checks that both produce the same document.
+
+Run from the project root:
+    python bench/bench_chronos_xml.py
+"""
+import os
+import sys
+import timeit
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from func.export_utils import iter_xml_chunks, sanitize_xml_columns  # noqa: E402
+
+
+def legacy_xml(df):
+    root = ET.Element("data")
+    for _, row in df.iterrows():
+        row_elem = ET.SubElement(root, "row")
+        for col_name, value in row.items():
+            col_elem = ET.SubElement(row_elem, col_name)
+            col_elem.text = str(value)
+    return minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
+
+
+def chronos_table(n_rows):
+    """Chronos-shaped table with ``n_rows`` injections over six EvoSlots."""
+    vial = np.arange(n_rows) % 96 + 1
+    table = pd.DataFrame(
+        {
+            "Analysis Method": "C:\\data\\Evosep\\method.cam",
+            "Source Tray": pd.Series(np.arange(n_rows) // 96 % 6 + 1).map("EvoSlot {}".format),
+            "Source Vial": vial,
+            "Sample Name": [f"DIA_20250101_Proj_P{i // 96:03d}_{i}" for i in range(n_rows)],
+            "Xcalibur Method": "C:\\Xcalibur\\methods.meth",
+            "Xcalibur Filename": [f"DIA_20250101_Proj_P{i // 96:03d}_{i}" for i in range(n_rows)],
+            "Xcalibur Post Acquisition Program": "",
+            "Xcalibur Output Dir": "C:\\data\\yourdir",
+            "Comment": "Lot & batch <1>",
+            "Pump preparation": "",
+            "Align solvents": "",
+            "Flow to column / idle flow": "",
+        }
+    )
+    table.columns = sanitize_xml_columns(table.columns)
+    return table
+
+
+def main(repeat=3):
+    for n_rows in (96, 960, 9600):
+        table = chronos_table(n_rows)
+        assert b"".join(iter_xml_chunks(table)).decode("utf-8") == legacy_xml(table)
+        legacy = min(timeit.repeat(lambda: legacy_xml(table), number=1, repeat=repeat))
+        new = min(timeit.repeat(lambda: b"".join(iter_xml_chunks(table)), number=1, repeat=repeat))
+        print(f"{n_rows:>6} rows: legacy {legacy * 1000:9.1f} ms, streaming {new * 1000:7.1f} ms ({legacy / new:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark: ontology prefix search (``func/ontology_index.py``) against a scan.
+
+The scan is what a search box over the TSV does without an index: parse the
+terms and test every name and synonym for the prefix, on every rerun. The
+index is loaded (memory-mapped) once, then each search is a binary search.
+Both must find the same terms.
+
+Run from the project root:
+    python bench/bench_ontology.py [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from func.ontology_index import OntologyIndex, build_index, normalize, read_terms  # noqa: E402
+
+QUERIES = ["hum", "liv", "covid", "hepato", "trypsin", "ms:100", "q exactive", "carcinoma", "t cell", "female"]
+
+
+def _word_suffixes(name):
+    words = name.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def legacy_search(prefix):
+    query = normalize(prefix)
+    return [
+        term
+        for term in read_terms()
+        if any(normalize(text).startswith(query) for text in (term.name, term.accession, *term.synonyms))
+        or any(name.startswith(query) for name in _word_suffixes(normalize(term.name)))
+    ]
+
+
+def main(repeats=200):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "terms.idx")
+        start = time.perf_counter()
+        build_index(read_terms(), path)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        index = OntologyIndex(path)
+        loaded = time.perf_counter() - start
+        print(f"{len(index)} terms, {index.n_keys} keys: build {built * 1e3:.1f} ms, load {loaded * 1e3:.2f} ms")
+
+        for query in QUERIES:
+            same = {term.accession for term in index.search(query, limit=len(index))} == {
+                term.accession for term in legacy_search(query)
+            }
+            start = time.perf_counter()
+            for _ in range(repeats):
+                legacy_search(query)
+            legacy = (time.perf_counter() - start) / repeats
+            start = time.perf_counter()
+            for _ in range(repeats):
+                index.search(query, limit=15)
+            indexed = (time.perf_counter() - start) / repeats
+            print(f"  {query!r:<13} scan {legacy * 1e6:8.0f} us  index {indexed * 1e6:6.0f} us ({legacy / indexed:5.0f}x)  same terms: {same}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,45 @@
+"""Benchmark: headless per-plate generation with ``ms_planner``.
+
+Generates all single-plate artifacts (Xcalibur, Chronos CSV/XML, SDRF,
+Skyline) of a synthetic study, once plate by plate in this process and once
+in the process pool, and reports plates per second.
+
+Run from the project root:
+    python bench/bench_planner.py [n_plates] [workers]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ms_planner  # noqa: E402
+from bench_study import make_manifest  # noqa: E402
+
+SETTINGS = ms_planner.merge_settings(
+    ms_planner.DEFAULT_SETTINGS, {"xcalibur": {"date_injection": "20260101", "seed": 1, "qc_every": 24}}
+)
+
+
+def run(n_plates, workers):
+    start = time.perf_counter()
+    result = ms_planner.plan_study(io.StringIO(make_manifest(n_plates)), SETTINGS, max_workers=workers, combined=False)
+    elapsed = time.perf_counter() - start
+    return elapsed, result
+
+
+def main(n_plates=48, workers=None):
+    serial, serial_result = run(n_plates, 1)
+    pooled, pooled_result = run(n_plates, workers)
+    same = [plate["files"] for plate in serial_result["plates"]] == [plate["files"] for plate in pooled_result["plates"]]
+    print(f"{n_plates} plates, {os.cpu_count()} CPUs, identical output: {same}")
+    print(f"  in process: {serial:7.2f} s ({n_plates / serial:6.1f} plates/s)")
+    print(f"  pool      : {pooled:7.2f} s ({n_plates / pooled:6.1f} plates/s)")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 48,
+        int(sys.argv[2]) if len(sys.argv) > 2 else None,
+    )
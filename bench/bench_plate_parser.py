@@ -0,0 +1,212 @@
+"""Micro-benchmark: plate annotation parsing.
+
+Compares ``process_plate_positions`` against the previous line-by-line
+implementation (kept below as ``legacy_process_plate_positions``) on large
+annotation texts, after checking that both give the same plate for texts
+where Row/Col lines and single wells claim the same wells.
+
+Run from the project root:
+    python bench/bench_plate_parser.py [n_lines]
+"""
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from func.plate_layout import process_plate_positions  # noqa: E402
+
+# Only the parsing cost is measured
+st.warning = lambda *args, **kwargs: None
+
+EXAMPLE_TEXT = "Pool;A7,A8,A12\nControl;G12\nControl;H12\nCohort_2;C8\nEMPTY;A1\nCohort_2;RowD\nCohort_2;RowE\nCohort_2;Col9\nCohort_2;Col8"
+
+
+def legacy_process_plate_positions(text_input, sample_name):
+    """
+    Process plate positions from text input and create a plate DataFrame.
+    
+    Args:
+        text_input (str): Text area input with position specifications
+        sample_name (str): Default sample name to fill the plate
+    
+    Returns:
+        tuple: (plate_df, replace_pos) - DataFrame and processed position list
+    """
+
+    # Split text and clean empty lines
+    replace_pos = text_input.split('\n')
+    
+    # Remove empty lines
+    replace_pos = [item for item in replace_pos if item.strip() != '']
+
+    # Write warning message if replace_pos does not have ; as one special character
+    # Allow comma-separated positions (e.g. Sample1;A1,A3,A5), so do not treat ',' as invalid.
+    for item in replace_pos:
+        if (
+            ';' not in item
+            or item.count(';') != 1
+            or any(
+                char in item
+                for char in [
+                    '?',
+                    '!',
+                    '@',
+                    '#',
+                    '$',
+                    '%',
+                    '^',
+                    '&',
+                    '*',
+                    '(',
+                    ')',
+                    '+',
+                    '=',
+                    '{',
+                    '}',
+                    '[',
+                    ']',
+                    '|',
+                    '\\',
+                    ':',
+                    '"',
+                    "'",
+                    '<',
+                    '>',
+                    '.',
+                    '/',
+                    '~',
+                    '`',
+                ]
+            )
+        ):
+            st.warning(f"Invalid format: {item}. It should be like 'Cohort_2;Col8'.")
+            break
+    
+    # Filter row in text that contain 'Col' or 'Row' in replace_pos
+    colrow_label = [item for item in replace_pos if ('Col' in item or 'Row' in item)]
+    
+    # Remove row with 'Col' or 'Row in replace_pos
+    replace_pos = [item for item in replace_pos if not ('Col' in item or 'Row' in item)]
+    
+    ## Work with Col and Row
+    # Check Col and Row then append to replace pos each well
+    for item in colrow_label:
+        if ';' in item:
+            text, pos = item.split(';')
+            # Check if pos is Row and followed by A-H or Col and followed by 1-12
+            if pos.startswith('Row') and len(pos) == 4 and pos[-1] in 'ABCDEFGH':
+                for number in range(1,13):
+                    # Change replace_pos by prepend text + ';' + pos[-1] + str(number) before replace_pos
+                    replace_pos.insert(0, text + ';' + pos[-1] + str(number))
+            elif pos.startswith('Col') and 4 <=len(pos) <= 5 and pos[3:].isdigit() and 1 <= int(pos[3:]) <= 12:
+                for letter in 'ABCDEFGH':
+                    replace_pos.insert(0, text + ';' + letter + pos[3:])
+            else:
+                st.warning(f"Invalid position format: {item}. It should be like 'Cohort_2;RowA' or 'Cohort_2;Col8'.")
+        else:
+            st.warning(f"Invalid format: {item}. It should be like 'Cohort_2;Col8'.")
+
+    # Expand entries with multiple comma-separated positions, e.g. "Sample1;A1,A3,A5"
+    expanded_replace_pos = []
+    for item in replace_pos:
+        if ';' in item:
+            text, pos = item.split(';')
+            # Split by comma to allow multiple positions
+            pos_parts = [p.strip() for p in pos.split(',') if p.strip() != '']
+            if len(pos_parts) > 1:
+                # Validate each individual position (e.g. A1, B12)
+                for p in pos_parts:
+                    if (
+                        len(p) >= 2
+                        and p[0] in 'ABCDEFGH'
+                        and p[1:].isdigit()
+                        and 1 <= int(p[1:]) <= 12
+                    ):
+                        expanded_replace_pos.append(f"{text};{p}")
+                    else:
+                        st.warning(
+                            f"Invalid position format: {text};{p}. It should be like 'Sample1;A1'."
+                        )
+            else:
+                expanded_replace_pos.append(item)
+        else:
+            expanded_replace_pos.append(item)
+
+    replace_pos = expanded_replace_pos
+
+    # Write a warning message if the position is mentioned more than one time in text area
+    if len(replace_pos) != len(set(replace_pos)):
+        st.warning("Some positions are mentioned more than once. Please check your input.")
+
+    # Check if the position is mentioned more than one time
+    pos_list = []
+    for item in list(set(replace_pos)):
+        if ';' in item:
+            text, pos = item.split(';')
+            pos_list.append(pos)
+    if len(pos_list) != len(set(pos_list)):
+        st.warning("Position is mentioned more than one time with different labels. Possibly, using Row or Col. Please check your input.")
+
+    # Ensure the dataframe has 12 columns and 8 rows
+    data = np.resize(sample_name, (8, 12))
+    plate_df = pd.DataFrame(data, columns=[str(i) for i in range(1, 13)], index=list('ABCDEFGH'))
+    
+    # Replace text in the dataframe based on replace_pos
+    for item in replace_pos:
+        if ';' in item:
+            text, pos = item.split(';')
+            row = pos[0]
+            col = int(pos[1:]) - 1
+            plate_df.at[row, str(col + 1)] = text
+    
+    return plate_df, replace_pos
+
+def make_annotation_text(n_lines, seed=0, block_share=0.10):
+    rng = random.Random(seed)
+    labels = [f"Cohort_{i}" for i in range(20)] + ["Pool", "Control", "EMPTY"]
+    lines = []
+    for _ in range(n_lines):
+        label = rng.choice(labels)
+        kind = rng.random()
+        if kind < block_share / 2:
+            lines.append(f"{label};Row{rng.choice('ABCDEFGH')}")
+        elif kind < block_share:
+            lines.append(f"{label};Col{rng.randint(1, 12)}")
+        elif kind < 0.30:
+            wells = [f"{rng.choice('ABCDEFGH')}{rng.randint(1, 12)}" for _ in range(3)]
+            lines.append(f"{label};{','.join(wells)}")
+        else:
+            lines.append(f"{label};{rng.choice('ABCDEFGH')}{rng.randint(1, 12)}")
+    return "\n".join(lines)
+
+
+def check_conflicts(n_texts=200, n_lines=12):
+    """Count the texts where the new parser fills the plate unlike the legacy one."""
+    texts = [EXAMPLE_TEXT, "Pool;A7,A8\nEMPTY;RowH\nX;Col1"]
+    texts += [make_annotation_text(n_lines, seed, block_share=0.6) for seed in range(n_texts)]
+    differing = 0
+    for text in texts:
+        legacy_df, _ = legacy_process_plate_positions(text, "Cohort_1")
+        new_df, _ = process_plate_positions(text, "Cohort_1")
+        differing += not legacy_df.equals(new_df)
+    return len(texts), differing
+
+
+def main(n_lines=10_000, repeat=5):
+    n_texts, differing = check_conflicts()
+    print(f"conflicting Row/Col layouts: {n_texts - differing} of {n_texts} identical to legacy")
+
+    text = make_annotation_text(n_lines)
+    for name, func in [("legacy", legacy_process_plate_positions), ("grammar", process_plate_positions)]:
+        timings = timeit.repeat(lambda: func(text, "Cohort_1"), number=1, repeat=repeat)
+        print(f"{name:>8}: {n_lines} lines, best {min(timings) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
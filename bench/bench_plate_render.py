@@ -0,0 +1,67 @@
+"""Benchmark: plate map rendering.
+
+Compares ``render_plate_figures`` (one EllipseCollection) against the previous
+renderer (seaborn heatmap plus one Circle and one Text per well, kept below as
+``legacy_render``) for 96-, 384- and 1536-well plates.
+
+Run from the project root:
+    python bench/bench_plate_render.py
+"""
+import io
+import os
+import sys
+import timeit
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from func.plate_geometry import PLATE_96, PLATE_384, PLATE_1536  # noqa: E402
+from func.plate_layout import create_plate_df_long, process_plate_positions  # noqa: E402
+from func.plate_plot import render_plate_figures  # noqa: E402
+
+LAYOUT = "Pool;A1:B4\nEMPTY;Col3\nQC;RowC\nControl;Col10-12/2"
+
+
+def legacy_render(plate_df, plate_id):
+    plate_df_long = create_plate_df_long(plate_df)
+    unique_labels = sorted(plate_df_long['Sample'].unique())
+    custom_palette = dict(zip(unique_labels, sns.color_palette("colorblind", len(unique_labels))))
+
+    scale = (plate_df.shape[1] / 12) ** 0.5
+    fig, ax = plt.subplots(figsize=(6.4 * scale, 4.8 * scale))
+    sns.heatmap(plate_df.isnull(), cbar=False, cmap="coolwarm", ax=ax, linewidths=1, linecolor='darkgrey', alpha=0.1)
+    ax.xaxis.tick_top()
+    ax.set_title(plate_id)
+    for i in range(plate_df.shape[0]):
+        for j in range(plate_df.shape[1]):
+            value = plate_df.iloc[i, j]
+            color = custom_palette.get(value, (1, 1, 1))
+            ax.add_patch(plt.Circle((j + 0.5, i + 0.5), 0.4, color=color, fill=True))
+            ax.text(j + 0.5, i + 0.5, f'{value}', ha='center', va='center', color='white', fontsize=4 / scale)
+    ax.set_yticklabels(plate_df.index, rotation=0)
+    n_artists = len(ax.get_children())
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=200, bbox_inches="tight")
+    plt.close(fig)
+    return n_artists
+
+
+def main(repeat=3):
+    for geometry in (PLATE_96, PLATE_384, PLATE_1536):
+        plate_df, _ = process_plate_positions(LAYOUT, "Cohort_1", geometry)
+        legacy = min(timeit.repeat(lambda: legacy_render(plate_df, "P1"), number=1, repeat=repeat))
+        new = min(timeit.repeat(lambda: render_plate_figures(plate_df, "P1"), number=1, repeat=repeat))
+        print(
+            f"{geometry.name:>10}: legacy {legacy * 1000:8.1f} ms ({legacy_render(plate_df, 'P1')} artists), "
+            f"collection {new * 1000:8.1f} ms (incl. count plot)"
+        )
+
+
+if __name__ == "__main__":
+    main()
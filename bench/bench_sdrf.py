@@ -0,0 +1,130 @@
+"""Benchmark: SDRF of many runs.
+
+Compares three ways to write the SDRF TSV of a synthetic study:
+
+- legacy: every column of the frame built as a pandas column, the frames
+  concatenated and the duplicate headers restored with ``str.replace`` over
+  the whole text (kept below as ``legacy_sdrf_tsv``)
+- frame: ``build_sdrf`` + ``sdrf_to_tsv``, the frame of the SDRF tab editor
+  built from the template (``func/sdrf_template.py``)
+- template: ``render_sdrf_tsv``, only the per-row columns materialized (study
+  mode)
+
+Reports the time and the peak of traced memory (Python + Arrow) of each, and
+checks that the three texts are identical.
+
+Run from the project root:
+    python bench/bench_sdrf.py [n_plates]
+"""
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_study import MS_INFO, SAMPLE_INFO, make_manifest  # noqa: E402
+from func.injection_table import build_injection_table  # noqa: E402
+from func.sdrf import build_sdrf, sdrf_to_tsv  # noqa: E402
+from func.sdrf_template import NOT_AVAILABLE_CHARACTERISTICS, render_sdrf_tsv, sdrf_template  # noqa: E402
+from func.study import Study  # noqa: E402
+
+MS_INFO_2_ENZYMES = dict(MS_INFO, enz_accession_list=["AC=MS:1001251;NT=Trypsin", "AC=MS:1001309;NT=Lys-C"])
+
+
+def legacy_sdrf_tsv(sample_df, file_names, ms_info, sample_info, ms_file, collision_energy):
+    """The SDRF built column by column in pandas, as before the template."""
+    sample_prop = sample_df.copy()
+    sample_prop["organism"] = sample_info["organism_species"]
+    sample_prop["organism part"] = "blood plasma"
+    sample_prop["project"] = sample_info["proj_name"]
+    for column in NOT_AVAILABLE_CHARACTERISTICS:
+        sample_prop[column] = "not available"
+    sample_prop["biological replicate"] = "1"
+    sample_prop.columns = "characteristics[" + sample_prop.columns + "]"
+    sample_prop.insert(0, "source name", file_names)
+    sample_prop["Material type"] = "AC=EFO:0009656;NT=plasma"
+    sample_prop["assay name"] = ["run " + str(i) for i in range(1, sample_prop.shape[0] + 1)]
+    sample_prop["technology type"] = "proteomic profiling by mass spectrometry"
+
+    data_file_prop = pd.DataFrame(
+        {
+            "data file": file_names + "." + ms_file,
+            "file uri": file_names + "." + ms_file,
+            "proteomics data acquisition method": ms_info["sdrf_acquisition"],
+            "label": "AC=MS:1002038;NT=label free sample",
+            "fraction identifier": "1",
+            "fractionation method": "NT=High-performance liquid chromatography;AC=PRIDE:0000565",
+            "technical replicate": "1",
+        }
+    )
+    for i, enz_accession in enumerate(ms_info["enz_accession_list"]):
+        data_file_prop["cleavage agent details" + str(i)] = enz_accession
+    data_file_prop["ms2 mass analyzer"] = "not available"
+    data_file_prop["instrument"] = ms_info["sdrf_ms"]
+    data_file_prop["modification parameters"] = "NT=Carbamidomethyl;AC=UNIMOD:4;TA=C;MT=Fixed"
+    data_file_prop["dissociation method"] = ms_info["dissociation_accession"]
+    data_file_prop["collision energy"] = collision_energy + " NCE"
+    data_file_prop["precursor mass tolerance"] = "40 ppm"
+    data_file_prop["fragment mass tolerance"] = "0.05 Da"
+    data_file_prop["MS1 scan range"] = "400-1250 m/z"
+    data_file_prop["MS2 scan range"] = "100-2000 m/z"
+    data_file_prop.columns = "comment[" + data_file_prop.columns + "]"
+    sdrf_df = pd.concat([sample_prop, data_file_prop], axis=1)
+
+    sdrf_tsv = "\ufeff" + sdrf_df.to_csv(sep="\t", index=False)
+    for i in range(len(ms_info["enz_accession_list"])):
+        sdrf_tsv = sdrf_tsv.replace(f"comment[cleavage agent details{i}]", "comment[cleavage agent details]")
+    return sdrf_tsv
+
+
+def frame_sdrf_tsv(sample_df, file_names, ms_info, sample_info, ms_file, collision_energy):
+    sdrf_df, _ = build_sdrf(sample_df, file_names, ms_info, sample_info, ms_file, collision_energy)
+    return sdrf_to_tsv(sdrf_df)
+
+
+def template_sdrf_tsv(sample_df, file_names, ms_info, sample_info, ms_file, collision_energy):
+    template, _ = sdrf_template(sample_df.columns, ms_info, sample_info, ms_file, collision_energy)
+    return render_sdrf_tsv(template, sample_df, file_names)
+
+
+def measure(build, *args):
+    """(text, seconds, peak bytes of Python and Arrow allocations)."""
+    gc.collect()
+    arrow_start = pa.total_allocated_bytes()
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = build(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return text, seconds, peak + max(pa.total_allocated_bytes() - arrow_start, 0)
+
+
+def main(n_plates=200):
+    study = Study.from_manifest(io.StringIO(make_manifest(n_plates)))
+    plate_long, _ = study.plate_long()
+    order_df = build_injection_table(plate_long, MS_INFO, "SCAPIS", "20260101", "R", "0.1", "method", "C:\\data")
+    args = (order_df, order_df["File Name"], MS_INFO_2_ENZYMES, SAMPLE_INFO, "raw", "27")
+
+    results = {}
+    for name, build in (("legacy", legacy_sdrf_tsv), ("frame", frame_sdrf_tsv), ("template", template_sdrf_tsv)):
+        # Best of three for the time, the memory of the last run
+        runs = [measure(build, *args) for _ in range(3)]
+        results[name] = (runs[-1][0], min(run[1] for run in runs), runs[-1][2])
+
+    text = results["legacy"][0]
+    identical = all(result[0] == text for result in results.values())
+    print(f"{n_plates} plates, {order_df.shape[0]} runs, {len(text) / 2**20:.1f} MiB of TSV, identical: {identical}")
+    legacy_seconds = results["legacy"][1]
+    for name, (_, seconds, peak) in results.items():
+        print(f"  {name:<9}: {seconds:6.3f} s ({legacy_seconds / seconds:4.1f}x)  peak {peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,113 @@
+"""Benchmark: SDRF reader (``func/sdrf_reader.py``) against ``pd.read_csv``.
+
+The three example SDRFs are scaled up to ``n_rows`` rows (data rows repeated,
+source names made unique) and read for the Skyline tab, i.e. the
+characteristics only, three ways:
+
+- read_csv: every column parsed, duplicate headers renamed, then the
+  characteristics selected (the tab before)
+- read_sdrf: only the characteristics columns parsed, in one frame
+- iter_sdrf: the same in chunks of 10000 rows, each chunk dropped once used
+
+Each read runs in a fresh process and reports its time and peak resident
+memory above the process baseline. The characteristics must be the same.
+
+Run from the project root:
+    python bench/bench_sdrf_reader.py [n_rows]
+"""
+import json
+import os
+import subprocess
+import resource
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from func.sdrf_reader import iter_sdrf, read_sdrf  # noqa: E402
+
+EXAMPLES = ["PXD020109", "PXD023938", "cell_metadata_scbc25"]
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example_sdrf")
+
+
+def scale_sdrf(path, target, n_rows):
+    with open(path, encoding="utf-8") as handle:
+        header, *rows = handle.read().splitlines()
+    with open(target, "w", encoding="utf-8") as handle:
+        handle.write(header + "\n")
+        for i in range(n_rows):
+            row = rows[i % len(rows)]
+            # Unique source names, the rest repeated
+            name, rest = row.split("\t", 1)
+            handle.write(f"{name}-{i}\t{rest}\n")
+
+
+def legacy_read(path):
+    sdrf_df = pd.read_csv(path, sep="\t", dtype=str)
+    return sdrf_df[[column for column in sdrf_df.columns if column.startswith("characteristics[")]]
+
+
+def reader_read(path):
+    return read_sdrf(path, families=["characteristics"])
+
+
+def chunked_read(path):
+    n_rows = 0
+    for chunk in iter_sdrf(path, families=["characteristics"], chunk_rows=10_000):
+        n_rows += chunk.shape[0]
+    return n_rows
+
+
+def _peak_kib():
+    # VmHWM is the peak of this process; ru_maxrss also counts the parent
+    # before exec, i.e. the reads of the previous examples
+    try:
+        with open("/proc/self/status") as handle:
+            return next(int(line.split()[1]) for line in handle if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+READS = {"read_csv": legacy_read, "read_sdrf": reader_read, "iter_sdrf": chunked_read}
+
+
+def _measure(name, path):
+    """Print the time and peak resident memory above the baseline of this process."""
+    baseline = _peak_kib()
+    start = time.perf_counter()
+    READS[name](path)
+    seconds = time.perf_counter() - start
+    print(json.dumps([seconds, (_peak_kib() - baseline) * 1024]))
+
+
+def measure(name, path):
+    # A fresh process per read: the peak resident memory is the read's own
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", name, path], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main(n_rows=100_000):
+    with tempfile.TemporaryDirectory() as directory:
+        for example in EXAMPLES:
+            path = os.path.join(directory, example + ".sdrf.tsv")
+            scale_sdrf(os.path.join(EXAMPLE_DIR, example + ".sdrf.tsv"), path, n_rows)
+            results = {name: measure(name, path) for name in READS}
+
+            legacy, fields = legacy_read(path).fillna(""), reader_read(path)
+            identical = legacy.columns.equals(fields.columns) and (legacy.to_numpy() == fields.to_numpy()).all()
+            size = os.path.getsize(path) / 2**20
+            print(f"{example}: {n_rows} rows, {size:.1f} MiB, same characteristics: {identical and chunked_read(path) == n_rows}")
+            for name, (seconds, peak) in results.items():
+                print(f"  {name:<10}: {seconds:6.3f} s ({results['read_csv'][0] / seconds:4.1f}x)  peak +{peak / 2**20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        _measure(*sys.argv[2:4])
+        sys.exit()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,128 @@
+"""Memory report: the tables a session keeps, as DataFrames and in compact form.
+
+For every plate of a synthetic 20-plate study, builds what the app keeps in
+``st.session_state`` for one plate: the outputs of the pipeline steps (plate
+grid, injection tables, Chronos table and CSV/XML, SDRF and its TSV, Skyline
+annotations) and ``plate_df_long``. The retained memory of the 20 states is
+measured once as DataFrames (as stored before) and once in compact form
+(``func/compact_frame.py``), per table and in total. Strings of pandas'
+default string dtype live in Arrow buffers, so the report adds the Arrow
+allocations to the traced Python memory. Memory shared by two tables (e.g.
+the SDRF and its Skyline columns) is counted for the one listed last.
+
+Run from the project root:
+    python bench/bench_session_memory.py [n_plates] [plate_format]
+"""
+import gc
+import io
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ms_planner  # noqa: E402
+from bench_study import make_manifest  # noqa: E402
+from func.chronos import build_chronos_table, export_chronos_table  # noqa: E402
+from func.compact_frame import compact, expand  # noqa: E402
+from func.plate_layout import create_plate_df_long, process_plate_positions  # noqa: E402
+from func.sdrf import add_factor_value, build_sdrf, sdrf_to_tsv, skyline_annotations  # noqa: E402
+from func.settings import build_ms_info, build_sample_info  # noqa: E402
+from func.study import Study  # noqa: E402
+from func.xcalibur import build_sample_order  # noqa: E402
+
+
+TABLES = ("plate_df_long", "plate", "order", "chronos", "chronos_export", "sdrf", "sdrf_export", "skyline")
+
+
+def session_state(plate_id, sample_name, annotation, settings, seed):
+    """Step outputs of the tabs for one plate, as stored by ``run_step``."""
+    geometry = ms_planner.plate_geometry(settings)
+    ms_info = build_ms_info(**settings["ms"])
+    sample_info = build_sample_info(plate_id=plate_id, sample_name=sample_name, **settings["sample"])
+    plate = process_plate_positions(annotation, sample_name, geometry)
+    plate_df_long = create_plate_df_long(plate[0])
+    order = build_sample_order(
+        plate_df_long, geometry, ms_info, sample_info, seed=seed, **ms_planner._xcalibur_inputs(settings, ms_info)
+    )
+    chronos = build_chronos_table(order, **ms_planner._chronos_inputs(settings, ms_info))
+    sdrf = build_sdrf(order["plate_df_long"], order["output_order_df"]["File Name"], ms_info, sample_info, "raw", "27")
+    sdrf_df = add_factor_value(sdrf[0], "Sample")
+    return {
+        "plate_df_long": plate_df_long,
+        "plate": plate,
+        "order": order,
+        "chronos": chronos,
+        "chronos_export": export_chronos_table(chronos),
+        "sdrf": (sdrf_df, sdrf[1]),
+        "sdrf_export": sdrf_to_tsv(sdrf_df),
+        "skyline": skyline_annotations(sdrf_df),
+    }
+
+
+def _allocated():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] + pa.total_allocated_bytes()
+
+
+def retained(build):
+    """(value, bytes still allocated once ``build()`` returned)."""
+    start = _allocated()
+    value = build()
+    return value, _allocated() - start
+
+
+def main(n_plates=20, plate_format="96-well"):
+    settings = ms_planner.merge_settings(
+        ms_planner.DEFAULT_SETTINGS,
+        {"sample": {"plate_format": plate_format}, "xcalibur": {"date_injection": "20260101", "seed": 1}},
+    )
+    study = Study.from_manifest(io.StringIO(make_manifest(n_plates)), ms_planner.plate_geometry(settings))
+    _, tasks = ms_planner.plate_tasks(study, settings)
+
+    tracemalloc.start()
+    states = {}
+    totals = {}
+    for form, convert in (("DataFrames", lambda value: value), ("compact", compact)):
+        states[form], totals[form] = retained(lambda: [convert(session_state(*task[:5])) for task in tasks])
+
+    # The compact states give back the same tables
+    for legacy, small in zip(states["DataFrames"], states["compact"]):
+        restored = expand(small)
+        for name in ("plate_df_long", "chronos", "skyline"):
+            pd.testing.assert_frame_equal(legacy[name], restored[name], check_exact=True)
+        pd.testing.assert_frame_equal(legacy["sdrf"][0], restored["sdrf"][0], check_exact=True)
+        for key in ("plate_df_long", "output_order_df", "output_order_df_rand"):
+            pd.testing.assert_frame_equal(legacy["order"][key], restored["order"][key], check_exact=True)
+    n_rows = sum(state["order"]["plate_df_long"].shape[0] for state in states["DataFrames"])
+
+    # Size of a table: the memory released when it is dropped from every state
+    per_table = {form: {} for form in states}
+    for form in states:
+        for name in TABLES:
+            start = _allocated()
+            for state in states[form]:
+                del state[name]
+            per_table[form][name] = start - _allocated()
+    tracemalloc.stop()
+
+    print(f"{n_plates} plates ({plate_format}), {n_rows} injections, session tables identical after expand")
+    print(f"  {'table':<16}{'DataFrames':>14}{'compact':>14}")
+    for name in TABLES:
+        before, after = per_table["DataFrames"][name], per_table["compact"][name]
+        print(f"  {name:<16}{before / 2**10:>11.1f} KiB{after / 2**10:>11.1f} KiB")
+    tables = [name for name in TABLES if not name.endswith("_export")]
+    before, after = (sum(per_table[form][name] for name in tables) for form in ("DataFrames", "compact"))
+    print(f"  {'tables':<16}{before / 2**20:>11.2f} MiB{after / 2**20:>11.2f} MiB  ({before / after:.1f}x)")
+    before, after = totals["DataFrames"], totals["compact"]
+    print(f"  {'total':<16}{before / 2**20:>11.2f} MiB{after / 2**20:>11.2f} MiB  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        sys.argv[2] if len(sys.argv) > 2 else "96-well",
+    )
@@ -0,0 +1,85 @@
+"""Benchmark: SDRF -> Skyline annotation CSV for large uploads.
+
+Converts the largest example SDRF, scaled up to several sizes, two ways:
+
+- legacy: ``pd.read_csv`` of the whole file, ``skyline_annotations`` and
+  ``to_csv`` of the result (the Skyline tab before, without the editor)
+- streamed: ``func.skyline.sdrf_to_skyline``, chunks of rows from the reader
+  to the CSV
+
+Each conversion runs in a fresh process and reports its time and peak
+resident memory above the process baseline; the two CSVs must be identical.
+
+Run from the project root:
+    python bench/bench_skyline.py [n_rows ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_sdrf_reader import EXAMPLE_DIR, _peak_kib, scale_sdrf  # noqa: E402
+from func.sdrf import skyline_annotations  # noqa: E402
+from func.skyline import sdrf_to_skyline  # noqa: E402
+
+
+def legacy_convert(sdrf_path, csv_path):
+    skyline_anno = skyline_annotations(pd.read_csv(sdrf_path, sep="\t", dtype=str))
+    with open(csv_path, "w", encoding="utf-8", newline="") as handle:
+        handle.write(skyline_anno.to_csv(index=False, encoding="utf-8"))
+
+
+def streamed_convert(sdrf_path, csv_path):
+    sdrf_to_skyline(sdrf_path, csv_path)
+
+
+CONVERSIONS = {"legacy": legacy_convert, "streamed": streamed_convert}
+
+
+def _measure(name, sdrf_path, csv_path):
+    baseline = _peak_kib()
+    start = time.perf_counter()
+    CONVERSIONS[name](sdrf_path, csv_path)
+    seconds = time.perf_counter() - start
+    print(json.dumps([seconds, (_peak_kib() - baseline) * 1024]))
+
+
+def measure(name, sdrf_path, csv_path):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", name, sdrf_path, csv_path],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main(sizes=(100_000, 400_000)):
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in sizes:
+            sdrf_path = os.path.join(directory, "scaled.sdrf.tsv")
+            scale_sdrf(os.path.join(EXAMPLE_DIR, "PXD023938.sdrf.tsv"), sdrf_path, n_rows)
+            results = {}
+            for name in CONVERSIONS:
+                results[name] = measure(name, sdrf_path, os.path.join(directory, name + ".csv"))
+            with open(os.path.join(directory, "legacy.csv"), "rb") as legacy, open(
+                os.path.join(directory, "streamed.csv"), "rb"
+            ) as streamed:
+                identical = legacy.read() == streamed.read()
+            size = os.path.getsize(sdrf_path) / 2**20
+            print(f"{n_rows} rows, {size:.0f} MiB SDRF, identical CSV: {identical}")
+            for name, (seconds, peak) in results.items():
+                print(f"  {name:<9}: {seconds:6.2f} s  peak +{peak / 2**20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        _measure(*sys.argv[2:5])
+        sys.exit()
+    main([int(arg) for arg in sys.argv[1:]] or (100_000, 400_000))
@@ -0,0 +1,73 @@
+"""Benchmark: multi-plate study generation.
+
+Builds the Xcalibur queue, Chronos table and SDRF for a synthetic study and
+reports the time of every step.
+
+Run from the project root:
+    python bench/bench_study.py [n_plates]
+"""
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from func.injection_table import XCALIBUR_COLUMNS, build_injection_table  # noqa: E402
+from func.schedule import build_queue, xcalibur_schedule  # noqa: E402
+from func.sdrf_template import render_sdrf_tsv, sdrf_template  # noqa: E402
+from func.study import Study, study_batches, study_chronos_table  # noqa: E402
+
+MS_INFO = {
+    "acq_tech": "DIA",
+    "sdrf_acquisition": "NT=Data-Independent Acquisition;AC=NCIT:C161786",
+    "sdrf_ms": "NT=Q Exactive HF;AC=MS:1002523",
+    "dissociation_accession": "NT=Higher-energy Collisional Dissociation;AC=MS:1000422",
+    "enz_accession_list": ["AC=MS:1001251;NT=Trypsin"],
+    "srm_lot": None,
+}
+SAMPLE_INFO = {"proj_name": "SCAPIS", "organism_species": "Homo sapiens", "sample": "Plasma", "plate_id": "P"}
+
+
+def make_manifest(n_plates):
+    rows = ["plate_id\tsample_name\tannotation"]
+    for i in range(n_plates):
+        for line in ["Pool;A7,A8,A12", "Control;G12:H12", "EMPTY;A1", "Cohort_2;RowD-E", "QC;Col6/1"]:
+            rows.append(f"P{i:03d}\tCohort_1\t{line}")
+    return "\n".join(rows)
+
+
+def main(n_plates=50):
+    manifest = make_manifest(n_plates)
+    control = pd.DataFrame({column: ["ctrl"] for column in XCALIBUR_COLUMNS})
+    timings = {}
+
+    start = time.perf_counter()
+    study = Study.from_manifest(io.StringIO(manifest))
+    timings["manifest"] = time.perf_counter()
+    plate_long, _ = study.plate_long()
+    timings["parse + layout"] = time.perf_counter()
+    order_df = build_injection_table(plate_long, MS_INFO, "SCAPIS", "20260101", "R", "0.1", "method", "C:\\data")
+    timings["injection order"] = time.perf_counter()
+    controls = {name: control for name in ["wash", "qc", "qc_between_pre", "qc_between_post"]}
+    build_queue(order_df, controls, xcalibur_schedule("DIA", True, qc_every=24)).to_csv(index=False)
+    timings["xcalibur csv"] = time.perf_counter()
+    batches = study_batches(order_df, study.plate_ids)
+    for batch in range(batches.max() + 1):
+        study_chronos_table(order_df[batches == batch], "method.cam", "method.meth", "C:\\data", "").to_csv()
+    timings["chronos csv"] = time.perf_counter()
+    sdrf_columns, _ = sdrf_template(order_df.columns, MS_INFO, SAMPLE_INFO, "raw", "27")
+    render_sdrf_tsv(sdrf_columns, order_df, order_df["File Name"])
+    timings["sdrf tsv"] = time.perf_counter()
+
+    previous = start
+    for step, stamp in timings.items():
+        print(f"{step:>16}: {(stamp - previous) * 1000:8.2f} ms")
+        previous = stamp
+    print(f"{'total':>16}: {(previous - start) * 1000:8.2f} ms for {n_plates} plates, {order_df.shape[0]} injections")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,85 @@
+"""Benchmark: editing the SDRF of a study with a sparse patch (``func/table_patch.py``).
+
+One editor interaction on the SDRF frame of a synthetic study, two ways:
+
+- legacy: the whole frame serialized to Arrow for ``st.data_editor`` and
+  returned as a full copy with the edits (the tabs before)
+- patch: one page of rows serialized, the edits recorded in a ``TablePatch``
+  and applied to the frame (copies of the edited columns only)
+
+Reports the time, the bytes sent to the browser and the bytes copied per
+interaction, then regenerates the SDRF with another collision energy and
+checks that the patched frame still carries the edits.
+
+Run from the project root:
+    python bench/bench_table_patch.py [n_plates]
+"""
+import io
+import os
+import sys
+import time
+
+from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_study import MS_INFO, SAMPLE_INFO, make_manifest  # noqa: E402
+from func.injection_table import build_injection_table  # noqa: E402
+from func.sdrf import build_sdrf  # noqa: E402
+from func.study import Study  # noqa: E402
+from func.table_patch import PAGE_ROWS, TablePatch, row_keys  # noqa: E402
+
+# Cells edited by the user: every 50th row, disease and cell type
+EDIT_STEP = 50
+EDIT_COLUMNS = {"characteristics[disease]": "COVID-19", "characteristics[cell type]": "hepatocyte"}
+
+
+def legacy_interaction(sdrf_df, edits):
+    payload = convert_pandas_df_to_arrow_bytes(sdrf_df)
+    edited = sdrf_df.copy()
+    for position, column, value in edits:
+        edited.iat[position, edited.columns.get_loc(column)] = value
+    return edited, len(payload), edited.memory_usage(index=False, deep=True).sum()
+
+
+def patch_interaction(sdrf_df, patch, edits, keys):
+    page = patch.apply(sdrf_df.iloc[:PAGE_ROWS], keys[:PAGE_ROWS])
+    payload = convert_pandas_df_to_arrow_bytes(page)
+    for position, column, value in edits:
+        patch.edits[(keys[position], column)] = value
+    edited = patch.apply(sdrf_df, keys)
+    copied = sum(edited[column].memory_usage(index=False, deep=True) for column in EDIT_COLUMNS)
+    return edited, len(payload), copied
+
+
+def main(n_plates=50):
+    study = Study.from_manifest(io.StringIO(make_manifest(n_plates)))
+    plate_long, _ = study.plate_long()
+    order_df = build_injection_table(plate_long, MS_INFO, "SCAPIS", "20260101", "R", "0.1", "method", "C:\\data")
+    sdrf_df, _ = build_sdrf(order_df, order_df["File Name"], MS_INFO, SAMPLE_INFO, "raw", "27")
+    edits = [(i, column, value) for i in range(0, sdrf_df.shape[0], EDIT_STEP) for column, value in EDIT_COLUMNS.items()]
+
+    start = time.perf_counter()
+    legacy, legacy_sent, legacy_copied = legacy_interaction(sdrf_df, edits)
+    legacy_seconds = time.perf_counter() - start
+
+    patch = TablePatch("source name")
+    start = time.perf_counter()
+    keys = row_keys(sdrf_df, "source name")
+    patched, sent, copied = patch_interaction(sdrf_df, patch, edits, keys)
+    seconds = time.perf_counter() - start
+
+    print(f"{n_plates} plates, {sdrf_df.shape[0]} rows x {sdrf_df.shape[1]} columns, {len(edits)} edited cells")
+    print(f"  legacy: {legacy_seconds:6.3f} s  sent {legacy_sent / 2**20:6.2f} MiB  copied {legacy_copied / 2**20:6.2f} MiB")
+    print(f"  patch : {seconds:6.3f} s  sent {sent / 2**20:6.2f} MiB  copied {copied / 2**20:6.2f} MiB")
+    print(f"  same table: {legacy.equals(patched)}")
+
+    # The base regenerated with another collision energy keeps the edits
+    regenerated, _ = build_sdrf(order_df, order_df["File Name"], MS_INFO, SAMPLE_INFO, "raw", "30")
+    patched = patch.apply(regenerated)
+    kept = all(patched[column].iat[position] == value for position, column, value in edits)
+    print(f"  regenerated (30 NCE): edits kept: {kept}, unmatched: {patch.unmatched(regenerated)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
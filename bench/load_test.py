@@ -0,0 +1,164 @@
+"""Load test of the generation service (service.py) on localhost.
+
+Starts the service in a subprocess (or uses ``--url``), sends ``--requests``
+POST requests from ``--concurrency`` client threads and reports requests per
+second, p50/p90/p99 latency and how the requests were served (X-Cache: miss,
+joined or hit).
+
+The requests cycle over ``--distinct`` different plates and over the
+artifacts, so the mix has cold builds, requests joining a running build and
+cache hits. ``--study`` sends per-plate requests for a study manifest instead,
+which are batched into one build per study.
+
+Run from the project root:
+    python bench/load_test.py
+    python bench/load_test.py --requests 500 --concurrency 32 --distinct 50 --workers 4
+    python bench/load_test.py --study --distinct 4
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ms_planner import PLATE_ARTIFACTS  # noqa: E402
+
+SETTINGS = {"xcalibur": {"date_injection": "20260101", "qc_every": 24}}
+ANNOTATION = "Pool;A7,A8,A12\nControl;G12:H12\nEMPTY;A1\nCohort_2;RowD-E"
+PLATES_PER_STUDY = 8
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(workers):
+    """Start service.py on a free port; returns (process, url)."""
+    port = _free_port()
+    command = [sys.executable, "service.py", "--port", str(port)]
+    if workers:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command, cwd=ROOT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + "/health", timeout=1).read()
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The service did not start within 60 s.")
+
+
+def _study_manifest(study):
+    rows = ["plate_id\tsample_name\tannotation"]
+    for plate in range(PLATES_PER_STUDY):
+        for line in ANNOTATION.splitlines():
+            rows.append(f"S{study:03d}_P{plate:02d}\tCohort_1\t{line}")
+    return "\n".join(rows)
+
+
+def build_requests(n_requests, n_distinct, study):
+    """(path, body) of every request."""
+    requests = []
+    for i in range(n_requests):
+        artifact = PLATE_ARTIFACTS[i % len(PLATE_ARTIFACTS)]
+        key = i % n_distinct
+        if study:
+            body = {
+                "manifest": _study_manifest(key),
+                "plate_id": f"S{key:03d}_P{i % PLATES_PER_STUDY:02d}",
+                "settings": {**SETTINGS, "xcalibur": {**SETTINGS["xcalibur"], "seed": key}},
+            }
+            requests.append((f"/study/{artifact}", body))
+        else:
+            body = {"plate_id": f"P{key:04d}", "sample_name": "Cohort_1", "annotation": ANNOTATION, "seed": key, "settings": SETTINGS}
+            requests.append((f"/plate/{artifact}", body))
+    return requests
+
+
+def _send(url, path, body):
+    data = json.dumps(body).encode()
+    request = urllib.request.Request(url + path, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            status, cache = response.status, response.headers.get("X-Cache", "")
+    except urllib.error.HTTPError as e:
+        status, cache = e.code, ""
+    return time.perf_counter() - start, status, cache
+
+
+def run_load(url, requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda item: _send(url, *item), requests))
+    elapsed = time.perf_counter() - start
+    latencies = np.array([result[0] for result in results]) * 1000
+    return {
+        "elapsed_s": elapsed,
+        "rps": len(requests) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+        "status": dict(Counter(result[1] for result in results)),
+        "cache": dict(Counter(result[2] for result in results)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="running service (default: start one)")
+    parser.add_argument("--workers", type=int, help="builder processes of the started service")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--distinct", type=int, default=20, help="different plates (or studies with --study)")
+    parser.add_argument("--study", action="store_true", help="per-plate requests of study manifests")
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_service(args.workers)
+    try:
+        requests = build_requests(args.requests, args.distinct, args.study)
+        report = run_load(url, requests, args.concurrency)
+        health = json.loads(urllib.request.urlopen(url + "/health").read())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(
+        f"{args.requests} requests, {args.concurrency} clients, {args.distinct} distinct "
+        f"{'studies' if args.study else 'plates'}, {health['workers']} workers"
+    )
+    print(f"  throughput: {report['rps']:8.1f} requests/s ({report['elapsed_s']:.2f} s)")
+    print(
+        f"  latency   : p50 {report['p50_ms']:.1f} ms, p90 {report['p90_ms']:.1f} ms, "
+        f"p99 {report['p99_ms']:.1f} ms, max {report['max_ms']:.1f} ms"
+    )
+    print(f"  status    : {report['status']}")
+    print(f"  served    : {report['cache']}")
+    print(f"  cache     : {health['cache']}")
+    return 0 if set(report["status"]) == {200} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
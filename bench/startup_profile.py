@@ -0,0 +1,152 @@
+"""Startup profile of the Streamlit app.
+
+Measures, each in a fresh interpreter so nothing is already imported:
+
+1. the import time of the modules ``web.py`` imports (``python -X importtime``),
+   summed per top-level package;
+2. the time to first render: importing and running ``web.py`` once headless
+   with Streamlit's ``AppTest``, i.e. what a cold container does before the
+   first page is sent;
+3. which heavy optional modules were loaded by the first render.
+
+Run from the project root:
+    python bench/startup_profile.py
+    python bench/startup_profile.py --import-budget-ms 2500 --render-budget-ms 8000
+
+With a budget the script exits with status 1 when it is exceeded, so it can run
+as a CI step.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "web.py")
+
+# Modules that should only be imported once a feature needs them
+HEAVY_MODULES = ["matplotlib", "seaborn", "plotly", "openai", "hypha_rpc", "xml.dom.minidom"]
+
+FIRST_RENDER_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+rendered = time.perf_counter()
+print(json.dumps({{
+    "streamlit_import_ms": (imported - start) * 1000,
+    "first_run_ms": (rendered - imported) * 1000,
+    "first_render_ms": (rendered - start) * 1000,
+    "exceptions": [str(e.value) for e in at.exception],
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def app_imports(path=APP):
+    """Top-level modules imported by ``web.py``, in source order."""
+    with open(path, encoding="utf-8") as handle:
+        tree = ast.parse(handle.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def _importtime(code):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stderr
+
+
+def _parse_importtime(stderr):
+    """(module, cumulative ms) of the outermost imports of an importtime log."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only the outermost imports, their cumulative time covers the nested ones
+        if name.startswith("  ", 1):
+            continue
+        entries.append((name.strip(), int(cumulative) / 1000))
+    return entries
+
+
+def import_breakdown(modules):
+    """
+    Import ``modules`` in a fresh interpreter with ``-X importtime``.
+
+    Modules the interpreter imports at startup (site, encodings, ...) are left
+    out.
+
+    Returns:
+        tuple: (total_ms, per_package) - cumulative import time of the
+        top-level imports and a dict of milliseconds per top-level package
+    """
+    startup = {name for name, _ in _parse_importtime(_importtime("pass"))}
+    per_package = defaultdict(float)
+    for name, ms in _parse_importtime(_importtime("import " + ", ".join(modules))):
+        if name not in startup:
+            per_package[name.split(".")[0]] += ms
+    return sum(per_package.values()), dict(per_package)
+
+
+def first_render():
+    """Run ``web.py`` once headless in a fresh interpreter."""
+    script = FIRST_RENDER_SCRIPT.format(app=APP, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=12, help="number of packages to list")
+    parser.add_argument("--import-budget-ms", type=float, help="fail if the app imports take longer")
+    parser.add_argument("--render-budget-ms", type=float, help="fail if the first render takes longer")
+    args = parser.parse_args(argv)
+
+    modules = app_imports()
+    total_ms, per_package = import_breakdown(modules)
+    print(f"Import time of {', '.join(modules)}: {total_ms:.0f} ms")
+    for name, ms in sorted(per_package.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {name:<24} {ms:8.1f} ms")
+
+    render = first_render()
+    print(
+        f"Time to first render: {render['first_render_ms']:.0f} ms "
+        f"(streamlit testing import {render['streamlit_import_ms']:.0f} ms, "
+        f"script run {render['first_run_ms']:.0f} ms)"
+    )
+    print(f"Heavy modules loaded by the first render: {', '.join(render['loaded']) or 'none'}")
+
+    failed = False
+    if render["exceptions"]:
+        print(f"First render raised: {render['exceptions']}")
+        failed = True
+    if args.import_budget_ms is not None and total_ms > args.import_budget_ms:
+        print(f"Import budget exceeded: {total_ms:.0f} ms > {args.import_budget_ms:.0f} ms")
+        failed = True
+    if args.render_budget_ms is not None and render["first_render_ms"] > args.render_budget_ms:
+        print(f"Render budget exceeded: {render['first_render_ms']:.0f} ms > {args.render_budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""OpenAI/Hypha agent for the Plate Design tab.
+
+The agent can rewrite the plate annotation text through the ``design_plate``
+tool. ``hypha-rpc`` and ``openai`` are optional dependencies; both are only
+imported when the agent is run, so they do not slow down the app start.
+"""
+import asyncio
+import json
+import uuid
+
+import streamlit as st
+
+SERVER_URL = "https://hypha.aicell.io"
+
+
+def _safe_run(coro):
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    loop.run_until_complete(coro)
+
+
+def design_plate(plate_design_str: str) -> str:
+    """Design a plate by setting the replacement positions text.
+
+    The input string should be formatted as 'Label;Location' separated by newlines.
+    A location is a well (A1), a block (A1:D6), rows (RowD, RowA-C, RowA-H/2),
+    columns (Col8, Col1-4, Col1-12/2) or a comma-separated list of these.
+    Example: 'Pool;A7,A8,A10\nControl;G12\nControl;H12\nCohort_2;C8\nEMPTY;A1\nCohort_2;RowD-E\nCohort_2;Col8-9\nCohort_3;E1:F4'
+    """
+    st.session_state["pending_plate_update"] = plate_design_str
+    return "Successfully updated plate design."
+
+
+async def run_open_ai_agent(prompt, api_key):
+    """Run the OpenAI agent with MCP tools."""
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:
+        st.error("OpenAI library not installed.")
+        return
+
+    client = AsyncOpenAI(api_key=api_key)
+
+    # Define tool directly to avoid MCP fetch issues
+    openai_tools = [
+        {
+            "type": "function",
+            "function": {
+                "name": "design_plate",
+                "description": "Design a plate by setting the replacement positions text.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "plate_design_str": {
+                            "type": "string",
+                            "description": (
+                                "The input string formatted as 'Label;Location' separated by newlines. "
+                                "Locations: A1, A1:D6, RowA-C, Col1-4, Col1-12/2 or comma-separated lists."
+                            ),
+                        }
+                    },
+                    "required": ["plate_design_str"],
+                },
+            },
+        }
+    ]
+
+    # Call OpenAI
+    messages = [
+        {
+            "role": "system",
+            "content": f"You are a helpful assistant that can modify plate designs. The current plate design replace_pos text is:\n{st.session_state.replace_pos_text}",
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+    try:
+        completion = await client.chat.completions.create(
+            model="gpt-4o", messages=messages, tools=openai_tools, tool_choice="auto"
+        )
+    except Exception as e:
+        st.error(f"OpenAI API Error: {e}")
+        return
+
+    message = completion.choices[0].message
+
+    # Handle Tool Calls
+    if message.tool_calls:
+        for tool_call in message.tool_calls:
+            function_name = tool_call.function.name
+            arguments = json.loads(tool_call.function.arguments)
+
+            st.info(f"Agent calling tool: `{function_name}` with args: `{arguments}`")
+            if function_name == "design_plate":
+                result = design_plate(**arguments)
+                st.success(result)
+                st.rerun()
+    else:
+        st.write(message.content)
+
+
+def create_agent_chat():
+    """Create an agent chat interface."""
+
+    api_key = st.text_input("OpenAI API Key", type="password")
+    prompt = st.text_input(
+        "Prompt", "Set the plate to have Control at A1 and Pool at B2"
+    )
+
+    if st.button("Run Agent"):
+        if not api_key:
+            st.warning("Please enter an OpenAI API Key.")
+            return
+
+        # If hypha_rpc is not installed, disable the agent functionality with a clear message.
+        try:
+            from hypha_rpc import connect_to_server
+            from hypha_rpc.utils.schema import schema_function
+        except Exception:
+            st.error(
+                "Hypha RPC client is not available. Agent features are disabled. "
+                "Install the optional dependency 'hypha-rpc' to enable this."
+            )
+            return
+
+        async def start_and_chat():
+            # Connect to Hypha
+            client_id = f"ms-experiment-{uuid.uuid4().hex[:8]}"
+            st.session_state.service_id = client_id
+
+            with st.spinner("Connecting to Hypha..."):
+                async with connect_to_server({"server_url": SERVER_URL}) as server:
+
+                    # Register Service
+                    await server.register_service(
+                        {
+                            "id": client_id,
+                            "description": "Plate Design Service",
+                            "config": {"visibility": "public"},
+                            "design_plate": schema_function(design_plate),
+                        }
+                    )
+
+                    serve_task = asyncio.create_task(server.serve())
+
+                    # Run Agent
+                    await run_open_ai_agent(prompt, api_key)
+
+                    serve_task.cancel()
+                    try:
+                        await serve_task
+                    except asyncio.CancelledError:
+                        pass
+
+        # Run the async loop
+        _safe_run(start_and_chat())
@@ -0,0 +1,285 @@
+"""Content-addressed artifact cache on disk, shared by processes and restarts.
+
+Generated exports (Xcalibur, Chronos and SDRF files, the files of a plate) are
+stored under a hash of everything they are built from: the plate grid,
+``ms_info_output``, ``sample_info_output`` and the tab options, plus a hash of
+the builder source code (func/, tabs/ and ms_planner.py) so that a new version
+of the app never serves files of the previous one. A hit returns the stored
+bytes without building anything, also for another session, another Streamlit
+worker process or after a restart.
+
+Entries are files ``<directory>/<key[:2]>/<key>``:
+
+- writes go to a temporary file in the cache directory and are renamed into
+  place, so readers see a complete entry or none; two processes building the
+  same key write identical content, the last rename wins
+- a hit touches the file, the modification time is the LRU order
+- when the cache is larger than ``max_bytes`` the least recently used
+  entries are removed; one process evicts at a time (``fcntl`` lock where
+  available), removing an entry that another process removed first is fine
+
+A value is bytes, str, int/float/bool/None or a list, tuple or dict of these;
+tuples come back as lists. The cache directory is created on the first write.
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction without a lock
+    fcntl = None
+
+MAGIC = b"MSPA1\n"
+# Temporary files older than this are left over from a killed writer
+STALE_TMP_SECONDS = 3600
+
+
+def _update(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(str(key).encode())
+            _update(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, bytes):
+        digest.update(value)
+    else:
+        digest.update(repr(value).encode())
+    digest.update(b"\x1e")
+
+
+def fingerprint(value) -> str:
+    """Content hash of widget values, dicts, lists, arrays and DataFrames."""
+    digest = hashlib.sha1()
+    _update(digest, value)
+    return digest.hexdigest()
+
+
+# Sources of the builders: func/ and the disk-cached builders outside of it
+# (``_build_study`` of the Study tab, ``ms_planner.build_plate_files``)
+CODE_SOURCES = ("func/*.py", "tabs/*.py", "ms_planner.py")
+
+
+def _code_version() -> str:
+    """Hash of the builder sources (``CODE_SOURCES``)."""
+    digest = hashlib.sha1()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = sorted(path for pattern in CODE_SOURCES for path in glob.glob(os.path.join(root, pattern)))
+    for path in paths:
+        with open(path, "rb") as handle:
+            digest.update(os.path.relpath(path, root).encode())
+            digest.update(handle.read())
+    return digest.hexdigest()[:12]
+
+
+CODE_VERSION = _code_version()
+
+
+def artifact_key(kind, *inputs) -> str:
+    """Canonical content hash of an artifact kind and its inputs (DataFrames, dicts, ...)."""
+    return fingerprint([CODE_VERSION, kind, list(inputs)])
+
+
+def _encode(value, blobs):
+    if isinstance(value, bytes):
+        blobs.append(value)
+        return {"b": len(blobs) - 1}
+    if isinstance(value, str):
+        blobs.append(value.encode("utf-8"))
+        return {"s": len(blobs) - 1}
+    if isinstance(value, (list, tuple)):
+        return {"l": [_encode(item, blobs) for item in value]}
+    if isinstance(value, dict):
+        return {"d": [[key, _encode(item, blobs)] for key, item in value.items()]}
+    if value is None or isinstance(value, (bool, int, float)):
+        return {"v": value}
+    raise TypeError(f"Cannot cache a value of type {type(value).__name__}")
+
+
+def _decode(node, blobs):
+    if "b" in node:
+        return blobs[node["b"]]
+    if "s" in node:
+        return blobs[node["s"]].decode("utf-8")
+    if "l" in node:
+        return [_decode(item, blobs) for item in node["l"]]
+    if "d" in node:
+        return {key: _decode(item, blobs) for key, item in node["d"]}
+    return node["v"]
+
+
+def pack(value) -> bytes:
+    """Serialized ``value``: a JSON header followed by the raw bytes/str blobs."""
+    blobs = []
+    tree = _encode(value, blobs)
+    header = json.dumps({"tree": tree, "sizes": [len(blob) for blob in blobs]}).encode()
+    return b"".join([MAGIC, len(header).to_bytes(8, "little"), header, *blobs])
+
+
+def unpack(data: bytes):
+    """Inverse of ``pack``; raises ValueError if ``data`` is not a complete entry."""
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a cache entry.")
+    start = len(MAGIC) + 8
+    header_size = int.from_bytes(data[len(MAGIC):start], "little")
+    header = json.loads(data[start:start + header_size])
+    blobs = []
+    offset = start + header_size
+    for size in header["sizes"]:
+        blobs.append(data[offset:offset + size])
+        offset += size
+    if offset != len(data):
+        raise ValueError("Truncated cache entry.")
+    return _decode(header["tree"], blobs)
+
+
+class ArtifactCache:
+    def __init__(self, directory, max_bytes: int = 512 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Statistics of this process
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Cached value of ``key`` or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle:
+                value = unpack(handle.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            # Missing, evicted meanwhile or unreadable: rebuilt by the caller
+            return None
+        return value
+
+    def put(self, key, value):
+        """Store ``value`` atomically under ``key`` and evict if the cache is full."""
+        data = pack(value)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(handle, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # e.g. Windows: the entry is open in a reader; it has the same content
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        self.evict()
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached value of ``key`` or store and return ``build()``.
+
+        Returns:
+            tuple: (value, hit)
+        """
+        if self.max_bytes <= 0:
+            return build(), False
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, True
+        self.misses += 1
+        value = build()
+        try:
+            self.put(key, value)
+        except OSError:
+            # A full or read-only disk only costs the cache, not the export
+            pass
+        return value, False
+
+    def _entries(self):
+        entries = []
+        now = time.time()
+        with os.scandir(self.directory) as top:
+            for subdir in top:
+                if subdir.name.startswith(".tmp-"):
+                    try:
+                        if now - subdir.stat().st_mtime > STALE_TMP_SECONDS:
+                            os.remove(subdir.path)
+                    except OSError:
+                        pass
+                    continue
+                if not subdir.is_dir():
+                    continue
+                with os.scandir(subdir.path) as files:
+                    for entry in files:
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Another process is evicting
+                    return
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self.evicted += 1
+                except OSError:
+                    pass
+                total -= size
+
+    def stats(self) -> dict:
+        entries = self._entries() if os.path.isdir(self.directory) else []
+        return {
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        for _, _, path in self._entries() if os.path.isdir(self.directory) else []:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.hits = self.misses = self.evicted = 0
+
+
+# Shared by every session and worker process of the host; MS_PLANNER_CACHE_DIR
+# and MS_PLANNER_CACHE_MB configure it, MS_PLANNER_CACHE_MB=0 disables it
+ARTIFACT_CACHE = ArtifactCache(
+    os.environ.get("MS_PLANNER_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "ms_planner_cache"),
+    max_bytes=int(os.environ.get("MS_PLANNER_CACHE_MB", "512")) * 2**20,
+)
@@ -0,0 +1,83 @@
+"""ZIP bundle of all artifacts, built concurrently and streamed.
+
+A bundle is described by jobs, ``(function, *args)`` tuples whose function
+returns ``{file name: content}``; the content is bytes or an iterable of bytes
+chunks (e.g. ``export_utils.iter_xml_chunks``). Jobs run in a thread pool (or
+a given executor), at most two per worker are in flight, and the files of a
+finished job are compressed into the archive in job order while the next jobs
+are still running. Only the files of the jobs in flight are held in memory,
+so a study bundle with hundreds of files has the same footprint as a small
+one; the archive itself goes straight to ``target``.
+
+The archive ends with ``manifest.json``: size and SHA-256 of every file, and
+optional metadata (project, plates, settings).
+"""
+import hashlib
+import json
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BUNDLE_MANIFEST = "manifest.json"
+
+
+def _write_files(archive, files, entries):
+    for name, content in files.items():
+        if name == BUNDLE_MANIFEST or name in entries:
+            raise ValueError(f"Duplicate file in bundle: {name}")
+        digest = hashlib.sha256()
+        size = 0
+        with archive.open(name, "w") as handle:
+            for chunk in [content] if isinstance(content, bytes) else content:
+                handle.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        entries[name] = {"name": name, "size": size, "sha256": digest.hexdigest()}
+
+
+def write_zip_bundle(target, jobs, max_workers=4, executor=None, metadata=None):
+    """
+    Build the files of ``jobs`` concurrently and stream them into a ZIP archive.
+
+    Args:
+        target (str or file-like): Path or writable binary file of the archive;
+            it does not need to be seekable
+        jobs (Iterable[tuple]): ``(function, *args)``, ``function(*args)``
+            returns a dict file name -> bytes or iterable of bytes chunks
+        max_workers (int): Threads of the pool, or the workers of ``executor``
+        executor (concurrent.futures.Executor): Run the jobs here instead of a
+            new thread pool, e.g. a process pool for picklable jobs
+        metadata (dict): JSON-serializable information for the manifest
+
+    Returns:
+        dict: The manifest written as ``manifest.json``
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    entries = {}
+    in_flight = deque()
+    try:
+        with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for job in jobs:
+                in_flight.append(executor.submit(*job))
+                # Bounded look-ahead: write the oldest job before submitting more
+                if len(in_flight) >= 2 * max_workers:
+                    _write_files(archive, in_flight.popleft().result(), entries)
+            while in_flight:
+                _write_files(archive, in_flight.popleft().result(), entries)
+
+            manifest = {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "metadata": metadata or {},
+                "files": list(entries.values()),
+            }
+            archive.writestr(BUNDLE_MANIFEST, json.dumps(manifest, indent=2))
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
+    return manifest
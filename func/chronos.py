@@ -0,0 +1,146 @@
+"""Chronos (Evosep) table of one plate and its CSV/XML export.
+
+The wells follow the injection order of the Xcalibur queue, with optional iRT
+runs before and Standby/Prepare commands after the samples. Used by the
+Chronos tab and the headless planner.
+"""
+import pandas as pd
+
+from func.export_utils import ensure_bom, iter_xml_chunks, sanitize_xml_columns
+from func.injection_table import EMPTY_WELL_LABEL
+
+
+def build_chronos_table(
+    order,
+    evosep_output,
+    evosep_method,
+    xcalibur_sample_method,
+    evosep_slot,
+    evosep_comment,
+    iRT_samples=0,
+    iRT_slot="",
+    iRT_sample_name="",
+    xcalibur_irt_method="",
+    include_standby_prepare=False,
+    standby_command="",
+    prepare_command="",
+):
+    """
+    Chronos (Evosep) table of the injected wells, iRT and standby rows included.
+
+    The wells are in the (randomized) injection order of the Xcalibur queue.
+    """
+    evosep_sample_df = order["plate_df_long"].take(order["permutation"])
+
+    # Add Source Tray column
+    evosep_sample_df["Source Tray"] = evosep_slot
+    # Add 'Xcalibur Method' column
+    evosep_sample_df["Xcalibur Method"] = xcalibur_sample_method
+    # Rename File Name to Sample Name
+    evosep_sample_df = evosep_sample_df.rename(columns={"File Name": "Sample Name"})
+
+    # Filter EMPTY wells
+    evosep_sample_df = evosep_sample_df[
+        evosep_sample_df["Sample"] != EMPTY_WELL_LABEL
+    ]
+
+    # Select only column Sample Name, Xcalibur Method, Source Vial
+    evosep_sample_df = evosep_sample_df[
+        ["Source Tray", "Source Vial", "Sample Name", "Xcalibur Method"]
+    ]
+
+    if order["randomized"]:
+        evosep_sample_final = evosep_sample_df.reset_index(drop=True)
+    else:
+        evosep_sample_final = evosep_sample_df
+
+    ## Create Evosep iRT table
+
+    # iRT sample name
+    if iRT_samples != 0:
+        # Create iRT df
+        evosep_irt_df = pd.DataFrame(
+            {
+                # Column Source vial is list from 1 to iRT_samples
+                "Source Vial": list(range(1, iRT_samples + 1)),
+                "Sample Name": iRT_sample_name,
+                "Xcalibur Method": xcalibur_irt_method,
+            }
+        )
+
+        # Append source vial to Sample Name and add Source Tray column
+        evosep_irt_df["Sample Name"] = (
+            evosep_irt_df["Sample Name"]
+            + "_"
+            + evosep_irt_df["Source Vial"].astype(str)
+        )
+
+        evosep_irt_df.insert(0, "Source Tray", iRT_slot)
+
+        # Final Evosep df
+        evosep_final_df = pd.concat(
+            [evosep_irt_df, evosep_sample_final], ignore_index=True
+        )
+
+    else:
+        evosep_final_df = evosep_sample_final
+
+    # Download Chronos file
+
+    # Add first
+    evosep_final_df.insert(0, "Analysis Method", evosep_method)
+
+    # Add prefix to Sample Name with ms_info_output['acq_tech']
+    # evosep_final_df['Sample Name'] = ms_info_output['acq_tech'] + '_' + evosep_final_df['Sample Name']
+
+    # Add Xcalibur file name column with is File Name
+    evosep_final_df["Xcalibur Filename"] = evosep_final_df["Sample Name"]
+    # Add empty column call Xcalibur Post Acquisition Program
+    evosep_final_df["Xcalibur Post Acquisition Program"] = ""
+
+    # Add Xcalibur output dir called Xcalibur Output Dir
+    evosep_final_df["Xcalibur Output Dir"] = evosep_output
+
+    # Add comment
+    evosep_final_df["Comment"] = evosep_comment
+
+    # Add 3 empty columns called  Pump preparation	Align solvents	Flow to column / idle flow
+    evosep_final_df["Pump preparation"] = ""
+    evosep_final_df["Align solvents"] = ""
+    evosep_final_df["Flow to column / idle flow"] = ""
+
+    if include_standby_prepare:
+        # Copy evosep_final_df to evo_Standby_df and remove all contents
+        evo_standby_df = evosep_final_df.copy()
+        evo_standby_df.loc[:, :] = ""
+        # Add standby_command to first row and first column
+        evo_standby_df.iloc[0, 0] = standby_command
+        evo_standby_df.iloc[1, 0] = prepare_command
+        # Add the last three columns of the second row to be "none", "False", "Idle flow (250 nl/min)"
+        evo_standby_df.iloc[1, -3] = "none"
+        evo_standby_df.iloc[1, -2] = "False"
+        evo_standby_df.iloc[1, -1] = "Idle flow (250 nl/min)"
+        # Ensure that evo_Standby_df has two row and 12 columns
+        evo_standby_df = evo_standby_df.iloc[:2, :12]
+        # Rowbind evo_standby_df after evosep_final_df
+        evosep_final_df = pd.concat(
+            [evosep_final_df, evo_standby_df], ignore_index=True
+        )
+
+    return evosep_final_df
+
+
+def export_chronos_table(table):
+    """CSV text and XML bytes of the (edited) Chronos table."""
+    csv_evosep_data = table.to_csv(index=True, sep=",", encoding="utf-8-sig")
+
+    # Ensure UTF-8 BOM is present
+    csv_evosep_data = ensure_bom(csv_evosep_data)
+
+    # Replace invalid XML tag characters in column names
+    evosep_xml_df = table.set_axis(sanitize_xml_columns(table.columns), axis=1)
+
+    # XML written from the column arrays, no DOM is built
+    xml_evosep_data = b"".join(iter_xml_chunks(evosep_xml_df))
+
+    return csv_evosep_data, xml_evosep_data
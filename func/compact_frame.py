@@ -0,0 +1,169 @@
+"""Compact form of the tables kept in ``st.session_state``.
+
+The plate, order, Chronos and SDRF tables have one row per well but few
+distinct values per column: constants (method, path, instrument, ...),
+labels (Sample, Row, Column) and names sharing a prefix (File Name, Position).
+Every session keeps them between reruns, so they are stored column by column
+as
+
+- a constant: the value once, broadcast when the table is materialized
+- coded: a common prefix, the distinct suffixes and small integer codes
+- an array: numeric and high-cardinality columns, unchanged (shared with the
+  materialized tables, copy-on-write protects them from edits)
+
+and materialized again with ``to_frame`` when a rerun needs them. The memory
+of a session then grows with the distinct values, plus one or two bytes per
+row and coded column. ``to_frame`` returns the original table: same columns,
+dtypes, index and values.
+
+The tables handed between tabs (``st.session_state.plate_df_long`` and
+``output_order_df``) are CompactFrames. They answer the DataFrame calls their
+readers make: ``df["Sample"]``, ``df.shape``, ``len(df)``, ``df.columns``, and
+``df.copy()`` for a DataFrame to work on.
+"""
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+CONSTANT, CODED, ARRAY = "constant", "coded", "array"
+
+
+def _code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _encode(series, memo):
+    n_rows = series.shape[0]
+    if n_rows == 0 or not (series.dtype == object or pd.api.types.is_string_dtype(series.dtype)):
+        return (ARRAY, series.dtype, series)
+
+    values = series.to_numpy(dtype=object)
+    codes, _ = pd.factorize(values, use_na_sentinel=False)
+    # The original values, factorize turns None into NaN
+    uniques = values[np.unique(codes, return_index=True)[1]]
+    if len(uniques) == 1:
+        return (CONSTANT, series.dtype, uniques[0])
+
+    prefix = ""
+    if all(isinstance(value, str) for value in uniques):
+        prefix = os.path.commonprefix(list(uniques))
+    if not prefix and len(uniques) * 2 > n_rows:
+        return (ARRAY, series.dtype, series)
+    suffixes = [value[len(prefix):] for value in uniques] if prefix else list(uniques)
+    codes = codes.astype(_code_dtype(len(uniques)))
+
+    # A column shared by several tables (e.g. the order and its Xcalibur
+    # columns) is stored once
+    key = (str(series.dtype), prefix, tuple(map(repr, suffixes)), codes.tobytes())
+    if key not in memo:
+        # Distinct values in the column's own storage (Arrow for strings)
+        categories = np.array(suffixes, dtype=object) if series.dtype == object else pd.array(suffixes, dtype=series.dtype)
+        memo[key] = (CODED, series.dtype, prefix, categories, codes)
+    return memo[key]
+
+
+def _decode(encoded, n_rows):
+    kind, dtype = encoded[:2]
+    if kind == ARRAY:
+        # Shared with the stored column, copy-on-write keeps it unchanged
+        return encoded[2].copy(deep=False)
+    if kind == CONSTANT:
+        values = np.full(n_rows, encoded[2], dtype=object)
+        return values if dtype == object else pd.array(values, dtype=dtype)
+    prefix, categories, codes = encoded[2:]
+    if prefix:
+        categories = [prefix + value for value in categories]
+        categories = np.array(categories, dtype=object) if dtype == object else pd.array(categories, dtype=dtype)
+    return categories.take(codes)
+
+
+def _encoded_bytes(encoded):
+    kind = encoded[0]
+    if kind == ARRAY:
+        return encoded[2].memory_usage(index=False, deep=True)
+    if kind == CONSTANT:
+        return sys.getsizeof(encoded[2])
+    prefix, categories, codes = encoded[2:]
+    if isinstance(categories, np.ndarray):
+        return sys.getsizeof(prefix) + categories.nbytes + sum(map(sys.getsizeof, categories)) + codes.nbytes
+    return sys.getsizeof(prefix) + categories.nbytes + codes.nbytes
+
+
+@dataclass(frozen=True)
+class CompactFrame:
+    n_rows: int
+    columns: pd.Index
+    # RangeIndex (stored as such) or the original index
+    index: pd.Index
+    encoded: tuple
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, memo=None) -> "CompactFrame":
+        """Compact form of ``df``; frames compacted with the same ``memo`` share equal columns."""
+        memo = {} if memo is None else memo
+        return cls(
+            n_rows=df.shape[0],
+            columns=df.columns,
+            index=df.index,
+            encoded=tuple(_encode(df.iloc[:, i], memo) for i in range(df.shape[1])),
+        )
+
+    def column(self, name) -> pd.Series:
+        """One column, without materializing the others."""
+        i = self.columns.get_loc(name)
+        return pd.Series(_decode(self.encoded[i], self.n_rows), index=self.index, name=name, copy=False)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The table, a new DataFrame on every call."""
+        data = {i: _decode(encoded, self.n_rows) for i, encoded in enumerate(self.encoded)}
+        df = pd.DataFrame(data, index=self.index, copy=False)
+        df.columns = self.columns
+        return df
+
+    def copy(self, deep: bool = True) -> pd.DataFrame:
+        """The table as a new DataFrame, like ``DataFrame.copy`` of the original."""
+        return self.to_frame()
+
+    def __getitem__(self, name) -> pd.Series:
+        return self.column(name)
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def shape(self):
+        return self.n_rows, len(self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the encoded columns."""
+        return sum(_encoded_bytes(encoded) for encoded in self.encoded)
+
+
+def compact(value, memo=None):
+    """``value`` with every DataFrame (also in dicts, lists and tuples) as a CompactFrame."""
+    memo = {} if memo is None else memo
+    if isinstance(value, pd.DataFrame):
+        return CompactFrame.from_frame(value, memo)
+    if isinstance(value, dict):
+        return {key: compact(item, memo) for key, item in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(compact(item, memo) for item in value)
+    return value
+
+
+def expand(value):
+    """Inverse of ``compact``: CompactFrames materialized as new DataFrames."""
+    if isinstance(value, CompactFrame):
+        return value.to_frame()
+    if isinstance(value, dict):
+        return {key: expand(item) for key, item in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(expand(item) for item in value)
+    return value
@@ -0,0 +1,76 @@
+"""Helpers shared by the export tabs (file names, BOM, XML)."""
+import numpy as np
+import pandas as pd
+
+
+def ensure_bom(text: str) -> str:
+    if text.startswith("\ufeff"):
+        return text
+    return "\ufeff" + text
+
+
+def build_download_name(parts, suffix: str) -> str:
+    return "_".join(parts) + suffix
+
+
+def sanitize_xml_columns(columns):
+    return [
+        col.replace(" ", "_")
+        .replace("/", "_")
+        .replace("(", "")
+        .replace(")", "")
+        for col in columns
+    ]
+
+
+_XML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), ('"', "&quot;"), (">", "&gt;"), ("\r\n", "\n"), ("\r", "\n"))
+
+
+def _xml_cells(column, tag: str, indent: str):
+    """One pretty-printed ``<tag>value</tag>`` line per value of ``column``."""
+    text = list(map(str, column.to_numpy(dtype=object)))
+    # Same text the DOM round trip produced: escaped, line breaks normalized
+    joined = "\x00".join(text)
+    if any(char in joined for char in '&<>"\r'):
+        for char, entity in _XML_ESCAPES:
+            joined = joined.replace(char, entity)
+        text = joined.split("\x00")
+    open_tag, close_tag, empty = f"{indent}<{tag}>", f"</{tag}>\n", f"{indent}<{tag}/>\n"
+    return np.array([open_tag + value + close_tag if value else empty for value in text], dtype=object)
+
+
+def iter_xml_chunks(df: pd.DataFrame, indent: str = "  ", chunk_rows: int = 1024):
+    """
+    Yield ``df`` as indented XML (``<data><row><column>value</column>...``), UTF-8 encoded.
+
+    The document is written directly from the column arrays, ``chunk_rows``
+    rows per chunk (only one chunk of text is held at a time), without
+    building an element tree. The output is identical
+    to pretty-printing the ElementTree of the frame with minidom.
+
+    Args:
+        df (pd.DataFrame): Table to export, column names must be valid XML tags
+        indent (str): Indentation of one nesting level
+        chunk_rows (int): Number of rows encoded per yielded chunk
+
+    Yields:
+        bytes: Consecutive parts of the document
+    """
+    yield b'<?xml version="1.0" ?>\n'
+    if df.shape[0] == 0:
+        yield b"<data/>\n"
+        return
+    yield b"<data>\n"
+
+    for start in range(0, df.shape[0], chunk_rows):
+        # Only this chunk of rows is materialized as text
+        chunk = df.iloc[start : start + chunk_rows]
+        if chunk.shape[1] == 0:
+            yield (f"{indent}<row/>\n" * chunk.shape[0]).encode("utf-8")
+            continue
+        rows = np.full(chunk.shape[0], f"{indent}<row>\n", dtype=object)
+        for position, tag in enumerate(chunk.columns):
+            rows = rows + _xml_cells(chunk.iloc[:, position], tag, indent * 2)
+        rows = rows + f"{indent}</row>\n"
+        yield "".join(rows).encode("utf-8")
+    yield b"</data>\n"
@@ -0,0 +1,73 @@
+"""Injection table of one or many plates.
+
+One row per injected well with the columns every export needs: the Xcalibur
+queue (``XCALIBUR_COLUMNS``), the Chronos table (``File Name``, ``Source Vial``)
+and the SDRF (the well and sample columns). File names follow
+
+    {acq_tech}_{date}_{project}_{plate}_{well}
+
+and are built per category: the well names once per distinct row/column pair,
+the prefix once per plate, then one vectorized concatenation over all wells.
+"""
+import numpy as np
+import pandas as pd
+
+EMPTY_WELL_LABEL = "EMPTY"
+XCALIBUR_COLUMNS = ["File Name", "Path", "Instrument Method", "Position", "Inj Vol"]
+
+
+def _well_names(rows, columns):
+    """Row + column of every well, concatenated once per distinct pair."""
+    row = pd.Categorical(rows)
+    column = pd.Categorical(np.asarray(columns).astype(str))
+    names = np.char.add(
+        np.asarray(row.categories, dtype=str)[:, None], np.asarray(column.categories, dtype=str)[None, :]
+    ).astype(object)
+    return names.ravel()[row.codes.astype(np.int64) * len(column.categories) + column.codes]
+
+
+def build_injection_table(
+    plate_long, ms_info, proj_name, date_injection, injection_pos_letter, injection_vol, method_file, data_path, plate_id=None
+):
+    """
+    Build the injection table in one columnar pass, EMPTY wells removed.
+
+    Args:
+        plate_long (pd.DataFrame): One row per well with Row, Column, Sample and
+            Source Vial, and a 'plate' column for multi-plate studies
+        ms_info (dict): Output of sidebar.ms_info
+        proj_name (str): Project name
+        date_injection (str): Injection date as YYYYMMDD
+        injection_pos_letter (str): Autosampler position letter (R, G or B)
+        injection_vol (str): Injection volume (ul)
+        method_file (str): Instrument method
+        data_path (str): Directory of the raw data
+        plate_id (str): Plate ID used when plate_long has no 'plate' column
+
+    Returns:
+        pd.DataFrame: The input columns followed by Position, Inj Vol,
+        Instrument Method, Path and File Name
+    """
+    injected = (plate_long["Sample"] != EMPTY_WELL_LABEL).to_numpy()
+    wells = plate_long.loc[injected]
+    well = _well_names(wells["Row"].to_numpy(), wells["Column"].to_numpy())
+
+    prefix = "_".join([ms_info["acq_tech"], date_injection, proj_name, ""])
+    if "plate" in wells.columns:
+        plate = pd.Categorical(wells["plate"])
+        plate_prefix = np.array([prefix + str(name) + "_" for name in plate.categories], dtype=object)
+        file_name = plate_prefix[plate.codes] + well
+    else:
+        file_name = prefix + str(plate_id) + "_" + well
+
+    table = {column: wells[column].to_numpy() for column in wells.columns}
+    table.update(
+        {
+            "Position": injection_pos_letter + well,
+            "Inj Vol": injection_vol,
+            "Instrument Method": method_file,
+            "Path": data_path,
+            "File Name": file_name,
+        }
+    )
+    return pd.DataFrame(table, index=wells.index)
@@ -0,0 +1,219 @@
+"""Offline ontology terms for SDRF fields, with prefix search.
+
+``ontology/sdrf_terms.tsv`` is a bundled slice of NCBITaxon, UBERON, EFO,
+MONDO, PATO, CL, PSI-MS, NCIT and UNIMOD: one term per line with the SDRF
+field it fills (organism, organism part, disease, cell type, instrument, ...),
+its accession, name, synonyms and the other keys of its SDRF value (e.g. the
+target and type of a modification, ``TA=M;MT=Variable``).
+
+The TSV is compiled once into a binary index in the temp directory and
+memory-mapped, so every session and worker process of the host shares the
+same read-only pages and nothing is parsed per rerun. The index is a sorted
+array of search keys (names, synonyms, accessions and every word suffix of a
+name, lower case) pointing to their term: a prefix search is a binary search
+for the first key and a scan over the keys that share the prefix, the
+flattened form of a trie.
+
+File layout (little-endian): ``MAGIC``, the number of terms and keys
+(uint32), key offsets, key entries (term id | kind << 24), term offsets, then
+the key bytes and the term records (the TSV line).
+"""
+import bisect
+import functools
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"MSOI0002"
+INDEX_DIR = os.path.join(tempfile.gettempdir(), "ms_planner_ontology")
+TERMS_TSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ontology", "sdrf_terms.tsv")
+
+# Kinds of search keys, best match first
+NAME, SYNONYM, WORD = 0, 1, 2
+# Keys scanned at most per search (short prefixes match many keys)
+MAX_SCAN = 4096
+
+
+class OntologyTerm(NamedTuple):
+    field: str
+    ontology: str
+    accession: str
+    name: str
+    synonyms: Tuple[str, ...]
+    # Other KEY=value pairs of the SDRF value, e.g. 'TA=M;MT=Variable'
+    keys: str = ""
+
+    @property
+    def sdrf_value(self) -> str:
+        """The term as an SDRF comment value, e.g. 'NT=Oxidation;AC=UNIMOD:35;TA=M;MT=Variable'."""
+        value = f"NT={self.name};AC={self.accession}"
+        return f"{value};{self.keys}" if self.keys else value
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def read_terms(path=TERMS_TSV) -> List[OntologyTerm]:
+    terms = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.startswith("#") or not line.strip():
+                continue
+            if line.startswith("field\t"):
+                continue
+            terms.append(_term(line.rstrip("\n")))
+    return terms
+
+
+def _term(record):
+    field, ontology, accession, name, synonyms, keys = record.split("\t")
+    return OntologyTerm(field, ontology, accession, name, tuple(filter(None, synonyms.split("|"))), keys)
+
+
+def _keys(term):
+    name = normalize(term.name)
+    yield name, NAME
+    yield normalize(term.accession), NAME
+    for synonym in term.synonyms:
+        yield normalize(synonym), SYNONYM
+    words = name.split(" ")
+    for i in range(1, len(words)):
+        yield " ".join(words[i:]), WORD
+
+
+def build_index(terms, target):
+    """Write the binary index of ``terms`` to ``target`` atomically."""
+    keys = sorted({(key.encode("utf-8"), kind << 24 | term_id) for term_id, term in enumerate(terms) for key, kind in _keys(term)})
+    key_offsets = np.cumsum([0] + [len(key) for key, _ in keys], dtype="<u4")
+    key_entries = np.array([entry for _, entry in keys], dtype="<u4")
+    records = [
+        "\t".join([term.field, term.ontology, term.accession, term.name, "|".join(term.synonyms), term.keys]).encode("utf-8")
+        for term in terms
+    ]
+    term_offsets = np.cumsum([0] + [len(record) for record in records], dtype="<u4")
+
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(handle, "wb") as tmp:
+        tmp.write(MAGIC + struct.pack("<II", len(terms), len(keys)))
+        for array in (key_offsets, key_entries, term_offsets):
+            tmp.write(array.tobytes())
+        tmp.write(b"".join(key for key, _ in keys))
+        tmp.write(b"".join(records))
+    os.replace(tmp_path, target)
+
+
+class _Keys:
+    """Sequence view of the sorted key bytes, for bisect."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.n_keys
+
+    def __getitem__(self, i):
+        return self.index._key(i)
+
+
+class OntologyIndex:
+    def __init__(self, path):
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an ontology index.")
+        self.n_terms, self.n_keys = struct.unpack_from("<II", self._map, len(MAGIC))
+        offset = len(MAGIC) + 8
+        # Views on the mapped file, nothing is copied
+        self._key_offsets = np.frombuffer(self._map, dtype="<u4", count=self.n_keys + 1, offset=offset)
+        offset += 4 * (self.n_keys + 1)
+        self._key_entries = np.frombuffer(self._map, dtype="<u4", count=self.n_keys, offset=offset)
+        offset += 4 * self.n_keys
+        self._term_offsets = np.frombuffer(self._map, dtype="<u4", count=self.n_terms + 1, offset=offset)
+        offset += 4 * (self.n_terms + 1)
+        self._keys_start = offset
+        self._terms_start = offset + int(self._key_offsets[-1])
+        self._fields = None
+
+    def __len__(self):
+        return self.n_terms
+
+    def _key(self, i) -> bytes:
+        start = self._keys_start + int(self._key_offsets[i])
+        return self._map[start:self._keys_start + int(self._key_offsets[i + 1])]
+
+    def term(self, term_id) -> OntologyTerm:
+        start = self._terms_start + int(self._term_offsets[term_id])
+        return _term(self._map[start:self._terms_start + int(self._term_offsets[term_id + 1])].decode("utf-8"))
+
+    def search(self, prefix: str, field: Optional[str] = None, limit: int = 10) -> List[OntologyTerm]:
+        """
+        Terms with a name, synonym, accession or name word starting with ``prefix``.
+
+        Args:
+            prefix (str): Typed text, case-insensitive
+            field (str): Only terms of this SDRF field, e.g. 'disease'
+            limit (int): Maximum number of terms
+
+        Returns:
+            list: OntologyTerm, exact matches first, then name, synonym and
+            word matches, shorter names first
+        """
+        query = normalize(prefix).encode("utf-8")
+        if not query:
+            return []
+        best = {}
+        i = bisect.bisect_left(_Keys(self), query)
+        for i in range(i, min(i + MAX_SCAN, self.n_keys)):
+            key = self._key(i)
+            if not key.startswith(query):
+                break
+            entry = int(self._key_entries[i])
+            term_id, kind = entry & 0xFFFFFF, entry >> 24
+            rank = (key != query, kind)
+            if term_id not in best or rank < best[term_id][0]:
+                best[term_id] = (rank, key)
+        terms = [(rank, self.term(term_id)) for term_id, (rank, _) in best.items()]
+        if field is not None:
+            terms = [(rank, term) for rank, term in terms if term.field == field]
+        terms.sort(key=lambda item: (item[0], len(item[1].name), item[1].name))
+        return [term for _, term in terms[:limit]]
+
+    def lookup(self, accession: str) -> Optional[OntologyTerm]:
+        """Term of an accession, e.g. 'MS:1001251', or None."""
+        query = normalize(accession)
+        for term in self.search(query, limit=self.n_terms):
+            if normalize(term.accession) == query:
+                return term
+        return None
+
+    def fields(self) -> List[str]:
+        """SDRF fields that have terms, e.g. 'disease'."""
+        if self._fields is None:
+            self._fields = list(dict.fromkeys(self.term(i).field for i in range(self.n_terms)))
+        return self._fields
+
+    def terms(self, field: str) -> List[OntologyTerm]:
+        """All terms of an SDRF field, in file order."""
+        return [term for term in map(self.term, range(self.n_terms)) if term.field == field]
+
+
+@functools.lru_cache(maxsize=None)
+def ontology_index(tsv_path=TERMS_TSV) -> OntologyIndex:
+    """
+    The index of the bundled terms, built on first use and memory-mapped once
+    per process (shared by all sessions).
+    """
+    with open(tsv_path, "rb") as handle:
+        digest = hashlib.sha1(MAGIC + handle.read()).hexdigest()[:16]
+    path = os.path.join(INDEX_DIR, f"sdrf_terms-{digest}.idx")
+    if not os.path.exists(path):
+        build_index(read_terms(tsv_path), path)
+    return OntologyIndex(path)
@@ -0,0 +1,87 @@
+"""Memoized pipeline steps shared between the tabs.
+
+Streamlit reruns ``web.py`` top to bottom on every interaction, so every tab
+body runs even if the changed widget belongs to another tab. The expensive
+part of each tab is declared as a step with its inputs, and steps form a small
+dependency graph:
+
+    plate -> order -> chronos -> chronos_export
+                   -> sdrf -> sdrf_export -> skyline
+    study
+
+``run_step`` recomputes a step only if the fingerprint of its inputs or of one
+of its upstream steps changed. Otherwise the output stored in
+``st.session_state`` by an earlier rerun is returned.
+
+The fingerprints are content hashes, so they are the same in every session.
+The exports (``DISK_CACHED_STEPS``) are also looked up under their
+fingerprint in the on-disk ``ARTIFACT_CACHE`` before they are built, which
+serves a file generated by another session, worker process or before a
+restart.
+
+Outputs are kept in compact form (``func/compact_frame.py``): the tables of
+every session cost memory per distinct value rather than per cell, and a
+reused output is materialized as new DataFrames, which the tabs may modify.
+"""
+import streamlit as st
+
+from func.artifact_cache import ARTIFACT_CACHE, artifact_key, fingerprint
+from func.compact_frame import compact, expand
+
+STEP_DEPENDENCIES = {
+    "plate": [],
+    "order": ["plate"],
+    "chronos": ["order"],
+    "chronos_export": ["chronos"],
+    "sdrf": ["order"],
+    "sdrf_export": ["sdrf"],
+    "skyline": ["sdrf_export"],
+    "study": [],
+}
+
+# Steps whose output is text/bytes, shared through the artifact cache
+DISK_CACHED_STEPS = {"chronos_export", "sdrf_export", "study"}
+
+
+def run_step(name, compute, **inputs):
+    """
+    Return ``compute(**inputs)``, reusing the previous result when nothing changed.
+
+    Inputs named after an upstream step of ``name`` are derived from that step's
+    output; they are not hashed, the upstream fingerprint stands for them.
+    """
+    store = st.session_state.setdefault("pipeline_steps", {})
+    stats = st.session_state.setdefault("pipeline_stats", {})
+    upstream = STEP_DEPENDENCIES[name]
+
+    own_inputs = {key: value for key, value in inputs.items() if key not in upstream}
+    upstream_keys = [store[step][0] if step in store else None for step in upstream]
+    key = fingerprint([own_inputs, upstream_keys])
+
+    if name in store and store[name][0] == key:
+        stats[name] = "reused"
+        return expand(store[name][1])
+
+    if name in DISK_CACHED_STEPS:
+        output, hit = ARTIFACT_CACHE.get_or_build(artifact_key(name, key), lambda: compute(**inputs))
+    else:
+        output, hit = compute(**inputs), False
+    store[name] = (key, compact(output))
+    stats[name] = "disk cache" if hit else "recomputed"
+    return output
+
+
+def stored_output(name):
+    """
+    Output of step ``name`` from the last run (in compact form), None if it never ran.
+
+    A tab drawn before the step runs in a rerun sees the output of the previous
+    rerun, which may belong to other inputs; the caller checks that it fits.
+    """
+    store = st.session_state.get("pipeline_steps", {})
+    return store[name][1] if name in store else None
+
+
+def pipeline_stats() -> dict:
+    """Whether each step was recomputed, reused or read from the disk cache in the last run."""
+    return dict(st.session_state.get("pipeline_stats", {}))
@@ -0,0 +1,61 @@
+"""Plate geometry.
+
+A ``PlateGeometry`` describes the rows and columns of a microplate and the
+well naming used across the app (rows A..Z, then AA, AB, ... as on 1536-well
+plates; columns 1..N). Names are stored as NumPy arrays so that layouts of any
+size can be mapped between well names and indices without Python loops.
+"""
+from dataclasses import dataclass
+from functools import cached_property
+from string import ascii_uppercase
+
+import numpy as np
+
+
+def _row_name(index: int) -> str:
+    # 0 -> A, 25 -> Z, 26 -> AA, 31 -> AF
+    if index < len(ascii_uppercase):
+        return ascii_uppercase[index]
+    return ascii_uppercase[index // len(ascii_uppercase) - 1] + ascii_uppercase[index % len(ascii_uppercase)]
+
+
+@dataclass(frozen=True)
+class PlateGeometry:
+    n_rows: int
+    n_columns: int
+
+    @property
+    def n_wells(self) -> int:
+        return self.n_rows * self.n_columns
+
+    @property
+    def name(self) -> str:
+        return f"{self.n_wells}-well"
+
+    @cached_property
+    def row_names(self) -> np.ndarray:
+        return np.array([_row_name(i) for i in range(self.n_rows)])
+
+    @cached_property
+    def column_names(self) -> np.ndarray:
+        return np.arange(1, self.n_columns + 1).astype(str)
+
+    @cached_property
+    def row_index(self) -> dict:
+        return {name: i for i, name in enumerate(self.row_names)}
+
+    @cached_property
+    def well_names(self) -> np.ndarray:
+        """Well names such as 'A1' as an (n_rows, n_columns) array."""
+        return np.char.add(self.row_names[:, None], self.column_names[None, :])
+
+    def vial_numbers(self) -> np.ndarray:
+        """Row-major 1-based vial numbers, as used for Chronos 'Source Vial'."""
+        return np.arange(1, self.n_wells + 1)
+
+
+PLATE_96 = PlateGeometry(8, 12)
+PLATE_384 = PlateGeometry(16, 24)
+PLATE_1536 = PlateGeometry(32, 48)
+
+PLATE_GEOMETRIES = {geometry.name: geometry for geometry in (PLATE_96, PLATE_384, PLATE_1536)}
@@ -0,0 +1,40 @@
+"""Plate layout from the annotation text, without any Streamlit call.
+
+Parser warnings are returned with the parsed annotation; the caller decides
+how to show them (``st.warning`` in the app, stderr in the CLI).
+"""
+import numpy as np
+import pandas as pd
+
+from func.plate_geometry import PLATE_96
+from func.plate_parser import fill_label_grid, parse_plate_text
+
+
+def create_plate_df_long(plate_df):
+    long_format = plate_df.stack().reset_index()
+    long_format.columns = ['Row', 'Column', 'Sample']
+    return long_format
+
+
+def process_plate_positions(text_input, sample_name, geometry=PLATE_96):
+    """
+    Process plate positions from text input and create a plate DataFrame.
+
+    Args:
+        text_input (str): Text area input with position specifications
+        sample_name (str): Default sample name to fill the plate
+        geometry (PlateGeometry): Plate format, 96-well by default
+
+    Returns:
+        tuple: (plate_df, annotation) - DataFrame and parsed PlateAnnotation,
+        whose ``warnings`` hold the messages for the user
+    """
+    # Parse the whole text in one pass
+    annotation = parse_plate_text(text_input, geometry)
+
+    # Fill an integer-coded grid and map codes back to labels
+    codes, names = fill_label_grid(annotation, sample_name)
+    data = np.asarray(names, dtype=object)[codes]
+    plate_df = pd.DataFrame(data, columns=geometry.column_names, index=geometry.row_names)
+
+    return plate_df, annotation
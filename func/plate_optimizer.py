@@ -0,0 +1,294 @@
+"""Covariate-balanced assignment of samples to plates and wells.
+
+A sample manifest (CSV/TSV) has one row per sample: an ID column and covariate
+columns such as sex, age group or case/control. The optimizer places the
+samples on ``n_plates`` plates so that no covariate is confounded with the
+plate, the row or the column:
+
+- every covariate is categorical (numeric columns with many values are cut
+  into quantile bins); unused wells count as one more level, so they are spread
+  out as well;
+- the imbalance score is the chi-square statistic of every covariate against
+  every position factor (plate, row, column), read from flat count tables;
+- simulated annealing proposes batches of well swaps, scores the whole batch
+  with array operations from the four count cells a swap changes, and applies
+  the first swap the Metropolis criterion accepts;
+- independent restarts run in a process pool within a time budget and the best
+  assignment is kept.
+
+The result is written in the Plate Design annotation format (one plate) or as a
+study manifest (several plates), so the rest of the app is unchanged.
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from func.plate_geometry import PLATE_96, PlateGeometry
+from func.plate_parser import FORBIDDEN_LABEL_CHARS
+
+EMPTY_WELL_LABEL = "EMPTY"
+# Swaps scored at once
+BATCH_SIZE = 64
+
+
+def read_sample_manifest(manifest) -> pd.DataFrame:
+    """Read a CSV/TSV sample manifest (path or file-like), the separator is detected."""
+    manifest_df = pd.read_csv(manifest, sep=None, engine="python", dtype=str, keep_default_na=False)
+    manifest_df.columns = manifest_df.columns.str.strip()
+    return manifest_df
+
+
+def encode_covariates(manifest_df, covariates, n_bins=4):
+    """
+    Integer-code the covariates of every sample.
+
+    Numeric columns with more than ``2 * n_bins`` distinct values are cut into
+    ``n_bins`` quantile bins, everything else is used as categories.
+
+    Returns:
+        tuple: (codes, n_levels) - int array (n_samples, n_covariates) and the
+        number of levels of every covariate
+    """
+    codes = np.empty((manifest_df.shape[0], len(covariates)), dtype=np.int64)
+    n_levels = []
+    for i, column in enumerate(covariates):
+        values = manifest_df[column]
+        numeric = pd.to_numeric(values, errors="coerce")
+        if numeric.notna().all() and numeric.nunique() > 2 * n_bins:
+            values = pd.qcut(numeric, n_bins, labels=False, duplicates="drop")
+        categorical = pd.Categorical(values)
+        codes[:, i] = categorical.codes
+        n_levels.append(len(categorical.categories))
+    return codes, n_levels
+
+
+def _position_factors(n_plates, geometry):
+    """Plate, row and column of every well of every plate, shape (3, n_slots)."""
+    slot = np.arange(n_plates * geometry.n_wells)
+    well = slot % geometry.n_wells
+    factors = np.stack([slot // geometry.n_wells, well // geometry.n_columns, well % geometry.n_columns])
+    return factors, [n_plates, geometry.n_rows, geometry.n_columns]
+
+
+class _Tables:
+    """Flat count tables of every (position factor, covariate) pair."""
+
+    def __init__(self, factors, factor_levels, slot_codes, covariate_levels):
+        pairs = [(f, c) for f in range(len(factor_levels)) for c in range(len(covariate_levels))]
+        sizes = [factor_levels[f] * covariate_levels[c] for f, c in pairs]
+        self.factor = np.array([f for f, _ in pairs])
+        self.covariate = np.array([c for _, c in pairs])
+        self.width = np.array([covariate_levels[c] for _, c in pairs])[:, None]
+        self.base = np.concatenate([[0], np.cumsum(sizes)[:-1]])[:, None]
+        self.factors = factors
+
+        # Expected count of a cell: wells in the factor level x overall share of the covariate level
+        cells = self.cells(np.arange(factors.shape[1]), slot_codes)
+        observed = np.bincount(cells.ravel(), minlength=sum(sizes)).astype(np.float64)
+        expected = np.zeros_like(observed)
+        for p, (f, c) in enumerate(pairs):
+            level_size = np.bincount(factors[f], minlength=factor_levels[f])
+            share = np.bincount(slot_codes[c], minlength=covariate_levels[c]) / factors.shape[1]
+            expected[self.base[p, 0] : self.base[p, 0] + sizes[p]] = np.outer(level_size, share).ravel()
+        # Cells that can only ever be 0 do not contribute
+        self.inverse_expected = np.divide(1.0, expected, out=np.zeros_like(expected), where=expected > 0)
+        self.deviation = observed - expected
+
+    def cells(self, slots, slot_codes, codes_of=None):
+        """Flat cell of ``slots`` for every pair, with the codes of ``codes_of`` slots."""
+        codes_of = slots if codes_of is None else codes_of
+        return self.base + self.factors[self.factor][:, slots] * self.width + slot_codes[self.covariate][:, codes_of]
+
+    def score(self):
+        return float(np.sum(self.deviation**2 * self.inverse_expected))
+
+    def swap_deltas(self, first, second, slot_codes):
+        """Score change of swapping the contents of ``first[i]`` and ``second[i]``."""
+        removed = [self.cells(first, slot_codes), self.cells(second, slot_codes)]
+        added = [self.cells(first, slot_codes, second), self.cells(second, slot_codes, first)]
+        # A swap within one factor level or between equal codes leaves the pair unchanged
+        changed = (removed[0] != added[0]) & (removed[0] != added[1])
+        delta = np.zeros(removed[0].shape)
+        for cells, step in ((removed, -1.0), (added, 1.0)):
+            for cell in cells:
+                delta += (2 * step * self.deviation[cell] + 1) * self.inverse_expected[cell]
+        return np.sum(np.where(changed, delta, 0.0), axis=0)
+
+    def apply_swap(self, first, second, slot_codes):
+        for cell, step in (
+            (self.cells(first, slot_codes), -1.0),
+            (self.cells(second, slot_codes), -1.0),
+            (self.cells(first, slot_codes, second), 1.0),
+            (self.cells(second, slot_codes, first), 1.0),
+        ):
+            np.add.at(self.deviation, cell.ravel(), step)
+
+
+def _anneal(task):
+    """One annealing run: returns (score, sample of every slot, proposals)."""
+    sample_codes, covariate_levels, n_plates, geometry, time_budget, seed = task
+    rng = np.random.default_rng(seed)
+    factors, factor_levels = _position_factors(n_plates, geometry)
+    n_slots, n_samples = factors.shape[1], sample_codes.shape[0]
+
+    # Random start; slots without a sample get one extra 'empty' level
+    content = np.full(n_slots, -1, dtype=np.int64)
+    content[rng.permutation(n_slots)[:n_samples]] = np.arange(n_samples)
+    levels = [n + 1 for n in covariate_levels]
+    slot_codes = np.where(content >= 0, sample_codes[content].T, np.array(covariate_levels)[:, None])
+    tables = _Tables(factors, factor_levels, slot_codes, levels)
+
+    score = tables.score()
+    best_score, best_content = score, content.copy()
+    start = time.perf_counter()
+    temperature0 = None
+    proposals = 0
+    while True:
+        elapsed = (time.perf_counter() - start) / time_budget
+        if elapsed >= 1:
+            break
+        for _ in range(16):
+            first = rng.integers(0, n_slots, BATCH_SIZE)
+            second = rng.integers(0, n_slots, BATCH_SIZE)
+            delta = tables.swap_deltas(first, second, slot_codes)
+            proposals += BATCH_SIZE
+            if temperature0 is None:
+                worse = delta[delta > 1e-12]
+                temperature0 = float(worse.mean()) if worse.size else 1.0
+            # Geometric cooling over the time budget
+            temperature = temperature0 * 1e-4**elapsed
+            accept = np.nonzero(
+                (delta < 0) | (rng.random(BATCH_SIZE) < np.exp(-np.maximum(delta, 0) / temperature))
+            )[0]
+            accept = accept[first[accept] != second[accept]]
+            if accept.size == 0:
+                continue
+            i = accept[0]
+            a, b = first[i : i + 1], second[i : i + 1]
+            tables.apply_swap(a, b, slot_codes)
+            content[[a[0], b[0]]] = content[[b[0], a[0]]]
+            slot_codes[:, [a[0], b[0]]] = slot_codes[:, [b[0], a[0]]]
+            score += delta[i]
+        if score < best_score - 1e-9:
+            best_score, best_content = score, content.copy()
+
+    if score < best_score:
+        best_score, best_content = score, content.copy()
+    return tables_score(best_content, sample_codes, covariate_levels, n_plates, geometry), best_content, proposals
+
+
+def tables_score(content, sample_codes, covariate_levels, n_plates, geometry=PLATE_96):
+    """Imbalance score (summed chi-square) of an assignment, computed from scratch."""
+    factors, factor_levels = _position_factors(n_plates, geometry)
+    slot_codes = np.where(content >= 0, sample_codes[content].T, np.array(covariate_levels)[:, None])
+    return _Tables(factors, factor_levels, slot_codes, [n + 1 for n in covariate_levels]).score()
+
+
+@dataclass
+class PlateAssignment:
+    sample_ids: List[str]
+    # Sample index of every well of every plate, -1 for unused wells
+    content: np.ndarray
+    n_plates: int
+    geometry: PlateGeometry
+    score: float
+    initial_score: float
+    proposals: int
+
+    def annotation_text(self, plate: int = 0) -> str:
+        """Plate Design annotation: one 'SampleID;Well' line per sample, unused wells EMPTY."""
+        n_wells = self.geometry.n_wells
+        content = self.content[plate * n_wells : (plate + 1) * n_wells]
+        well_names = self.geometry.well_names.ravel()
+        used = content >= 0
+        sample_ids = np.asarray(self.sample_ids, dtype=object)[content[used]]
+        lines = [f"{sample_id};{well}" for sample_id, well in zip(sample_ids, well_names[used])]
+        if not used.all():
+            lines.append(f"{EMPTY_WELL_LABEL};" + ",".join(well_names[~used]))
+        return "\n".join(lines)
+
+    def study_manifest(self, plate_ids, sample_name) -> pd.DataFrame:
+        """Study manifest (plate_id, sample_name, annotation) of all plates."""
+        return pd.DataFrame(
+            {
+                "plate_id": list(plate_ids),
+                "sample_name": sample_name,
+                "annotation": [self.annotation_text(plate) for plate in range(self.n_plates)],
+            }
+        )
+
+
+def optimize_plate_assignment(
+    manifest_df,
+    id_column,
+    covariates,
+    geometry: PlateGeometry = PLATE_96,
+    n_plates=None,
+    time_budget=5.0,
+    n_restarts=4,
+    seed=None,
+    max_workers=None,
+) -> PlateAssignment:
+    """
+    Place the samples of a manifest on plates with balanced covariates.
+
+    Args:
+        manifest_df (pd.DataFrame): One row per sample
+        id_column (str): Column with the sample IDs, used as well labels
+        covariates (list): Columns to balance against plate, row and column
+        geometry (PlateGeometry): Plate format
+        n_plates (int): Number of plates, by default as few as fit the samples
+        time_budget (float): Seconds per restart
+        n_restarts (int): Independent annealing runs, the best one is kept
+        seed (int): Random seed
+        max_workers (int): Processes for the restarts (1: run in this process)
+
+    Returns:
+        PlateAssignment: The best assignment found
+    """
+    sample_ids = manifest_df[id_column].astype(str).str.strip()
+    bad = sample_ids[
+        sample_ids.eq("") | sample_ids.str.contains("[" + "".join("\\" + c for c in FORBIDDEN_LABEL_CHARS + ";,") + "]")
+    ]
+    if not bad.empty:
+        raise ValueError(f"Sample IDs cannot be used as labels: {', '.join(bad.iloc[:5])}")
+    if sample_ids.duplicated().any():
+        raise ValueError(f"Duplicated sample IDs: {', '.join(sample_ids[sample_ids.duplicated()].iloc[:5])}")
+
+    n_samples = sample_ids.shape[0]
+    min_plates = max(1, math.ceil(n_samples / geometry.n_wells))
+    n_plates = min_plates if n_plates is None else int(n_plates)
+    if n_plates < min_plates:
+        raise ValueError(f"{n_samples} samples need at least {min_plates} plates of {geometry.name}")
+
+    sample_codes, covariate_levels = encode_covariates(manifest_df, list(covariates))
+    seeds = np.random.SeedSequence(seed).spawn(n_restarts)
+    tasks = [(sample_codes, covariate_levels, n_plates, geometry, time_budget, s) for s in seeds]
+
+    max_workers = min(n_restarts, max_workers or os.cpu_count() or 1)
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_anneal, tasks))
+    else:
+        results = [_anneal(task) for task in tasks]
+
+    score, content, _ = min(results, key=lambda result: result[0])
+    # Baseline: a plain random placement
+    rng = np.random.default_rng(seed)
+    random_content = np.full(n_plates * geometry.n_wells, -1, dtype=np.int64)
+    random_content[rng.permutation(random_content.shape[0])[:n_samples]] = np.arange(n_samples)
+    return PlateAssignment(
+        sample_ids=sample_ids.tolist(),
+        content=content,
+        n_plates=n_plates,
+        geometry=geometry,
+        score=score,
+        initial_score=tables_score(random_content, sample_codes, covariate_levels, n_plates, geometry),
+        proposals=sum(result[2] for result in results),
+    )
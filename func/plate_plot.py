@@ -1,214 +1,119 @@
-import pandas as pd
+import io
+
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
 import streamlit as st
 
+from func.plate_layout import create_plate_df_long
+from func.render_cache import RenderCache, content_key
 
-def create_plate_df_long(plate_df): 
-    long_format = plate_df.stack().reset_index()
-    long_format.columns = ['Row', 'Column', 'Sample']
-    return long_format
+# Rendered plots (PNG/SVG bytes) shared by all sessions, keyed on the layout hash
+PLOT_CACHE = RenderCache(max_entries=32)
 
-def plate_dfplot(plate_df, plate_id): 
 
-    
-    # format plate_df in a long format
-    plate_df_long = create_plate_df_long(plate_df)
-    
-    # Get unique labels sorted alphabetically
-    unique_labels = sorted(plate_df_long['Sample'].unique())
+def _figure_bytes(fig, fmt):
+    import matplotlib.pyplot as plt
 
-    # Create a custom palette with colors mapped to labels alphabetically
-    custom_palette = dict(zip(unique_labels, sns.color_palette("colorblind", len(unique_labels))))
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=200, bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
 
-    
-    fig, ax = plt.subplots()
-    # Create a color palette for discrete text
+def render_plate_figures(plate_df, plate_id, palette="colorblind", fmt="png"):
+    """
+    Render the plate map and the label count plot.
 
-    # Plot the heatmap with discrete text colors
-    sns.heatmap(plate_df.isnull(), cbar=False, cmap="coolwarm", ax=ax, linewidths=1, linecolor='darkgrey', alpha=0.1)
-    ax.xaxis.tick_top()  # Move the x-axis labels to the top
-    ax.set_yticklabels(ax.get_yticklabels(), rotation=0)  # Fix label rotation on y-axis
-    ax.set_title(plate_id)  # Add title on top
+    The wells are drawn as one EllipseCollection colored from the integer
+    label codes, so the number of artists does not grow with the plate size.
+    Well labels are written only if they fit in a well, otherwise a legend is
+    shown instead.
 
-    # Add text annotations and circles with custom colors
-    for i in range(plate_df.shape[0]):
-        for j in range(plate_df.shape[1]):
-            value = plate_df.iloc[i, j]
-            color = custom_palette.get(value, (1, 1, 1))  # Use custom_palette for colors
-            ax.add_patch(plt.Circle((j + 0.5, i + 0.5), 0.4, color=color, fill=True))
-            ax.text(j + 0.5, i + 0.5, f'{value}', ha='center', va='center', color='white', fontsize=4)
+    Returns:
+        tuple: (plate_bytes, count_bytes) - both figures encoded as ``fmt``
+    """
+    # matplotlib and seaborn are only loaded when a plot is actually drawn,
+    # cached layouts and the other tabs do not need them
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.collections import EllipseCollection
+    from matplotlib.patches import Patch
+
+    n_rows, n_cols = plate_df.shape
+
+    # Labels sorted alphabetically and the integer code of every well
+    unique_labels, codes = np.unique(plate_df.to_numpy().astype(str), return_inverse=True)
+    codes = codes.reshape(n_rows, n_cols)
+    colors = np.asarray(sns.color_palette(palette, len(unique_labels)))
+
+    # Grow the figure with the plate size, relative to a 96-well plate
+    scale = (n_cols / 12) ** 0.5
+    fig, ax = plt.subplots(figsize=(6.4 * scale, 4.8 * scale))
+
+    x, y = np.meshgrid(np.arange(n_cols) + 0.5, np.arange(n_rows) + 0.5)
+    ax.add_collection(
+        EllipseCollection(
+            widths=0.8,
+            heights=0.8,
+            angles=0,
+            units="xy",
+            offsets=np.column_stack([x.ravel(), y.ravel()]),
+            offset_transform=ax.transData,
+            facecolors=colors[codes.ravel()],
+        )
+    )
 
-    ax.set_yticklabels(plate_df.index, rotation=0)
+    # Grid, ticks on top and rows from top to bottom like the plate
+    ax.set_xlim(0, n_cols)
+    ax.set_ylim(n_rows, 0)
+    ax.set_aspect("equal")
+    ax.set_xticks(np.arange(n_cols) + 0.5, plate_df.columns)
+    ax.set_yticks(np.arange(n_rows) + 0.5, plate_df.index, rotation=0)
+    ax.set_xticks(np.arange(n_cols + 1), minor=True)
+    ax.set_yticks(np.arange(n_rows + 1), minor=True)
+    ax.grid(which="minor", color="darkgrey", linewidth=1, alpha=0.5)
+    ax.tick_params(which="both", length=0, labelsize=10 / scale)
+    ax.xaxis.tick_top()
+    ax.set_title(plate_id)  # Add title on top
 
-    # Display the plot
-    st.pyplot(fig)
-    
-    # Plot barplot from labels of plate_df_long['Sample']
+    # Write labels in the wells only if they fit, otherwise add a legend
+    fontsize = 4 / scale
+    cell_points = fig.get_figwidth() * 72 * ax.get_position().width / n_cols
+    longest_label = max(len(label) for label in unique_labels)
+    if fontsize >= 2.5 and 0.6 * fontsize * longest_label <= 0.8 * cell_points:
+        for i, j in np.ndindex(n_rows, n_cols):
+            ax.text(j + 0.5, i + 0.5, unique_labels[codes[i, j]], ha='center', va='center', color='white', fontsize=fontsize)
+    else:
+        handles = [Patch(color=color, label=label) for label, color in zip(unique_labels, colors)]
+        ax.legend(handles=handles, loc="upper left", bbox_to_anchor=(1.01, 1), frameon=False)
+
+    # Bar plot of label counts, ordered by count
+    counts = np.bincount(codes.ravel(), minlength=len(unique_labels))
+    order = np.argsort(-counts, kind="stable")
     fig2, ax2 = plt.subplots()
-    sns.countplot(
-        data=plate_df_long, 
-        x='Sample', 
-        ax=ax2, 
-        order=plate_df_long['Sample'].value_counts().index,  # Reorder by count
-        palette=custom_palette  # Apply the custom palette
-    )
+    bars = ax2.bar(unique_labels[order], counts[order], color=colors[order])
+    ax2.bar_label(bars, fontsize=10, color='black')
     ax2.set_title(f"Sample count in plate {plate_id}")
     ax2.set_xlabel(None)
     ax2.set_ylabel("Count")
 
-    # Add count numbers on top of the bars
-    for p in ax2.patches:
-        ax2.text(
-            p.get_x() + p.get_width() / 2.,  # X-coordinate (center of the bar)
-            p.get_height() + 1,           # Y-coordinate (slightly above the bar)
-            int(p.get_height()),            # Text (bar height)
-            ha='center', va='center', fontsize=10, color='black'  # Text alignment and styling
-        )
+    return _figure_bytes(fig, fmt), _figure_bytes(fig2, fmt)
 
-    # Display the plot
-    st.pyplot(fig2)
-    
-    # Return the plate_df_long for use in other parts
-    return plate_df_long
+def plate_figures(plate_df, plate_id, palette="colorblind", fmt="png"):
+    """Plate map and label count figures, rendered only if the layout changed."""
+    key = content_key(plate_df, plate_id, palette, fmt)
+    return PLOT_CACHE.get_or_render(
+        key, lambda: render_plate_figures(plate_df, plate_id, palette, fmt)
+    )
 
-def process_plate_positions(text_input, sample_name):
-    """
-    Process plate positions from text input and create a plate DataFrame.
-    
-    Args:
-        text_input (str): Text area input with position specifications
-        sample_name (str): Default sample name to fill the plate
-    
-    Returns:
-        tuple: (plate_df, replace_pos) - DataFrame and processed position list
-    """
+def plate_dfplot(plate_df, plate_id, palette="colorblind"):
+    """Display the plate plots, rendering them only if the layout changed."""
+    # format plate_df in a long format
+    plate_df_long = create_plate_df_long(plate_df)
+
+    plate_png, count_png = plate_figures(plate_df, plate_id, palette)
 
-    # Split text and clean empty lines
-    replace_pos = text_input.split('\n')
-    
-    # Remove empty lines
-    replace_pos = [item for item in replace_pos if item.strip() != '']
-
-    # Write warning message if replace_pos does not have ; as one special character
-    # Allow comma-separated positions (e.g. Sample1;A1,A3,A5), so do not treat ',' as invalid.
-    for item in replace_pos:
-        if (
-            ';' not in item
-            or item.count(';') != 1
-            or any(
-                char in item
-                for char in [
-                    '?',
-                    '!',
-                    '@',
-                    '#',
-                    '$',
-                    '%',
-                    '^',
-                    '&',
-                    '*',
-                    '(',
-                    ')',
-                    '+',
-                    '=',
-                    '{',
-                    '}',
-                    '[',
-                    ']',
-                    '|',
-                    '\\',
-                    ':',
-                    '"',
-                    "'",
-                    '<',
-                    '>',
-                    '.',
-                    '/',
-                    '~',
-                    '`',
-                ]
-            )
-        ):
-            st.warning(f"Invalid format: {item}. It should be like 'Cohort_2;Col8'.")
-            break
-    
-    # Filter row in text that contain 'Col' or 'Row' in replace_pos
-    colrow_label = [item for item in replace_pos if ('Col' in item or 'Row' in item)]
-    
-    # Remove row with 'Col' or 'Row in replace_pos
-    replace_pos = [item for item in replace_pos if not ('Col' in item or 'Row' in item)]
-    
-    ## Work with Col and Row
-    # Check Col and Row then append to replace pos each well
-    for item in colrow_label:
-        if ';' in item:
-            text, pos = item.split(';')
-            # Check if pos is Row and followed by A-H or Col and followed by 1-12
-            if pos.startswith('Row') and len(pos) == 4 and pos[-1] in 'ABCDEFGH':
-                for number in range(1,13):
-                    # Change replace_pos by prepend text + ';' + pos[-1] + str(number) before replace_pos
-                    replace_pos.insert(0, text + ';' + pos[-1] + str(number))
-            elif pos.startswith('Col') and 4 <=len(pos) <= 5 and pos[3:].isdigit() and 1 <= int(pos[3:]) <= 12:
-                for letter in 'ABCDEFGH':
-                    replace_pos.insert(0, text + ';' + letter + pos[3:])
-            else:
-                st.warning(f"Invalid position format: {item}. It should be like 'Cohort_2;RowA' or 'Cohort_2;Col8'.")
-        else:
-            st.warning(f"Invalid format: {item}. It should be like 'Cohort_2;Col8'.")
-
-    # Expand entries with multiple comma-separated positions, e.g. "Sample1;A1,A3,A5"
-    expanded_replace_pos = []
-    for item in replace_pos:
-        if ';' in item:
-            text, pos = item.split(';')
-            # Split by comma to allow multiple positions
-            pos_parts = [p.strip() for p in pos.split(',') if p.strip() != '']
-            if len(pos_parts) > 1:
-                # Validate each individual position (e.g. A1, B12)
-                for p in pos_parts:
-                    if (
-                        len(p) >= 2
-                        and p[0] in 'ABCDEFGH'
-                        and p[1:].isdigit()
-                        and 1 <= int(p[1:]) <= 12
-                    ):
-                        expanded_replace_pos.append(f"{text};{p}")
-                    else:
-                        st.warning(
-                            f"Invalid position format: {text};{p}. It should be like 'Sample1;A1'."
-                        )
-            else:
-                expanded_replace_pos.append(item)
-        else:
-            expanded_replace_pos.append(item)
-
-    replace_pos = expanded_replace_pos
-
-    # Write a warning message if the position is mentioned more than one time in text area
-    if len(replace_pos) != len(set(replace_pos)):
-        st.warning("Some positions are mentioned more than once. Please check your input.")
-
-    # Check if the position is mentioned more than one time
-    pos_list = []
-    for item in list(set(replace_pos)):
-        if ';' in item:
-            text, pos = item.split(';')
-            pos_list.append(pos)
-    if len(pos_list) != len(set(pos_list)):
-        st.warning("Position is mentioned more than one time with different labels. Possibly, using Row or Col. Please check your input.")
-
-    # Ensure the dataframe has 12 columns and 8 rows
-    data = np.resize(sample_name, (8, 12))
-    plate_df = pd.DataFrame(data, columns=[str(i) for i in range(1, 13)], index=list('ABCDEFGH'))
-    
-    # Replace text in the dataframe based on replace_pos
-    for item in replace_pos:
-        if ';' in item:
-            text, pos = item.split(';')
-            row = pos[0]
-            col = int(pos[1:]) - 1
-            plate_df.at[row, str(col + 1)] = text
-    
-    return plate_df, replace_pos
\ No newline at end of file
+    # Display the plots
+    st.image(plate_png)
+    st.image(count_png)
+
+    # Return the plate_df_long for use in other parts
+    return plate_df_long
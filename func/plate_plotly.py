@@ -0,0 +1,128 @@
+"""Interactive plate plots with Plotly.
+
+Alternative to the matplotlib images of ``plate_plot.plate_dfplot``: the plate
+map is a WebGL scatter (one trace per label) and the label counts a bar chart,
+both drawn in the browser. Only the well coordinates, labels and hover data
+are sent instead of a rasterized PNG. Figures are cached as JSON in the shared
+plot cache, keyed on the layout hash.
+"""
+import json
+
+import numpy as np
+import streamlit as st
+
+from func.plate_layout import create_plate_df_long
+from func.plate_plot import PLOT_CACHE
+from func.render_cache import content_key
+
+EMPTY_WELL_LABEL = "EMPTY"
+
+
+def _hex_colors(palette, n):
+    import seaborn as sns
+
+    return [f"#{int(r * 255):02x}{int(g * 255):02x}{int(b * 255):02x}" for r, g, b in sns.color_palette(palette, n)]
+
+
+def plate_plotly_figures(plate_df, plate_id, palette="colorblind", permutation=None):
+    """
+    Build the Plotly plate map and label count figures.
+
+    Hover shows the well, its label and its injection index: the position of
+    the well in the sample order. Without a ``permutation`` (no sample order
+    built yet) it shows the well order instead, the position of the well in
+    row-major order without EMPTY wells.
+
+    Args:
+        plate_df (pd.DataFrame): Plate grid of labels
+        plate_id (str): Plate ID, the plate map title
+        palette (str): Seaborn palette of the labels
+        permutation (np.ndarray): Injection order of the sample order, as
+            positions of the non-EMPTY wells in row-major order
+
+    Returns:
+        tuple: (plate_json, count_json) - both figures serialized as JSON
+    """
+    # Loaded on first use, only needed when the Plotly renderer is selected
+    import plotly.graph_objects as go
+
+    n_rows, n_cols = plate_df.shape
+    unique_labels, codes = np.unique(plate_df.to_numpy().astype(str), return_inverse=True)
+    codes = codes.ravel()
+    colors = _hex_colors(palette, len(unique_labels))
+
+    rows, cols = np.divmod(np.arange(n_rows * n_cols), n_cols)
+    wells = np.char.add(plate_df.index.to_numpy().astype(str)[rows], plate_df.columns.to_numpy().astype(str)[cols])
+    labels = unique_labels[codes]
+    injected = labels != EMPTY_WELL_LABEL
+    order = np.cumsum(injected)
+    order_name = "Well order"
+    if permutation is not None:
+        # Injection index of every injected well
+        injection = np.empty(len(permutation), dtype=np.int64)
+        injection[permutation] = np.arange(1, len(permutation) + 1)
+        order = injection[np.maximum(order - 1, 0)]
+        order_name = "Injection"
+    order = order.astype(str)
+    order[~injected] = "-"
+
+    # Smaller markers for larger plates
+    marker_size = 22 * (12 / n_cols)
+    plate_fig = go.Figure()
+    for code, label in enumerate(unique_labels):
+        mask = codes == code
+        plate_fig.add_trace(
+            go.Scattergl(
+                x=cols[mask] + 1,
+                y=rows[mask],
+                mode="markers",
+                name=label,
+                marker={"size": marker_size, "color": colors[code]},
+                customdata=np.column_stack([wells[mask], order[mask]]),
+                hovertemplate=f"Well %{{customdata[0]}}<br>Label {label}<br>{order_name} %{{customdata[1]}}<extra></extra>",
+            )
+        )
+    plate_fig.update_layout(
+        title=plate_id,
+        height=220 + 28 * n_rows * (12 / n_cols) ** 0.5,
+        margin={"l": 40, "r": 20, "t": 80, "b": 20},
+        plot_bgcolor="white",
+        xaxis={"side": "top", "tickmode": "array", "tickvals": np.arange(1, n_cols + 1), "range": [0.5, n_cols + 0.5]},
+        yaxis={
+            "tickmode": "array",
+            "tickvals": np.arange(n_rows),
+            "ticktext": plate_df.index.to_numpy().astype(str),
+            "range": [n_rows - 0.5, -0.5],
+        },
+    )
+
+    counts = np.bincount(codes, minlength=len(unique_labels))
+    by_count = np.argsort(-counts, kind="stable")
+    count_fig = go.Figure(
+        go.Bar(
+            x=unique_labels[by_count],
+            y=counts[by_count],
+            marker_color=[colors[i] for i in by_count],
+            text=counts[by_count],
+            textposition="outside",
+        )
+    )
+    count_fig.update_layout(title=f"Sample count in plate {plate_id}", yaxis_title="Count", plot_bgcolor="white")
+
+    return plate_fig.to_json(), count_fig.to_json()
+
+
+def plate_plotly_plot(plate_df, plate_id, palette="colorblind", permutation=None):
+    """Display the interactive plate plots, building them only if the layout or the order changed."""
+    plate_df_long = create_plate_df_long(plate_df)
+
+    key = content_key(plate_df, plate_id, palette, "plotly", "-" if permutation is None else permutation)
+    plate_json, count_json = PLOT_CACHE.get_or_render(
+        key, lambda: plate_plotly_figures(plate_df, plate_id, palette, permutation)
+    )
+
+    # Stable keys let the frontend update the existing charts in place
+    st.plotly_chart(json.loads(plate_json), key="plate_map_plotly")
+    st.plotly_chart(json.loads(count_json), key="plate_count_plotly")
+
+    return plate_df_long
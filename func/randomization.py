@@ -0,0 +1,69 @@
+"""Seeded randomization of the injection order.
+
+The order is a permutation of the injection table drawn from an explicit seed,
+so the same layout, seed and constraints always give the same order: the
+Xcalibur queue and the Chronos table share it and a rerun does not reshuffle.
+Permutations are memoized per (labels, seed, block size).
+
+Block randomization spreads every sample group (cohort, pool, control, ...)
+evenly over the run, so each block of ``block_size`` injections (e.g. between
+two washes) holds the groups in about their overall proportion, and then
+shuffles the order within each block.
+"""
+import secrets
+from functools import lru_cache
+
+import numpy as np
+
+
+def new_seed() -> int:
+    """Random seed for a new session."""
+    return secrets.randbelow(2**31)
+
+
+def _spread_groups(codes, rng):
+    """Order in which every group is spaced evenly over the whole run."""
+    n = codes.shape[0]
+    counts = np.bincount(codes)
+    # Shuffle within each group, then place the k-th member of a group of size
+    # c at (k + u) / c, with one random offset u per group
+    grouped = np.lexsort((rng.random(n), codes))
+    first = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.empty(n, dtype=np.float64)
+    rank[grouped] = np.arange(n) - first[codes[grouped]]
+    key = (rank + rng.random(counts.shape[0])[codes]) / counts[codes]
+    # Random tie-break between groups at the same position
+    return np.lexsort((rng.random(n), key))
+
+
+@lru_cache(maxsize=256)
+def _cached_permutation(labels, seed, block_size):
+    rng = np.random.default_rng(seed)
+    n = len(labels)
+    if not block_size:
+        permutation = rng.permutation(n)
+    else:
+        _, codes = np.unique(np.asarray(labels, dtype=object), return_inverse=True)
+        permutation = _spread_groups(codes.ravel(), rng)
+        # Shuffle the injections within each block
+        block = np.arange(n) // block_size
+        permutation = permutation[np.lexsort((rng.random(n), block))]
+    permutation.flags.writeable = False
+    return permutation
+
+
+def injection_permutation(labels, seed, block_size=None):
+    """
+    Seeded random injection order.
+
+    Args:
+        labels (Sequence[str]): Sample group of every injection
+        seed (int): Random seed
+        block_size (int): Balance the groups within consecutive blocks of this
+            many injections; None for a plain shuffle
+
+    Returns:
+        np.ndarray: Read-only permutation, ``table.take(permutation)`` gives the
+        randomized order
+    """
+    return _cached_permutation(tuple(labels), int(seed), block_size)
@@ -0,0 +1,76 @@
+"""Bounded in-process cache for rendered figures.
+
+Streamlit reruns the whole script on every interaction. Rendered figures are
+kept here as bytes, keyed on a hash of what they show, so an unchanged plate
+layout is not drawn again. The cache lives at module level and is therefore
+shared by all sessions of the server process; a lock keeps it consistent
+between session threads.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_key(*parts) -> str:
+    """Stable hash of strings, numbers and string arrays/DataFrames."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if hasattr(part, "to_numpy"):
+            # DataFrame: shape, labels and values
+            digest.update(repr(part.shape).encode())
+            digest.update("\x1f".join(map(str, part.index)).encode())
+            digest.update("\x1f".join(map(str, part.columns)).encode())
+            part = part.to_numpy().ravel()
+        if hasattr(part, "ravel"):
+            part = "\x1f".join(map(str, part.ravel()))
+        digest.update(str(part).encode())
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render):
+        """Return the cached value of ``key`` or store and return ``render()``."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Render outside the lock, other sessions keep being served meanwhile
+        value = render()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            n_bytes = sum(
+                sum(len(item) for item in value) if isinstance(value, tuple) else len(value)
+                for value in self._entries.values()
+            )
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": n_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
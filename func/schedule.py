@@ -0,0 +1,148 @@
+"""Injection schedules: where washes, QCs and blanks go in the Xcalibur queue.
+
+A run is described declaratively by an ``InjectionSchedule``: control blocks
+before the samples (``header``), after them (``footer``) and in between
+(``inserts``), for example
+
+    InjectionSchedule(
+        header=("wash", "qc"),
+        inserts=(
+            Insert("blank", flagged=True),               # after high-abundance samples
+            Insert("wash", every=8, after_last=True),    # after every group of 8
+            Insert("qc", every=24),                      # after every 24th sample
+        ),
+        footer=("qc",),
+    )
+
+Control blocks are named DataFrames with the Xcalibur columns and may hold
+several injections (e.g. QC followed by a wash). ``build_queue`` stacks the
+samples and every control block once, computes the final order as one integer
+index array and takes it in a single step.
+"""
+from typing import NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from func.injection_table import XCALIBUR_COLUMNS
+
+
+class Insert(NamedTuple):
+    # Name of the control block to inject
+    control: str
+    # After every ``every``-th sample that is followed by another sample
+    # (0: not periodic)
+    every: int = 0
+    # After the last sample, closing the last group
+    after_last: bool = False
+    # After every flagged sample (e.g. high-abundance samples)
+    flagged: bool = False
+
+
+class InjectionSchedule(NamedTuple):
+    header: Tuple[str, ...] = ()
+    inserts: Tuple[Insert, ...] = ()
+    footer: Tuple[str, ...] = ()
+
+
+def xcalibur_schedule(acq_tech, include_qc_between=False, wash_every=8, qc_every=0, blank_flagged=False):
+    """
+    Schedule of the Xcalibur tab: wash + QC brackets, a wash after every
+    ``wash_every`` samples (none for SRM/PRM), optionally a QC after every
+    ``qc_every`` samples and a wash as blank after flagged samples.
+
+    Control names: 'wash', 'qc' (QC followed by a wash), 'qc_between_pre' and
+    'qc_between_post'.
+    """
+    inserts = []
+    if blank_flagged:
+        inserts.append(Insert("wash", flagged=True))
+    if wash_every and acq_tech not in ["SRM", "PRM"]:
+        inserts.append(Insert("wash", every=wash_every, after_last=True))
+    if qc_every:
+        inserts.append(Insert("qc", every=qc_every))
+
+    header = ("wash", "qc")
+    footer = ("qc",)
+    if include_qc_between:
+        header = ("qc_between_pre",) + header
+        footer = footer + ("qc_between_post",)
+    return InjectionSchedule(header=header, inserts=tuple(inserts), footer=footer)
+
+
+def schedule_index(n_samples, schedule, block_sizes, flagged=None):
+    """
+    Positions of the queue in the stacked table of samples and control blocks.
+
+    Args:
+        n_samples (int): Number of samples, stacked first at positions 0..n-1
+        schedule (InjectionSchedule): Where the control blocks go
+        block_sizes (dict): Number of rows of every control block; blocks are
+            stacked after the samples in the order of this dict
+        flagged (np.ndarray): Boolean per sample for ``Insert(flagged=True)``
+
+    Returns:
+        np.ndarray: int64 positions, one per queue row
+    """
+    names = list(block_sizes)
+    sizes = np.array([1] + [block_sizes[name] for name in names], dtype=np.int64)
+    starts = np.concatenate([[0], n_samples + np.cumsum(sizes[1:]) - sizes[1:]])
+    event_of = {name: i + 1 for i, name in enumerate(names)}
+
+    # One slot per sample: the sample itself, then every control due after it.
+    # A control named by several rules is injected once.
+    slot_events = list(dict.fromkeys(insert.control for insert in schedule.inserts))
+    due = np.zeros((n_samples, 1 + len(slot_events)), dtype=bool)
+    due[:, 0] = True
+    position = np.arange(1, n_samples + 1)
+    for insert in schedule.inserts:
+        mask = np.zeros(n_samples, dtype=bool)
+        if insert.every:
+            mask |= (position % insert.every == 0) & (position < n_samples)
+        if insert.after_last and n_samples:
+            mask[-1] = True
+        if insert.flagged and flagged is not None:
+            mask |= np.asarray(flagged, dtype=bool)
+        due[:, 1 + slot_events.index(insert.control)] |= mask
+
+    # Events in queue order as (stacked start, length), then expanded at once
+    slot_codes = np.array([0] + [event_of[name] for name in slot_events], dtype=np.int64)
+    header = np.array([event_of[name] for name in schedule.header], dtype=np.int64)
+    footer = np.array([event_of[name] for name in schedule.footer], dtype=np.int64)
+    body_rows, body_cols = np.nonzero(due)
+    event_start = np.concatenate(
+        [starts[header], np.where(body_cols == 0, body_rows, starts[slot_codes[body_cols]]), starts[footer]]
+    )
+    event_length = np.concatenate([sizes[header], sizes[slot_codes[body_cols]], sizes[footer]])
+
+    total = event_length.sum()
+    event_offset = np.cumsum(event_length) - event_length
+    return np.repeat(event_start - event_offset, event_length) + np.arange(total)
+
+
+def build_queue(samples, controls, schedule, flagged=None):
+    """
+    Assemble the Xcalibur queue in a single take.
+
+    Args:
+        samples (pd.DataFrame): Sample injections in injection order
+        controls (dict): Control block name -> DataFrame with the Xcalibur columns
+        schedule (InjectionSchedule): Where the control blocks go
+        flagged (np.ndarray): Boolean per sample, e.g. high-abundance samples
+
+    Returns:
+        pd.DataFrame: The queue with the Xcalibur columns
+    """
+    used = set(schedule.header) | set(schedule.footer) | {insert.control for insert in schedule.inserts}
+    blocks = {name: frame for name, frame in controls.items() if name in used}
+    missing = used - set(blocks)
+    if missing:
+        raise ValueError(f"Injection schedule uses undefined control(s): {', '.join(sorted(missing))}")
+
+    stacked = pd.concat(
+        [samples[XCALIBUR_COLUMNS]] + [frame[XCALIBUR_COLUMNS] for frame in blocks.values()], ignore_index=True
+    )
+    index = schedule_index(
+        samples.shape[0], schedule, {name: frame.shape[0] for name, frame in blocks.items()}, flagged
+    )
+    return stacked.take(index).reset_index(drop=True)
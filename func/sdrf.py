@@ -0,0 +1,60 @@
+"""SDRF table construction.
+
+Builds the SDRF frame from the per-well sample table and the injection file
+names. Used by the SDRF tab for a single plate and by the study mode for many
+plates at once. The columns are declared once in ``func/sdrf_template.py``;
+the study mode writes its TSV from the template without building the frame.
+The Skyline annotations are the characteristics of an SDRF.
+"""
+from func.sdrf_template import render_sdrf_frame, sdrf_headers, sdrf_template
+from func.skyline import skyline_frame
+
+
+def build_sdrf(sample_df, file_names, ms_info, sample_info, ms_file, collision_energy):
+    """
+    Build the SDRF DataFrame.
+
+    Args:
+        sample_df (pd.DataFrame): One row per injected well; every column becomes
+            a characteristics[] column. A 'plate' column overrides the plate ID
+            from sample_info (multi-plate studies).
+        file_names (pd.Series): Injection file names, aligned with sample_df
+        ms_info (dict): Output of sidebar.ms_info
+        sample_info (dict): Output of sidebar.sample_info
+        ms_file (str): Data file extension, e.g. 'raw' or 'mzML'
+        collision_energy (str): Collision energy (NCE)
+
+    Returns:
+        tuple: (sdrf_df, characteristic_columns) - SDRF DataFrame and the names of
+        the characteristics that can be used as factor value
+    """
+    template, characteristic_columns = sdrf_template(
+        sample_df.columns, ms_info, sample_info, ms_file, collision_energy
+    )
+    return render_sdrf_frame(template, sample_df, file_names), characteristic_columns
+
+
+def add_factor_value(sdrf_df, column):
+    """Copy of the SDRF with ``factor value[column]`` taken from its characteristic."""
+    sdrf_df = sdrf_df.copy()
+    sdrf_df[f"factor value[{column}]"] = sdrf_df[f"characteristics[{column}]"]
+    return sdrf_df
+
+
+def sdrf_to_tsv(sdrf_df):
+    """Serialize the SDRF with a UTF-8 BOM and duplicate cleavage agent headers."""
+    sdrf_tsv = sdrf_df.to_csv(sep="\t", index=False, header=sdrf_headers(sdrf_df.columns))
+    return "\ufeff" + sdrf_tsv
+
+
+def skyline_annotations(sdrf_df):
+    """characteristics[] columns of an SDRF, renamed without the prefix."""
+    # Take columns with charactersistics[] from sdrf_df and also comment[data file]
+    char_cols = [
+        col for col in sdrf_df.columns if col.startswith("characteristics[")
+    ]
+    # data_file_col = [col for col in sdrf_df.columns if col == 'comment[data file]']
+    # skyline_anno = sdrf_df[char_cols + data_file_col]
+
+    # Rename all colnames to remove characteristics[], repeated headers joined
+    return skyline_frame(sdrf_df[char_cols])
@@ -0,0 +1,154 @@
+"""SDRF reader.
+
+An SDRF repeats some headers, e.g. one ``comment[modification parameters]``
+per modification; ``pd.read_csv`` renames the copies (``.1``, ``.2``) and the
+grouping is lost. Here a header is a field: a repeated header is one column
+whose values are tuples (one item per copy, in file order), any other header
+is a plain string column.
+
+Consumers usually need a few column families only (``characteristics`` for
+Skyline, ``comment`` for the data files), so the reader parses the header line
+first and hands only the selected column positions to the CSV parser. Large
+(reanalysis-scale) files are read in chunks of rows with ``iter_sdrf``, the
+memory then depends on the chunk size, not on the file.
+
+Values are read verbatim: empty cells are "" and 'NA' or 'null' stay text.
+"""
+import contextlib
+import csv
+import io
+import os
+from typing import Dict, List, NamedTuple, Tuple
+
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def sdrf_family(header: str) -> str:
+    """Column family of a header: 'characteristics' for 'characteristics[organism]'."""
+    bracket = header.find("[")
+    return header[:bracket].strip() if bracket > 0 else header.strip()
+
+
+class SdrfLayout(NamedTuple):
+    headers: List[str]  # header line, in file order
+    fields: Dict[str, Tuple[int, ...]]  # unique header -> positions, in file order
+
+    @classmethod
+    def from_headers(cls, headers) -> "SdrfLayout":
+        fields = {}
+        for position, header in enumerate(headers):
+            fields.setdefault(header, ())
+            fields[header] += (position,)
+        return cls(list(headers), fields)
+
+    @property
+    def repeated(self) -> List[str]:
+        return [header for header, positions in self.fields.items() if len(positions) > 1]
+
+    def select(self, families=None, columns=None) -> List[str]:
+        """Fields of the given families and/or headers, all fields if both are None."""
+        if families is None and columns is None:
+            return list(self.fields)
+        families = set(families or ())
+        columns = set(columns or ())
+        return [header for header in self.fields if header in columns or sdrf_family(header) in families]
+
+
+@contextlib.contextmanager
+def _open_text(source):
+    """Text handle of a path, a binary file (e.g. a Streamlit upload) or a text file."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8-sig", newline="") as handle:
+            yield handle
+        return
+    if hasattr(source, "seekable") and source.seekable():
+        source.seek(0)
+    if isinstance(source, io.TextIOBase):
+        yield source
+        return
+    handle = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    try:
+        yield handle
+    finally:
+        # Leave the upload open for the next rerun
+        handle.detach()
+
+
+def _read_layout(handle) -> SdrfLayout:
+    line = handle.readline().lstrip("\ufeff").rstrip("\r\n")
+    if not line:
+        raise ValueError("The SDRF file is empty.")
+    return SdrfLayout.from_headers(next(csv.reader([line], delimiter="\t")))
+
+
+def _frame(chunk, layout, selected):
+    """Chunk of positional columns as a frame of fields."""
+    columns = {}
+    for header in selected:
+        positions = layout.fields[header]
+        values = [chunk[position] for position in positions]
+        if len(positions) == 1:
+            columns[header] = values[0]
+        else:
+            columns[header] = pd.Series(list(zip(*values)), index=chunk.index, dtype=object)
+    return pd.DataFrame(columns, index=chunk.index)
+
+
+def _empty(layout, selected):
+    return pd.DataFrame({header: pd.Series([], dtype=str if len(layout.fields[header]) == 1 else object) for header in selected})
+
+
+def iter_sdrf(source, families=None, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Read an SDRF chunk by chunk.
+
+    Args:
+        source: Path, binary or text file (e.g. a Streamlit upload)
+        families (Iterable[str]): Column families to read, e.g. ['characteristics']
+        columns (Iterable[str]): Headers to read, e.g. ['comment[data file]']
+        chunk_rows (int): Rows per chunk
+
+    Yields:
+        pd.DataFrame: One frame per chunk of rows (index continues across
+        chunks), one column per selected field in file order, repeated
+        headers as tuples. A file without rows yields one empty frame.
+    """
+    with _open_text(source) as handle:
+        layout = _read_layout(handle)
+        selected = layout.select(families, columns)
+        positions = sorted(position for header in selected for position in layout.fields[header])
+        if not positions:
+            yield _empty(layout, selected)
+            return
+        try:
+            reader = pd.read_csv(
+                handle,
+                sep="\t",
+                header=None,
+                names=range(len(layout.headers)),
+                usecols=positions,
+                dtype=str,
+                na_filter=False,
+                chunksize=chunk_rows,
+            )
+        except pd.errors.EmptyDataError:
+            yield _empty(layout, selected)
+            return
+        with reader:
+            for chunk in reader:
+                # Short rows: missing trailing cells are empty
+                yield _frame(chunk.fillna(""), layout, selected)
+
+
+def read_sdrf(source, families=None, columns=None):
+    """The selected fields of a whole SDRF as one DataFrame (see ``iter_sdrf``)."""
+    chunks = list(iter_sdrf(source, families, columns))
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+
+
+def read_sdrf_layout(source) -> SdrfLayout:
+    """Headers of an SDRF without reading its rows."""
+    with _open_text(source) as handle:
+        return _read_layout(handle)
@@ -0,0 +1,253 @@
+"""Declarative SDRF template.
+
+An SDRF of generated runs has a few dozen columns, but only a handful differ
+from row to row (source name, the sample characteristics, assay name, data
+file). The template lists every column once, in file order, as one of
+
+- ``CONSTANT``: one value for all rows (instrument, enzyme, tolerances, ...)
+- ``ROW``: a column of the sample table (``sample_df``)
+- ``DERIVED``: computed from the file names and the row number
+
+Repeated headers (one ``comment[cleavage agent details]`` per enzyme) are
+columns with the same ``header`` and distinct frame ``name``s, so the TSV is
+written with its duplicate headers directly.
+
+``render_sdrf_tsv`` writes the TSV from the per-row columns only: the
+constants between two per-row columns are joined once into the row format,
+so thousands of runs cost one string format per row and no DataFrame.
+``render_sdrf_frame`` materializes the DataFrame of the SDRF tab editor.
+"""
+import os
+import re
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+CONSTANT, ROW, DERIVED = "constant", "row", "derived"
+
+# Map sample type to organism part, for others use 'not available'
+SAMPLE_TO_PART = {
+    "plasma": "blood plasma",
+    "serum": "blood serum",
+}
+
+NOT_AVAILABLE_CHARACTERISTICS = [
+    "age",
+    "developmental stage",
+    "sex",
+    "ancestry category",
+    "cell type",
+    "cell line",
+    "disease",
+    "individual",
+]
+
+# Headers written once per value, named header{i} in the DataFrame
+REPEATED_HEADERS = ["comment[cleavage agent details]"]
+
+# Fields quoted in the TSV, as by DataFrame.to_csv
+_QUOTE_CHARS = '\t"\n\r'
+
+
+class SdrfColumn(NamedTuple):
+    name: str  # column of the DataFrame, unique
+    header: str  # header in the TSV, may repeat
+    kind: str  # CONSTANT, ROW or DERIVED
+    value: Any  # the constant, the sample_df column or a function(file_names, n_rows)
+
+
+def _repeated_name(header, i):
+    return f"{header[:-1]}{i}]"
+
+
+def _data_file(ms_file):
+    return lambda file_names, n_rows: file_names + "." + ms_file
+
+
+def _assay_name(file_names, n_rows):
+    return np.array(["run " + str(i) for i in range(1, n_rows + 1)], dtype=object)
+
+
+def sdrf_template(sample_columns, ms_info, sample_info, ms_file, collision_energy, factor_value=None):
+    """
+    Columns of the SDRF of generated runs.
+
+    Args:
+        sample_columns (Sequence[str]): Columns of the sample table, every
+            column becomes a characteristics[] column. A 'plate' column
+            overrides the plate ID from sample_info (multi-plate studies).
+        ms_info (dict): Output of sidebar.ms_info
+        sample_info (dict): Output of sidebar.sample_info
+        ms_file (str): Data file extension, e.g. 'raw' or 'mzML'
+        collision_energy (str): Collision energy (NCE)
+        factor_value (str): Characteristic repeated as factor value[], or None
+
+    Returns:
+        tuple: (template, characteristic_columns) - list of SdrfColumn and the
+        names of the characteristics that can be used as factor value
+    """
+    # Sample characteristics, a constant replaces a sample column of the same name
+    characteristics = {column: (ROW, column) for column in sample_columns}
+    characteristics["organism"] = (CONSTANT, sample_info["organism_species"])
+    # Terms chosen in the sidebar replace the defaults
+    chosen = sample_info.get("characteristics", {})
+    organism_part = SAMPLE_TO_PART.get(sample_info["sample"].lower(), "not available")
+    characteristics["organism part"] = (CONSTANT, chosen.get("organism part", organism_part))
+    if "plate" not in characteristics:
+        characteristics["plate"] = (CONSTANT, sample_info["plate_id"])
+    characteristics["project"] = (CONSTANT, sample_info["proj_name"])
+    for column in NOT_AVAILABLE_CHARACTERISTICS:
+        characteristics[column] = (CONSTANT, chosen.get(column, "not available"))
+    characteristics["biological replicate"] = (CONSTANT, "1")
+
+    template = [SdrfColumn("source name", "source name", DERIVED, lambda file_names, n_rows: file_names)]
+    for column, (kind, value) in characteristics.items():
+        header = f"characteristics[{column}]"
+        template.append(SdrfColumn(header, header, kind, value))
+
+    comments = [
+        ("data file", DERIVED, _data_file(ms_file)),
+        ("file uri", DERIVED, _data_file(ms_file)),
+        ("proteomics data acquisition method", CONSTANT, ms_info["sdrf_acquisition"]),
+        ("label", CONSTANT, "AC=MS:1002038;NT=label free sample"),
+        ("fraction identifier", CONSTANT, "1"),
+        ("fractionation method", CONSTANT, "NT=High-performance liquid chromatography;AC=PRIDE:0000565"),
+        ("technical replicate", CONSTANT, "1"),
+    ]
+    # Cleavage agent details go after technical replicate, one per enzyme
+    comments += [("cleavage agent details", CONSTANT, accession) for accession in ms_info["enz_accession_list"]]
+    comments += [
+        ("ms2 mass analyzer", CONSTANT, "not available"),
+        ("instrument", CONSTANT, ms_info["sdrf_ms"]),
+        ("modification parameters", CONSTANT, "NT=Carbamidomethyl;AC=UNIMOD:4;TA=C;MT=Fixed"),
+        ("dissociation method", CONSTANT, ms_info["dissociation_accession"]),
+        ("collision energy", CONSTANT, collision_energy + " NCE"),
+        ("precursor mass tolerance", CONSTANT, "40 ppm"),
+        ("fragment mass tolerance", CONSTANT, "0.05 Da"),
+    ]
+    # For DIA add MS1 and MS2 scan range
+    if ms_info["acq_tech"] == "DIA":
+        comments += [("MS1 scan range", CONSTANT, "400-1250 m/z"), ("MS2 scan range", CONSTANT, "100-2000 m/z")]
+    # For SRM/PRM add ProteomeEdge lot
+    if ms_info["acq_tech"] in ["SRM", "PRM"]:
+        comments.append(("ProteomeEdge", CONSTANT, ms_info["srm_lot"]))
+
+    sample_part = [
+        SdrfColumn("Material type", "Material type", CONSTANT, "AC=EFO:0009656;NT=plasma"),
+        SdrfColumn("assay name", "assay name", DERIVED, _assay_name),
+        SdrfColumn("technology type", "technology type", CONSTANT, "proteomic profiling by mass spectrometry"),
+    ]
+    template += sample_part
+
+    repeats = {}
+    for comment, kind, value in comments:
+        header = f"comment[{comment}]"
+        name = header
+        if header in REPEATED_HEADERS:
+            name = _repeated_name(header, repeats.setdefault(header, 0))
+            repeats[header] += 1
+        template.append(SdrfColumn(name, header, kind, value))
+
+    if factor_value is not None:
+        source = next(column for column in template if column.name == f"characteristics[{factor_value}]")
+        template.append(source._replace(name=f"factor value[{factor_value}]", header=f"factor value[{factor_value}]"))
+
+    return template, list(characteristics)
+
+
+def _values(column, sample_df, file_names, n_rows):
+    if column.kind == ROW:
+        return sample_df[column.value]
+    return column.value(file_names, n_rows)
+
+
+def render_sdrf_frame(template, sample_df, file_names):
+    """
+    The SDRF as a DataFrame (one column per template column, unique names).
+
+    Args:
+        template (list): Output of ``sdrf_template``
+        sample_df (pd.DataFrame): One row per injected well
+        file_names (pd.Series): Injection file names, aligned with sample_df
+
+    Returns:
+        pd.DataFrame: The SDRF, with the index of sample_df
+    """
+    n_rows = sample_df.shape[0]
+    columns = {}
+    for column in template:
+        if column.kind == CONSTANT:
+            columns[column.name] = column.value
+        else:
+            columns[column.name] = _values(column, sample_df, file_names, n_rows)
+    return pd.DataFrame(columns, index=sample_df.index)
+
+
+def sdrf_headers(columns):
+    """TSV headers of SDRF frame columns: header{i} of a repeated header is written as header."""
+    headers = []
+    for name in columns:
+        for header in REPEATED_HEADERS:
+            if re.fullmatch(re.escape(header[:-1]) + r"\d+\]", name):
+                name = header
+        headers.append(name)
+    return headers
+
+
+def _field(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return ""
+    text = str(value)
+    if any(char in text for char in _QUOTE_CHARS):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _row_fields(values):
+    """Field text of a per-row column; fast path when nothing needs quoting."""
+    array = np.asarray(values, dtype=object)
+    if array.size and all(isinstance(value, str) for value in array):
+        if not any(char in "".join(array) for char in _QUOTE_CHARS):
+            return array.tolist()
+    return [_field(value) for value in array]
+
+
+def sdrf_header_line(headers, lineterminator=os.linesep):
+    return "\t".join(_field(header) for header in headers) + lineterminator
+
+
+def iter_sdrf_tsv(template, sample_df, file_names, chunk_rows=4096, lineterminator=os.linesep):
+    """
+    The SDRF TSV text in chunks of ``chunk_rows`` rows, the first one starts
+    with a UTF-8 BOM and the header line.
+
+    Same text as ``sdrf_to_tsv(render_sdrf_frame(...))``: duplicate headers,
+    fields quoted as by ``DataFrame.to_csv``. Constants are part of the row
+    format, the per-row columns are converted to text one chunk at a time.
+    """
+    n_rows = sample_df.shape[0]
+    row_format = []
+    row_columns = []
+    for column in template:
+        if column.kind == CONSTANT:
+            row_format.append(_field(column.value).replace("{", "{{").replace("}", "}}"))
+        else:
+            row_format.append("{}")
+            values = _values(column, sample_df, file_names, n_rows)
+            row_columns.append(values.to_numpy(dtype=object) if isinstance(values, pd.Series) else values)
+    row_format = "\t".join(row_format) + lineterminator
+
+    yield "\ufeff" + sdrf_header_line([column.header for column in template], lineterminator)
+    for start in range(0, n_rows, chunk_rows):
+        stop = min(start + chunk_rows, n_rows)
+        if row_columns:
+            fields = zip(*(_row_fields(values[start:stop]) for values in row_columns))
+            yield "".join([row_format.format(*row) for row in fields])
+        else:
+            yield row_format * (stop - start)
+
+
+def render_sdrf_tsv(template, sample_df, file_names, lineterminator=os.linesep):
+    """The SDRF TSV text with a UTF-8 BOM, built without a DataFrame."""
+    return "".join(iter_sdrf_tsv(template, sample_df, file_names, lineterminator=lineterminator))
@@ -0,0 +1,284 @@
+"""SDRF validation in the SDRF tab.
+
+Checks the SDRF frame before it is downloaded, with the rules quantms and the
+PRIDE submission tool reject files for:
+
+- required columns of the SDRF-Proteomics default template are present
+- no empty cells ("not available" / "not applicable" are the empty values)
+- ontology terms (instrument, label, enzyme, ...) are ``KEY=value`` lists with
+  an ``NT=`` name and a well-formed ``AC=`` accession
+- a known accession carries its name, e.g. ``AC=MS:1002523`` is 'Q Exactive HF'
+  (the offline ontology index, then the other terms the app writes)
+- every ``comment[data file]`` is unique
+
+The rules of one cell depend on its column kind and value only, so they are
+memoized per distinct value (``check_value``): 10000 rows with 20 distinct
+values cost about 20 checks. ``SdrfValidator`` keeps the frame it checked
+last; after an edit in ``st.data_editor`` only the changed cells are looked
+up again.
+"""
+import functools
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from func import settings
+from func.ontology_index import ontology_index
+from func.sdrf_template import sdrf_headers
+
+REQUIRED_COLUMNS = [
+    "source name",
+    "characteristics[organism]",
+    "characteristics[organism part]",
+    "characteristics[disease]",
+    "characteristics[cell type]",
+    "characteristics[biological replicate]",
+    "assay name",
+    "technology type",
+    "comment[data file]",
+    "comment[fraction identifier]",
+    "comment[label]",
+    "comment[technical replicate]",
+    "comment[cleavage agent details]",
+    "comment[instrument]",
+]
+
+# Columns whose values are ontology terms (KEY=value;KEY=value)
+TERM_COLUMNS = {
+    "Material type",
+    "comment[label]",
+    "comment[instrument]",
+    "comment[cleavage agent details]",
+    "comment[modification parameters]",
+    "comment[dissociation method]",
+    "comment[proteomics data acquisition method]",
+    "comment[fractionation method]",
+}
+
+TERM_KEYS = {"NT", "AC", "TA", "MT", "PP", "CF", "MM", "TS"}
+EMPTY_VALUES = {"not available", "not applicable"}
+ACCESSION = re.compile(r"^[A-Za-z][A-Za-z_]*:[A-Za-z0-9_.]+$")
+
+ERROR, WARNING = "error", "warning"
+
+
+class SdrfIssue(NamedTuple):
+    level: str  # ERROR or WARNING
+    column: str
+    message: str
+    rows: Tuple  # index labels of the rows, empty for a column issue
+
+
+def parse_term(value: str) -> Dict[str, str]:
+    """``{'NT': 'Trypsin', 'AC': 'MS:1001251'}`` of 'AC=MS:1001251;NT=Trypsin'."""
+    term = {}
+    for part in value.split(";"):
+        key, _, text = part.partition("=")
+        term[key.strip()] = text.strip()
+    return term
+
+
+def _known_terms():
+    """Accession -> name of the terms the app writes (for accessions outside the ontology index)."""
+    tables = [settings.MS_ACQUISITION, settings.MS_ACCESSION, settings.ENZ_ACCESSION, settings.DISSOCIATION_ACCESSION]
+    values = [value for table in tables for value in table.values()]
+    values += [
+        "AC=MS:1002038;NT=label free sample",
+        "NT=High-performance liquid chromatography;AC=PRIDE:0000565",
+        "NT=Carbamidomethyl;AC=UNIMOD:4",
+        "AC=EFO:0009656;NT=plasma",
+    ]
+    known = {}
+    for value in values:
+        term = parse_term(value)
+        known[term["AC"].upper()] = term["NT"]
+    return known
+
+
+KNOWN_TERMS = _known_terms()
+
+
+def _term_messages(value):
+    messages = []
+    parts = value.split(";")
+    if any("=" not in part for part in parts):
+        return [(ERROR, f"'{value}' is not a KEY=value list, e.g. NT=Trypsin;AC=MS:1001251")]
+    term = parse_term(value)
+    unknown = sorted(set(term) - TERM_KEYS)
+    if unknown:
+        messages.append((ERROR, f"unknown key {', '.join(unknown)} in '{value}'"))
+    if not term.get("NT"):
+        messages.append((ERROR, f"no name (NT=) in '{value}'"))
+    accession = term.get("AC")
+    if not accession:
+        messages.append((WARNING, f"no accession (AC=) in '{value}'"))
+    elif not ACCESSION.match(accession):
+        messages.append((ERROR, f"malformed accession '{accession}' in '{value}'"))
+    elif term.get("NT"):
+        names = _accepted_names(accession)
+        if names and term["NT"].lower() not in {name.lower() for name in names}:
+            messages.append((ERROR, f"{accession} is '{names[0]}', not '{term['NT']}'"))
+    return messages
+
+
+def _accepted_names(accession):
+    """Names of an accession: the ontology name and synonyms, else the name the app writes."""
+    term = ontology_index().lookup(accession)
+    if term is not None:
+        return [term.name, *term.synonyms]
+    name = KNOWN_TERMS.get(accession.upper())
+    return [] if name is None else [name]
+
+
+@functools.lru_cache(maxsize=2**16)
+def check_value(rule: str, required: bool, value) -> Tuple:
+    """
+    Issues of one cell value, memoized per (rule, required, value).
+
+    Args:
+        rule (str): 'term' for ontology term columns, 'text' otherwise
+        required (bool): The column is required
+        value: Cell value
+
+    Returns:
+        tuple: (level, message) pairs, empty if the value is fine
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)) or str(value).strip() == "":
+        return ((ERROR if required else WARNING, "empty cell, use 'not available'"),)
+    text = str(value).strip()
+    if rule == "term" and text.lower() not in EMPTY_VALUES:
+        return tuple(_term_messages(text))
+    return ()
+
+
+def _column_rule(header):
+    return "term" if header in TERM_COLUMNS else "text", header in REQUIRED_COLUMNS
+
+
+def _hashable(value):
+    # One memo entry for every missing value; tuples of a grouped (repeated)
+    # header as they are, other unhashables as text
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _check_column(rule, required, values):
+    """{row position: issues} of a whole column, one check per distinct value."""
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+    # Free text only needs the empty check, its (often unique) values are not memoized
+    check = check_value if rule == "term" else check_value.__wrapped__
+    results = [check(rule, required, _hashable(value)) for value in uniques]
+    results.append(check(rule, required, None))  # code -1: missing
+    bad = [code for code, messages in enumerate(results[:-1]) if messages]
+    if results[-1]:
+        bad.append(-1)
+    if not bad:
+        return {}
+    positions = np.flatnonzero(np.isin(codes, bad))
+    return {position: results[codes[position]] for position in positions}
+
+
+class SdrfValidator:
+    """Validates successive versions of an SDRF frame, re-checking changed cells only."""
+
+    def __init__(self):
+        self._frame = None
+        # column -> {row position: ((level, message), ...)}
+        self._cell_issues = {}
+        # Cells looked up by the last validate call
+        self.checked_cells = 0
+
+    def _changed_rows(self, column, values):
+        """Positions of the cells of ``column`` that differ from the last frame, None if all."""
+        previous = self._frame
+        if previous is None or column not in previous.columns or column not in self._cell_issues:
+            return None
+        if previous.shape[0] != values.shape[0] or not previous.index.equals(values.index):
+            return None
+        old = previous[column]
+        if old.dtype != values.dtype:
+            return None
+        differs = old.ne(values)
+        if not differs.any():
+            return np.array([], dtype=int)
+        differs &= ~(old.isna() & values.isna())
+        return np.flatnonzero(differs.to_numpy(dtype=bool))
+
+    def validate(self, sdrf_df: pd.DataFrame) -> List[SdrfIssue]:
+        """
+        Issues of ``sdrf_df`` (columns as built by ``build_sdrf``, repeated
+        headers as header{i}).
+
+        Returns:
+            list: SdrfIssue, errors first
+        """
+        if self._frame is not None and not self._frame.columns.equals(sdrf_df.columns):
+            self._cell_issues = {
+                column: issues for column, issues in self._cell_issues.items() if column in sdrf_df.columns
+            }
+        headers = dict(zip(sdrf_df.columns, sdrf_headers(sdrf_df.columns)))
+        self.checked_cells = 0
+
+        for column, header in headers.items():
+            rule, required = _column_rule(header)
+            values = sdrf_df[column]
+            changed = self._changed_rows(column, values)
+            if changed is None:
+                self._cell_issues[column] = _check_column(rule, required, values)
+                self.checked_cells += values.shape[0]
+                continue
+            cell_issues = self._cell_issues[column]
+            array = values.to_numpy(dtype=object)
+            for position in changed:
+                messages = check_value(rule, required, _hashable(array[position]))
+                if messages:
+                    cell_issues[position] = messages
+                else:
+                    cell_issues.pop(position, None)
+            self.checked_cells += len(changed)
+        self._frame = sdrf_df
+
+        issues = []
+        present = set(headers.values())
+        for header in REQUIRED_COLUMNS:
+            if header not in present:
+                issues.append(SdrfIssue(ERROR, header, "required column is missing", ()))
+        for column in [column for column, header in headers.items() if header == "comment[data file]"]:
+            duplicated = sdrf_df[column].duplicated(keep=False)
+            if duplicated.any():
+                rows = tuple(sdrf_df.index[duplicated.to_numpy()])
+                issues.append(SdrfIssue(ERROR, column, "data file names are not unique", rows))
+
+        # Cell issues grouped per column and message
+        for column in headers:
+            grouped = {}
+            for position, messages in self._cell_issues[column].items():
+                for message in messages:
+                    grouped.setdefault(message, []).append(position)
+            for (level, message), positions in grouped.items():
+                rows = tuple(sdrf_df.index[sorted(positions)])
+                issues.append(SdrfIssue(level, column, message, rows))
+        return sorted(issues, key=lambda issue: issue.level != ERROR)
+
+
+def issues_frame(issues, max_rows: int = 10) -> pd.DataFrame:
+    """Issues as a table for display, at most ``max_rows`` row labels per issue."""
+    return pd.DataFrame(
+        {
+            "level": [issue.level for issue in issues],
+            "column": [issue.column for issue in issues],
+            "message": [issue.message for issue in issues],
+            "cells": [len(issue.rows) for issue in issues],
+            "rows": [
+                ", ".join(map(str, issue.rows[:max_rows])) + (", ..." if len(issue.rows) > max_rows else "")
+                for issue in issues
+            ],
+        }
+    )
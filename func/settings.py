@@ -0,0 +1,119 @@
+"""Sample and MS settings shared by the sidebar and the headless planner.
+
+``build_sample_info`` and ``build_ms_info`` turn the user's choices into the
+``sample_info`` / ``ms_info`` dicts every export step reads, with the SDRF
+accessions filled in from the tables below.
+"""
+# Organism accession
+ORGANISM_SPECIES = {
+    "Human": "Homo sapiens",
+    "Rat": "Rattus norvegicus",
+    "Mouse": "Mus musculus",
+    "Cyanobacteria": "Cyanobacteria",
+    "E.coli": "Escherichia coli",
+}
+
+SAMPLE_TYPES = ["Plasma", "Serum", "Tissue", "Cell line", "Cell culture"]
+
+# Acquisition techniques per instrument
+MS_OPTIONS = {
+    "Q Exactive HF": ["DIA", "DDA", "PRM"],
+    "TSQ Altis": ["SRM"],
+    "LIT Stellar": ["DIA", "DDA", "PRM", "SRM"],
+}
+
+# Acquisition technique accession
+MS_ACQUISITION = {
+    "DIA": "NT=Data-Independent Acquisition;AC=NCIT:C161786",
+    "DDA": "NT=Data-Dependent Acquisition;AC=NCIT:C161785",
+    "PRM": "NT=Parallel Reaction Monitoring;AC=MS:1002956",
+    "SRM": "NT=Selected Reaction Monitoring;AC=MS:1000423",
+}
+
+MS_ACCESSION = {
+    "Q Exactive HF": "NT=Q Exactive HF;AC=MS:1002523",
+    "TSQ Altis": "NT=TSQ Altis;AC=MS:1002874",
+    "LIT Stellar": "NT=Stellar;AC=MS:1003409",
+}
+
+# Digestion enzyme accession
+ENZ_ACCESSION = {
+    "Trypsin": "AC=MS:1001251;NT=Trypsin",
+    "Lys-C": "AC=MS:1001309;NT=Lys-C",
+    "Chymotrypsin": "AC=MS:1001306;NT=Chymotrypsin",
+}
+
+# Dissociation method accession
+DISSOCIATION_ACCESSION = {
+    "ETD": "NT=Electron Transfer Dissociation;AC=MS:1000598",
+    "CID": "NT=Collision-Induced Dissociation;AC=MS:1000133",
+    "HCD": "NT=Higher-energy Collisional Dissociation;AC=MS:1000422",
+}
+
+
+def _check_choice(name, value, choices):
+    if value not in choices:
+        raise ValueError(f"Unknown {name} '{value}', expected one of: {', '.join(choices)}")
+
+
+def build_sample_info(proj_name, organism, sample, plate_format, plate_id, sample_name, characteristics=None):
+    """
+    Sample information dict, as returned by ``sidebar.sample_info``.
+
+    Args:
+        proj_name (str): Project name
+        organism (str): Key of ORGANISM_SPECIES, e.g. 'Human'
+        sample (str): Sample type, e.g. 'Plasma'
+        plate_format (str): Key of PLATE_GEOMETRIES, e.g. '96-well'
+        plate_id (str): Plate ID (barcode); the cohort name if empty
+        sample_name (str): Main cohort name
+        characteristics (dict): SDRF characteristics chosen from the ontology
+            terms, e.g. {'disease': 'normal'}; the others are 'not available'
+
+    Returns:
+        dict: proj_name, organism_species, sample, plate_id, plate_format,
+        sample_name and characteristics
+    """
+    _check_choice("organism", organism, list(ORGANISM_SPECIES))
+    return {
+        "proj_name": proj_name,
+        "organism_species": ORGANISM_SPECIES[organism],
+        "sample": sample,
+        "plate_id": plate_id or sample_name,
+        "plate_format": plate_format,
+        "sample_name": sample_name,
+        "characteristics": dict(characteristics or {}),
+    }
+
+
+def build_ms_info(machine, acq_tech, digestion_enz=("Trypsin",), dissociation_method="HCD", srm_lot=None):
+    """
+    MS setup dict, as returned by ``sidebar.ms_info``.
+
+    Args:
+        machine (str): Key of MS_OPTIONS, e.g. 'Q Exactive HF'
+        acq_tech (str): Acquisition technique available on the machine
+        digestion_enz (Sequence[str]): Keys of ENZ_ACCESSION
+        dissociation_method (str): Key of DISSOCIATION_ACCESSION
+        srm_lot (str): ProteomeEdge lot number, only kept for SRM/PRM
+
+    Returns:
+        dict: The MS settings with their SDRF accessions
+    """
+    _check_choice("instrument", machine, list(MS_OPTIONS))
+    _check_choice(f"acquisition for {machine}", acq_tech, MS_OPTIONS[machine])
+    _check_choice("dissociation method", dissociation_method, list(DISSOCIATION_ACCESSION))
+    for enzyme in digestion_enz:
+        _check_choice("enzyme", enzyme, list(ENZ_ACCESSION))
+
+    return {
+        "machine": machine,
+        "srm_lot": srm_lot if acq_tech in ["SRM", "PRM"] else None,
+        "sdrf_ms": MS_ACCESSION[machine],
+        "acq_tech": acq_tech,
+        "digestion_enz": list(digestion_enz),
+        "dissociation_method": dissociation_method,
+        "dissociation_accession": DISSOCIATION_ACCESSION[dissociation_method],
+        "enz_accession_list": [ENZ_ACCESSION[enzyme] for enzyme in digestion_enz],
+        "sdrf_acquisition": MS_ACQUISITION[acq_tech],
+    }
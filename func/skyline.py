@@ -0,0 +1,181 @@
+"""Skyline annotations of an SDRF file, streamed.
+
+The Skyline annotation CSV is the characteristics[] columns of an SDRF,
+renamed without the prefix (same file as ``sdrf.skyline_annotations``). For
+large repository SDRFs the rows go from the reader (``func/sdrf_reader.py``)
+to the CSV chunk by chunk, so the memory does not grow with the file.
+
+Skyline also needs the annotations defined in the document settings before
+it imports their values; ``skyline_annotation_settings`` writes these
+definitions (``<data_settings>``) for the converted columns: a value list
+when a column has few distinct values, free text otherwise.
+"""
+import contextlib
+import io
+import os
+from typing import Dict, List, NamedTuple, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from func.sdrf_reader import DEFAULT_CHUNK_ROWS, iter_sdrf
+
+# Annotations with at most this many distinct values are defined as value lists
+VALUE_LIST_MAX = 32
+
+# Separator of the values of a repeated characteristics[] header
+MULTI_VALUE_SEPARATOR = ";"
+
+
+class SkylineConversion(NamedTuple):
+    n_rows: int
+    # Annotation name -> sorted distinct values, None above VALUE_LIST_MAX
+    annotations: Dict[str, Optional[List[str]]]
+
+
+def skyline_name(header: str) -> str:
+    """Annotation name of a characteristics[] header."""
+    return header.replace("characteristics[", "").replace("]", "")
+
+
+def skyline_frame(characteristics_df):
+    """Skyline annotation table of the characteristics[] columns of an SDRF."""
+    skyline_df = characteristics_df.copy(deep=False)
+    skyline_df.columns = [skyline_name(column) for column in skyline_df.columns]
+    for column in skyline_df.columns[skyline_df.dtypes == object]:
+        values = skyline_df[column].tolist()
+        if any(isinstance(value, tuple) for value in values):
+            # Repeated header (tuples from the reader): one annotation with the values joined
+            skyline_df[column] = [
+                MULTI_VALUE_SEPARATOR.join(value) if isinstance(value, tuple) else value for value in values
+            ]
+    return skyline_df
+
+
+@contextlib.contextmanager
+def _open_target(target):
+    """Text handle of a path, a binary file (e.g. a download buffer) or a text file."""
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "w", encoding="utf-8", newline="") as handle:
+            yield handle
+        return
+    if isinstance(target, io.TextIOBase):
+        yield target
+        return
+    handle = io.TextIOWrapper(target, encoding="utf-8", newline="")
+    try:
+        yield handle
+    finally:
+        handle.flush()
+        handle.detach()
+
+
+def write_skyline_annotations(source, target, chunk_rows=DEFAULT_CHUNK_ROWS) -> SkylineConversion:
+    """
+    Convert an SDRF to a Skyline annotation CSV, chunk by chunk.
+
+    Args:
+        source: SDRF path, binary or text file (e.g. a Streamlit upload)
+        target: CSV path, binary or text file
+        chunk_rows (int): Rows per chunk
+
+    Returns:
+        SkylineConversion: Number of rows and the distinct values of every
+        annotation, for ``skyline_annotation_settings``
+    """
+    n_rows = 0
+    values = {}
+    with _open_target(target) as handle:
+        for chunk in iter_sdrf(source, families=["characteristics"], chunk_rows=chunk_rows):
+            chunk = skyline_frame(chunk)
+            chunk.to_csv(handle, index=False, header=n_rows == 0)
+            n_rows += chunk.shape[0]
+            _collect_values(values, chunk)
+    return SkylineConversion(n_rows, _annotations(values))
+
+
+def read_skyline_annotations(source, chunk_rows=DEFAULT_CHUNK_ROWS) -> SkylineConversion:
+    """
+    The annotations of an SDRF without writing the CSV (for the settings XML
+    alone), chunk by chunk.
+
+    Args:
+        source: SDRF path, binary or text file
+        chunk_rows (int): Rows per chunk
+
+    Returns:
+        SkylineConversion: Number of rows and the distinct values of every annotation
+    """
+    n_rows = 0
+    values = {}
+    for chunk in iter_sdrf(source, families=["characteristics"], chunk_rows=chunk_rows):
+        chunk = skyline_frame(chunk)
+        n_rows += chunk.shape[0]
+        _collect_values(values, chunk)
+    return SkylineConversion(n_rows, _annotations(values))
+
+
+def _collect_values(values, chunk):
+    # Distinct values per annotation, None once above VALUE_LIST_MAX
+    for column in chunk.columns:
+        seen = values.setdefault(column, set())
+        if seen is not None:
+            seen.update(chunk[column].unique())
+            if len(seen) > VALUE_LIST_MAX:
+                values[column] = None
+
+
+def _annotations(values):
+    return {column: None if seen is None else sorted(seen) for column, seen in values.items()}
+
+
+def annotation_values(skyline_df) -> Dict[str, Optional[List[str]]]:
+    """Distinct values of every column of a Skyline annotation table, None above VALUE_LIST_MAX."""
+    annotations = {}
+    for column in skyline_df.columns:
+        distinct = skyline_df[column].dropna().astype(str).unique()
+        annotations[column] = sorted(distinct) if len(distinct) <= VALUE_LIST_MAX else None
+    return annotations
+
+
+def skyline_annotation_settings(annotations, targets="replicate") -> str:
+    """
+    Skyline annotation definitions (``<data_settings>`` of a .sky document).
+
+    Args:
+        annotations (dict): Annotation name -> distinct values (value list) or
+            None (free text), e.g. ``SkylineConversion.annotations``
+        targets (str): Skyline element the annotations apply to
+
+    Returns:
+        str: XML text
+    """
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', "<data_settings>"]
+    for name, values in annotations.items():
+        attributes = f"name={quoteattr(name)} targets={quoteattr(targets)}"
+        if values is None:
+            lines.append(f'  <annotation {attributes} type="text" />')
+            continue
+        lines.append(f'  <annotation {attributes} type="value_list">')
+        lines += [f"    <value>{escape(value)}</value>" for value in values]
+        lines.append("  </annotation>")
+    lines.append("</data_settings>")
+    return "\n".join(lines) + "\n"
+
+
+def sdrf_to_skyline(sdrf_path, csv_path, settings_path=None, chunk_rows=DEFAULT_CHUNK_ROWS) -> SkylineConversion:
+    """
+    Headless conversion of an SDRF file to a Skyline annotation CSV.
+
+    Args:
+        sdrf_path (str): SDRF file
+        csv_path (str): Skyline annotation CSV to write
+        settings_path (str): Annotation definitions XML to write, or None
+        chunk_rows (int): Rows per chunk
+
+    Returns:
+        SkylineConversion: Number of rows and the annotations
+    """
+    conversion = write_skyline_annotations(sdrf_path, csv_path, chunk_rows)
+    if settings_path is not None:
+        with open(settings_path, "w", encoding="utf-8") as handle:
+            handle.write(skyline_annotation_settings(conversion.annotations))
+    return conversion
@@ -0,0 +1,282 @@
+"""Multi-plate study mode.
+
+A ``Study`` holds the layouts of many plates that are injected as one
+campaign. All plates are parsed with a single grammar pass, scattered into one
+(plate, row, column) label grid. The injection table of all plates comes from
+``injection_table.build_injection_table`` and is turned into the Xcalibur
+order, the Chronos tables and the SDRF with column operations over every plate
+at once. The Evosep holds ``EVOSEP_SLOTS`` plates, so a larger study is
+injected in batches of 6 plates, one Chronos table per batch.
+
+Manifest format (CSV or TSV), one annotation line per row:
+
+    plate_id    sample_name    annotation
+    P001        Cohort_1       Pool;A7
+    P001        Cohort_1       EMPTY;A1
+    P002        Cohort_1
+
+Plates keep the order of their first appearance. ``annotation`` is optional
+and uses the Plate Design syntax; several lines may also be given in one cell.
+"""
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from func.export_utils import ensure_bom
+from func.injection_table import build_injection_table
+from func.plate_geometry import PLATE_96, PlateGeometry
+from func.plate_parser import duplicate_warnings, parse_plate_text
+from func.randomization import injection_permutation
+from func.schedule import build_queue, xcalibur_schedule
+from func.sdrf_template import render_sdrf_tsv, sdrf_template
+from func.xcalibur import WASH_EVERY, xcalibur_csv
+
+# Plates loaded on the Evosep at once (EvoSlot 1-6); larger studies run in batches
+EVOSEP_SLOTS = 6
+
+
+@dataclass
+class Study:
+    plate_ids: List[str]
+    sample_names: List[str]
+    # One annotation line per entry and the index of the plate it belongs to
+    annotations: List[str]
+    annotation_plates: np.ndarray
+    geometry: PlateGeometry = PLATE_96
+
+    @property
+    def n_plates(self) -> int:
+        return len(self.plate_ids)
+
+    @classmethod
+    def from_manifest(cls, manifest, geometry: PlateGeometry = PLATE_96) -> "Study":
+        """Read a CSV/TSV manifest (path or file-like), the separator is detected."""
+        manifest_df = pd.read_csv(manifest, sep=None, engine="python", dtype=str, keep_default_na=False)
+        manifest_df.columns = manifest_df.columns.str.strip()
+        missing = {"plate_id", "sample_name"} - set(manifest_df.columns)
+        if missing:
+            raise ValueError(f"Study manifest is missing column(s): {', '.join(sorted(missing))}")
+
+        plates = manifest_df.drop_duplicates("plate_id")
+        plate_codes = pd.Categorical(manifest_df["plate_id"], categories=plates["plate_id"]).codes
+
+        if "annotation" in manifest_df.columns:
+            # Allow several annotation lines in one cell
+            annotations = pd.Series(manifest_df["annotation"].str.split(r"\r?\n").values, index=plate_codes).explode()
+            annotations = annotations[annotations.str.strip() != ""]
+        else:
+            annotations = pd.Series([], dtype=object)
+
+        return cls(
+            plate_ids=plates["plate_id"].tolist(),
+            sample_names=plates["sample_name"].tolist(),
+            annotations=annotations.tolist(),
+            annotation_plates=annotations.index.to_numpy(dtype=np.int64),
+            geometry=geometry,
+        )
+
+    def plate_annotation(self, plate: int) -> str:
+        """Annotation text of one plate, in the Plate Design syntax."""
+        lines = np.flatnonzero(self.annotation_plates == plate)
+        return "\n".join(self.annotations[i] for i in lines)
+
+    def label_grid(self):
+        """
+        Parse every plate at once into an integer-coded label grid.
+
+        Returns:
+            tuple: (codes, names, warnings) - int array of shape
+            (n_plates, rows, columns), label names so that ``names[codes]`` gives
+            the label of every well, and parser warnings
+        """
+        geometry = self.geometry
+        annotation = parse_plate_text("\n".join(self.annotations), geometry, check_duplicates=False)
+        label_id, row, col = annotation.expand()
+        # Every expanded well belongs to the plate of the line it was written on
+        plate = self.annotation_plates[annotation.line[annotation.block_of_well()]]
+        flat = plate * geometry.n_wells + row * geometry.n_columns + col
+
+        default_names, default_codes = np.unique(np.asarray(self.sample_names, dtype=object), return_inverse=True)
+        names = list(default_names) + annotation.labels
+        codes = np.repeat(default_codes.astype(np.int32), geometry.n_wells)
+
+        # Keep the last assignment of every well, then write all plates at once
+        last_flat, last_index = np.unique(flat[::-1], return_index=True)
+        codes[last_flat] = label_id[::-1][last_index] + len(default_names)
+
+        warnings = annotation.warnings + duplicate_warnings(label_id, flat, len(annotation.labels))
+        return codes.reshape(self.n_plates, geometry.n_rows, geometry.n_columns), names, warnings
+
+    def plate_long(self):
+        """Long table of all wells: plate, Row, Column, Sample, Source Vial."""
+        codes, names, warnings = self.label_grid()
+        geometry = self.geometry
+        n_wells = geometry.n_wells
+        plate_long = pd.DataFrame(
+            {
+                "plate": np.repeat(np.asarray(self.plate_ids, dtype=object), n_wells),
+                "Row": np.tile(np.repeat(geometry.row_names.astype(object), geometry.n_columns), self.n_plates),
+                "Column": np.tile(np.tile(geometry.column_names.astype(object), geometry.n_rows), self.n_plates),
+                "Sample": np.asarray(names, dtype=object)[codes.ravel()],
+                "Source Vial": np.tile(geometry.vial_numbers(), self.n_plates),
+            }
+        )
+        return plate_long, warnings
+
+
+def study_batches(order_df, plate_ids) -> np.ndarray:
+    """Batch of every injection: plates 1-6 of ``plate_ids`` are batch 0, plates 7-12 batch 1, ..."""
+    plate_index = pd.Categorical(order_df["plate"], categories=plate_ids).codes
+    return plate_index // EVOSEP_SLOTS
+
+
+def study_permutation(labels, batches, randomize, seed=None, balance_groups=True) -> np.ndarray:
+    """
+    Injection order of a study: batch after batch, every batch in its own
+    seeded random order (seed + batch), as ``build_sample_order`` orders a plate.
+
+    Args:
+        labels (Sequence[str]): Sample group of every injection, in plate order
+        batches (np.ndarray): Batch of every injection (``study_batches``)
+        randomize (bool): Randomize the injection order
+        seed (int): Randomization seed, required when randomize is set
+        balance_groups (bool): Balance the sample groups between two washes
+
+    Returns:
+        np.ndarray: Permutation of the injections
+    """
+    if not randomize:
+        return np.arange(len(labels))
+    if seed is None:
+        raise ValueError("A randomization seed is required for a randomized order.")
+    labels = np.asarray(labels, dtype=object)
+    parts = [np.arange(0)]
+    for batch in np.unique(batches):
+        rows = np.flatnonzero(batches == batch)
+        parts.append(rows[injection_permutation(labels[rows], seed + int(batch), WASH_EVERY if balance_groups else None)])
+    return np.concatenate(parts)
+
+
+def study_chronos_table(order_df, evosep_method, xcalibur_method, output_dir, comment, plate_ids=None):
+    """
+    Chronos table of one batch of plates, in the order of ``order_df``; the
+    i-th plate of ``plate_ids`` (default: in order of appearance) is on EvoSlot i.
+    """
+    plate_ids = order_df["plate"].unique() if plate_ids is None else plate_ids
+    if len(plate_ids) > EVOSEP_SLOTS:
+        raise ValueError(
+            f"A Chronos table holds at most {EVOSEP_SLOTS} plates (EvoSlot 1-{EVOSEP_SLOTS}), got {len(plate_ids)}."
+        )
+    plate_index = pd.Categorical(order_df["plate"], categories=plate_ids).codes
+    slots = np.array([f"EvoSlot {i}" for i in range(1, EVOSEP_SLOTS + 1)], dtype=object)
+    return pd.DataFrame(
+        {
+            "Analysis Method": evosep_method,
+            "Source Tray": slots[plate_index],
+            "Source Vial": order_df["Source Vial"].to_numpy(),
+            "Sample Name": order_df["File Name"].to_numpy(),
+            "Xcalibur Method": xcalibur_method,
+            "Xcalibur Filename": order_df["File Name"].to_numpy(),
+            "Xcalibur Post Acquisition Program": "",
+            "Xcalibur Output Dir": output_dir,
+            "Comment": comment,
+            "Pump preparation": "",
+            "Align solvents": "",
+            "Flow to column / idle flow": "",
+        }
+    )
+
+
+def chronos_batch_name(batch: int, n_batches: int) -> list:
+    """Name parts of the Chronos table of a batch: none for a single batch, else ['Batch2'], ..."""
+    return [] if n_batches == 1 else [f"Batch{batch + 1}"]
+
+
+def study_outputs(study, ms_info, sample_info, xcalibur, chronos, ms_file, collision_energy):
+    """
+    Xcalibur order, Chronos table and SDRF of every plate of a study.
+
+    Args:
+        study (Study): The plates
+        ms_info (dict): Output of ``settings.build_ms_info``
+        sample_info (dict): Output of ``settings.build_sample_info``
+        xcalibur (dict): Xcalibur settings: date_injection, injection_pos_letter,
+            injection_vol, method_file, uploaded_dir, controls,
+            include_qc_between, qc_every, blank_labels, randomize, seed and
+            balance_groups
+        chronos (dict): Chronos settings: evosep_method, xcalibur_sample_method,
+            evosep_output and evosep_comment
+        ms_file (str): Data file extension, e.g. 'raw' or 'mzML'
+        collision_energy (str): Collision energy (NCE)
+
+    Returns:
+        dict: n_plates, warnings, sample_counts, n_injections, the csv and
+        sdrf_tsv texts and chronos_csvs, one Chronos table per batch of
+        ``EVOSEP_SLOTS`` plates
+    """
+    study_long, study_warnings = study.plate_long()
+
+    study_order_df = build_injection_table(
+        study_long,
+        ms_info,
+        sample_info["proj_name"],
+        xcalibur["date_injection"],
+        xcalibur["injection_pos_letter"],
+        xcalibur["injection_vol"],
+        xcalibur["method_file"],
+        xcalibur["uploaded_dir"],
+    )
+
+    # Seeded order as for a single plate; with more plates than EvoSlots the
+    # batches are injected one after the other, each in its own order
+    batches = study_batches(study_order_df, study.plate_ids)
+    permutation = study_permutation(
+        study_order_df["Sample"],
+        batches,
+        xcalibur["randomize"],
+        xcalibur["seed"],
+        xcalibur["balance_groups"],
+    )
+    injection_df = study_order_df.take(permutation)
+    if xcalibur["randomize"]:
+        injection_df = injection_df.reset_index(drop=True)
+    injection_batches = batches[permutation]
+
+    # Same queue structure as the single plate, over the whole campaign
+    schedule = xcalibur_schedule(
+        ms_info["acq_tech"],
+        xcalibur["include_qc_between"],
+        qc_every=xcalibur["qc_every"],
+        blank_flagged=bool(xcalibur["blank_labels"]),
+    )
+    flagged = injection_df["Sample"].isin(xcalibur["blank_labels"]).to_numpy()
+    study_queue = build_queue(injection_df, xcalibur["controls"], schedule, flagged)
+    study_csv = xcalibur_csv(study_queue)
+
+    study_chronos_csvs = []
+    for batch in range(-(-study.n_plates // EVOSEP_SLOTS)):
+        study_chronos_df = study_chronos_table(
+            injection_df[injection_batches == batch],
+            chronos["evosep_method"],
+            chronos["xcalibur_sample_method"],
+            chronos["evosep_output"],
+            chronos["evosep_comment"],
+            plate_ids=study.plate_ids[batch * EVOSEP_SLOTS:(batch + 1) * EVOSEP_SLOTS],
+        )
+        study_chronos_csvs.append(ensure_bom(study_chronos_df.to_csv(index=True, sep=",")))
+
+    # Written from the template, only the per-row columns are materialized
+    sdrf_columns, _ = sdrf_template(study_order_df.columns, ms_info, sample_info, ms_file, collision_energy)
+    study_sdrf_tsv = render_sdrf_tsv(sdrf_columns, study_order_df, study_order_df["File Name"])
+
+    return {
+        "n_plates": study.n_plates,
+        "warnings": study_warnings,
+        "sample_counts": study_order_df["Sample"].value_counts(),
+        "n_injections": study_order_df.shape[0],
+        "csv": study_csv,
+        "chronos_csvs": study_chronos_csvs,
+        "sdrf_tsv": study_sdrf_tsv,
+    }
@@ -0,0 +1,199 @@
+"""Edits of the generated tables, kept as a sparse patch.
+
+The SDRF and Chronos tabs let users edit tables the app generates. Passing the
+whole table through ``st.data_editor`` sends every row to the browser and
+returns a full copy on each rerun, and the edits are lost whenever the table
+is generated again (e.g. after changing the collision energy).
+
+Here the generated table stays the base and the edits are a ``TablePatch``:
+``{(row key, column): value}``. A row key is the value of a key column (the
+SDRF source name, the Chronos sample name) with its occurrence number, so an
+edit follows its row when the table is regenerated, re-sorted or gets new
+columns. ``patch_editor`` shows one page of rows at a time and only records
+the cells the user changed; ``TablePatch.apply`` writes the edits into a
+(shallow) copy of the base at export, copying the edited columns only.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Rows shown by the editor at a time
+PAGE_ROWS = 100
+
+RowKey = Tuple[Hashable, int]
+
+
+def _missing(value) -> bool:
+    return value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value))
+
+
+def same_value(a, b) -> bool:
+    """Cell equality, with every missing value (None, NaN, NA) equal."""
+    if _missing(a) or _missing(b):
+        return _missing(a) and _missing(b)
+    return a == b
+
+
+def row_keys(df: pd.DataFrame, key_column: str) -> List[RowKey]:
+    """(key value, occurrence) of every row, e.g. ('A1', 0), ('QC', 0), ('QC', 1)."""
+    values = df[key_column].astype(object)
+    values = values.where(values.notna(), None)
+    occurrence = values.groupby(values.to_numpy(), dropna=False, sort=False).cumcount()
+    return list(zip(values.tolist(), occurrence.tolist()))
+
+
+def _with_values(series, positions, values):
+    """``series`` with the cells at ``positions`` replaced, in its dtype if they fit."""
+    array = series.to_numpy(dtype=object, copy=True)
+    array[positions] = values
+    try:
+        return pd.Series(array, index=series.index, name=series.name).astype(series.dtype)
+    except (TypeError, ValueError):
+        # e.g. text typed into a number column
+        return pd.Series(array, index=series.index, name=series.name, dtype=object)
+
+
+@dataclass
+class TablePatch:
+    key_column: str
+    # (row key, column) -> value
+    edits: Dict[Tuple[RowKey, str], object] = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.edits)
+
+    def record(self, base: pd.DataFrame, keys: List[RowKey], changes: Dict[int, Dict[str, object]]):
+        """
+        Add the changes of an editor page; a cell set back to its base value drops its edit.
+
+        Args:
+            base (pd.DataFrame): Base rows of the page
+            keys (list): Row keys of the page rows
+            changes (dict): Page row position -> {column: value}, as
+                ``st.data_editor`` reports ``edited_rows``
+        """
+        for position, row in changes.items():
+            position = int(position)
+            for column, value in row.items():
+                edit = (keys[position], column)
+                if column in base.columns and same_value(base[column].iat[position], value):
+                    self.edits.pop(edit, None)
+                else:
+                    self.edits[edit] = value
+
+    def apply(self, df: pd.DataFrame, keys: List[RowKey] = None) -> pd.DataFrame:
+        """
+        ``df`` with the edits of its rows and columns; ``df`` itself if there are none.
+
+        Edits of rows or columns ``df`` does not have are kept for a later
+        table (see ``unmatched``).
+        """
+        if not self.edits:
+            return df
+        keys = row_keys(df, self.key_column) if keys is None else keys
+        position = {key: i for i, key in enumerate(keys)}
+        by_column = {}
+        for (key, column), value in self.edits.items():
+            if key in position and column in df.columns:
+                by_column.setdefault(column, ([], []))
+                by_column[column][0].append(position[key])
+                by_column[column][1].append(value)
+        if not by_column:
+            return df
+        # Copy-on-write: the columns without edits stay shared with the base
+        patched = df.copy(deep=False)
+        for column, (positions, values) in by_column.items():
+            patched[column] = _with_values(df[column], positions, values)
+        return patched
+
+    def unmatched(self, df: pd.DataFrame, keys: List[RowKey] = None) -> int:
+        """Number of edits of rows or columns that ``df`` does not have."""
+        keys = set(row_keys(df, self.key_column) if keys is None else keys)
+        return sum(key not in keys or column not in df.columns for key, column in self.edits)
+
+
+def _record_page(name, editor_key, base_page, keys):
+    # on_change of the editor: its edits move into the patch and the editor is
+    # recreated on the patched page, so its own state never piles up
+    patch = st.session_state["table_patches"][name]
+    patch.record(base_page, keys, st.session_state[editor_key]["edited_rows"])
+    _new_version(name)
+
+
+def _new_version(name):
+    # A new editor key: the editor shows the patched rows with a fresh state
+    versions = st.session_state["table_patch_versions"]
+    versions[name] = versions.get(name, 0) + 1
+
+
+def _discard(name):
+    st.session_state["table_patches"][name].edits.clear()
+    _new_version(name)
+
+
+def fill_cells(name: str, base: pd.DataFrame, positions, column: str, value):
+    """
+    Set one column of some rows in the patch of ``name`` (e.g. as on_click
+    callback of a fill button next to the ``patch_editor``).
+
+    Args:
+        name (str): Table name of the ``patch_editor``
+        base (pd.DataFrame): Generated table
+        positions (Sequence[int]): Row positions in ``base``
+        column (str): Column to fill
+        value: New value of the cells
+    """
+    patch = st.session_state["table_patches"][name]
+    patch.record(base, row_keys(base, patch.key_column), {position: {column: value} for position in positions})
+    _new_version(name)
+
+
+def patch_editor(name: str, base: pd.DataFrame, key_column: str, page_rows: int = PAGE_ROWS, **editor_kwargs) -> pd.DataFrame:
+    """
+    Edit a generated table page by page; the edits are kept across reruns and
+    regenerations of ``base`` as a ``TablePatch`` in ``st.session_state``.
+
+    Args:
+        name (str): Table name, one patch per name
+        base (pd.DataFrame): Generated table
+        key_column (str): Column identifying the rows of ``base``
+        page_rows (int): Rows per page
+        **editor_kwargs: Passed on to ``st.data_editor`` (e.g. column_config)
+
+    Returns:
+        pd.DataFrame: ``base`` with the edits
+    """
+    patches = st.session_state.setdefault("table_patches", {})
+    versions = st.session_state.setdefault("table_patch_versions", {})
+    patch = patches.setdefault(name, TablePatch(key_column))
+    keys = row_keys(base, key_column)
+
+    n_pages = max(1, -(-base.shape[0] // page_rows))
+    page = 1
+    if n_pages > 1:
+        page = st.number_input(
+            f"Page (of {n_pages}, {page_rows} rows each)", min_value=1, max_value=n_pages, value=1, key=f"{name}_page"
+        )
+    rows = slice((page - 1) * page_rows, page * page_rows)
+    base_page = base.iloc[rows]
+    page_keys = keys[rows]
+
+    editor_key = f"{name}_editor_{page}_{versions.get(name, 0)}"
+    st.data_editor(
+        patch.apply(base_page, page_keys),
+        key=editor_key,
+        on_change=_record_page,
+        args=(name, editor_key, base_page, page_keys),
+        **editor_kwargs,
+    )
+
+    if patch:
+        unmatched = patch.unmatched(base, keys)
+        note = f" ({unmatched} of rows or columns not in the current table)" if unmatched else ""
+        cols = st.columns([4, 1])
+        cols[0].caption(f"{len(patch)} edited cells{note}, kept when the table is generated again.")
+        cols[1].button("Discard edits", key=f"{name}_discard", on_click=_discard, args=(name,))
+    return patch.apply(base, keys)
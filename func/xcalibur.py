@@ -0,0 +1,166 @@
+"""Xcalibur sample order of one plate.
+
+The injection table of the plate is put in its (seeded) random order, the
+wash/QC control blocks are scheduled around the samples and the queue is
+written as the Xcalibur CSV. Used by the Xcalibur tab and the headless
+planner.
+"""
+import numpy as np
+import pandas as pd
+
+from func.export_utils import ensure_bom
+from func.injection_table import XCALIBUR_COLUMNS, build_injection_table
+from func.randomization import injection_permutation
+from func.schedule import build_queue, xcalibur_schedule
+
+INJECTION_POS_COLORS = {"Red": "red", "Green": "green", "Blue": "blue"}
+INJECTION_POS_LETTERS = {"Red": "R", "Green": "G", "Blue": "B"}
+# Samples between two washes
+WASH_EVERY = 8
+
+
+def control_block(file_name, path, method, position, inj_vol):
+    """One control injection (wash, QC, ...) with the Xcalibur columns."""
+    return pd.DataFrame(
+        {
+            "File Name": [file_name],
+            "Path": [path],
+            "Instrument Method": [method],
+            "Position": [position],
+            "Inj Vol": [inj_vol],
+        }
+    )
+
+
+def xcalibur_controls(wash_df, qc_df, qc_between_df):
+    """
+    Control blocks of the Xcalibur schedule.
+
+    Args:
+        wash_df (pd.DataFrame): Wash injection
+        qc_df (pd.DataFrame): QC standard injection, followed by a wash
+        qc_between_df (pd.DataFrame): QC between samples, preceded by a wash
+            before the run ('_1') and followed by one after it ('_2')
+
+    Returns:
+        dict: Control block name -> DataFrame, see ``schedule.xcalibur_schedule``
+    """
+    qc_between_df_pre = pd.concat([wash_df, qc_between_df], axis=0)
+    qc_between_df_pre["File Name"] = qc_between_df_pre["File Name"] + "_1"
+
+    qc_between_df_post = pd.concat([qc_between_df, wash_df], axis=0)
+    qc_between_df_post["File Name"] = qc_between_df_post["File Name"] + "_2"
+
+    return {
+        "wash": wash_df,
+        "qc": pd.concat([qc_df, wash_df], axis=0).reset_index(drop=True),
+        "qc_between_pre": qc_between_df_pre.reset_index(drop=True),
+        "qc_between_post": qc_between_df_post.reset_index(drop=True),
+    }
+
+
+def xcalibur_csv(queue):
+    """Xcalibur CSV text of a queue, with the bracket line and a UTF-8 BOM."""
+    csv_data = queue.to_csv(index=False, encoding="utf-8-sig")
+    return ensure_bom("Bracket Type=4,,,,\n" + csv_data)
+
+
+def build_sample_order(
+    plate,
+    geometry,
+    ms_info,
+    sample_info,
+    injection_pos_letter,
+    injection_vol,
+    method_file,
+    uploaded_dir,
+    date_injection,
+    controls,
+    include_qc_between=True,
+    qc_every=0,
+    blank_labels=(),
+    randomize=True,
+    seed=None,
+    balance_groups=True,
+):
+    """
+    Injection table, (randomized) sample order and Xcalibur CSV of one plate.
+
+    Args:
+        plate (pd.DataFrame): Long plate table with Row, Column and Sample,
+            one row per well in row-major order
+        geometry (PlateGeometry): Plate format
+        ms_info (dict): Output of ``settings.build_ms_info``
+        sample_info (dict): Output of ``settings.build_sample_info``
+        injection_pos_letter (str): Autosampler position letter (R, G or B)
+        injection_vol (str): Injection volume (ul)
+        method_file (str): Instrument method
+        uploaded_dir (str): Directory of the raw data
+        date_injection (str): Injection date as YYYYMMDD
+        controls (dict): Output of ``xcalibur_controls``
+        include_qc_between (bool): Bracket the run with the QC between samples
+        qc_every (int): QC (+ wash) after every N samples, 0 for none
+        blank_labels (Sequence[str]): Sample labels followed by a blank (wash)
+        randomize (bool): Randomize the injection order
+        seed (int): Randomization seed, required when randomize is set
+        balance_groups (bool): Balance the sample groups between two washes
+
+    Returns:
+        dict: plate_df_long (injection table), output_order_df,
+        output_order_df_rand, permutation, randomized, seed and csv_data
+    """
+    plate_df_long = plate.copy()
+
+    # Row-major vial numbers of the selected plate format
+    plate_df_long["Source Vial"] = geometry.vial_numbers()
+
+    # Sample order table without EMPTY wells, one columnar pass
+    plate_df_long = build_injection_table(
+        plate_df_long,
+        ms_info,
+        sample_info["proj_name"],
+        date_injection,
+        injection_pos_letter,
+        injection_vol,
+        method_file,
+        uploaded_dir,
+        plate_id=sample_info["plate_id"],
+    )
+    output_order_df = plate_df_long[XCALIBUR_COLUMNS]
+
+    # Seeded order, shared with the Chronos table
+    if randomize:
+        if seed is None:
+            raise ValueError("A randomization seed is required for a randomized order.")
+        permutation = injection_permutation(
+            plate_df_long["Sample"], seed, WASH_EVERY if balance_groups else None
+        )
+    else:
+        permutation = np.arange(plate_df_long.shape[0])
+    output_order_df_rand = output_order_df.take(permutation)
+    # Samples followed by a blank, in injection order
+    flagged = plate_df_long["Sample"].take(permutation).isin(blank_labels).to_numpy()
+    if randomize:
+        output_order_df_rand = output_order_df_rand.reset_index(drop=True)
+
+    ## export order sample
+    # Washes after every 8 samples (not for SRM/PRM), QC and wash brackets,
+    # optional QC every N samples and blanks, assembled in one take
+    schedule = xcalibur_schedule(
+        ms_info["acq_tech"],
+        include_qc_between,
+        wash_every=WASH_EVERY,
+        qc_every=qc_every,
+        blank_flagged=bool(blank_labels),
+    )
+    output_with_wash = build_queue(output_order_df_rand, controls, schedule, flagged)
+
+    return {
+        "plate_df_long": plate_df_long,
+        "output_order_df": output_order_df,
+        "output_order_df_rand": output_order_df_rand,
+        "permutation": permutation,
+        "randomized": randomize,
+        "seed": seed,
+        "csv_data": xcalibur_csv(output_with_wash),
+    }
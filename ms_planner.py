@@ -0,0 +1,508 @@
+"""Headless MS planner: all artifacts of a study without Streamlit.
+
+Reads a study manifest (see ``func/study.py``) and writes, for every plate,
+the same files as the download buttons of the app:
+
+    {date}_{project}_Sample_Order_{plate}.csv       Xcalibur queue
+    {date}_{project}_Evosep_Order_{plate}.csv/.xml  Chronos table
+    {date}_{project}_{plate}.sdrf.tsv               SDRF
+    {date}_{project}_Skyline_Annotations_{plate}.csv
+
+and the combined study files of the Study tab, to a directory or streamed
+into one ZIP bundle with a manifest of SHA-256 hashes (``--zip``). Plates are
+generated in parallel in a process pool. The settings are the defaults of the app widgets,
+overridden by a JSON file with the same sections as ``DEFAULT_SETTINGS`` and
+by the command-line options.
+
+Usage:
+    python ms_planner.py example_study/study_manifest.tsv -o out/
+    python ms_planner.py manifest.tsv -o out/ --settings nightly.json --seed 42 --workers 4
+    python ms_planner.py manifest.tsv --zip study.zip --seed 42
+    python ms_planner.py manifest.tsv -o out/ --seed 42 --cache-dir ~/.cache/ms_planner
+
+The functions are importable for scripting and tests:
+
+    import ms_planner
+    settings = ms_planner.merge_settings(ms_planner.DEFAULT_SETTINGS, {"sample": {"proj_name": "P1"}})
+    result = ms_planner.plan_study("manifest.tsv", settings)
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from func.artifact_cache import ArtifactCache, artifact_key
+from func.bundle import write_zip_bundle
+from func.chronos import build_chronos_table, export_chronos_table
+from func.export_utils import build_download_name
+from func.plate_geometry import PLATE_GEOMETRIES
+from func.plate_layout import create_plate_df_long, process_plate_positions
+from func.randomization import new_seed
+from func.sdrf import add_factor_value, build_sdrf, sdrf_to_tsv, skyline_annotations
+from func.settings import build_ms_info, build_sample_info
+from func.study import Study, chronos_batch_name, study_outputs
+from func.xcalibur import INJECTION_POS_LETTERS, build_sample_order, control_block, xcalibur_controls
+
+# Artifact names of the ``files`` of plan_plate, in order (study_files: study_artifacts)
+PLATE_ARTIFACTS = ("xcalibur.csv", "chronos.csv", "chronos.xml", "sdrf.tsv", "skyline.csv")
+# Defaults of the app widgets; None is derived from another setting
+DEFAULT_SETTINGS = {
+    "sample": {
+        "proj_name": "Project_X",
+        "organism": "Human",
+        "sample": "Plasma",
+        "plate_format": "96-well",
+        # SDRF characteristics, e.g. {"disease": "normal"}
+        "characteristics": {},
+    },
+    "ms": {
+        "machine": "Q Exactive HF",
+        "acq_tech": "DIA",
+        "digestion_enz": ["Trypsin"],
+        "dissociation_method": "HCD",
+        "srm_lot": "23233",
+    },
+    "xcalibur": {
+        "injection_pos": "Red",
+        "injection_vol": "0.1",
+        "uploaded_dir": "C:\\data\\yourdir",
+        "method_file": "C:\\Xcalibur\\methods\\method1",
+        # YYYYMMDD, None: today
+        "date_injection": None,
+        # Control injections, inj_vol None: the sample injection volume
+        "wash": {"path": "C:\\data\\wash", "method": "C:\\Xcalibur\\methods\\wash", "position": "G3", "inj_vol": None},
+        "qc": {"path": "C:\\data\\QC", "method": "C:\\Xcalibur\\methods\\QC", "position": "GE1", "inj_vol": None},
+        "qc_between": {
+            "path": "C:\\data\\QC_between",
+            "method": "C:\\Xcalibur\\methods\\QC_between",
+            "position": "GE2",
+            "inj_vol": None,
+        },
+        "include_qc_between": True,
+        "qc_every": 0,
+        "blank_labels": [],
+        "randomize": True,
+        # None: a new random seed, plate i uses seed + i
+        "seed": None,
+        "balance_groups": True,
+    },
+    "chronos": {
+        # None: the Xcalibur data directory
+        "evosep_output": None,
+        "evosep_method": "C:\\data\\Evosep\\method.cam",
+        "xcalibur_sample_method": "C:\\Xcalibur\\methods.meth",
+        "evosep_slot": 1,
+        # None: the ProteomeEdge lot
+        "evosep_comment": None,
+        "iRT_samples": 0,
+        "iRT_slot": 1,
+        "iRT_sample_name": "iRT_Tag_unscheduled",
+        "xcalibur_irt_method": "C:\\Xcalibur\\methods\\iRT.meth",
+        "include_standby_prepare": False,
+        "standby_command": "C:\\Xcalibur MS standby.cam",
+        "prepare_command": "C:\\Xcalibur MS prepare.cam",
+    },
+    "sdrf": {
+        "ms_file": "raw",
+        "collision_energy": "27",
+        "factor_value": "Sample",
+    },
+}
+
+
+def merge_settings(base, overrides, _path=()):
+    """
+    Copy of ``base`` with the (nested) keys of ``overrides`` replaced.
+
+    Raises ValueError for a key that ``base`` does not have (free-form
+    sections such as ``sample.characteristics`` take any key) and for a
+    section replaced by a plain value.
+    """
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        name = ".".join(_path + (str(key),))
+        if merged and key not in merged:
+            raise ValueError(f"Unknown setting '{name}'.")
+        if isinstance(merged.get(key), dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"Setting '{name}' is a section, expected an object, got {value!r}.")
+            merged[key] = merge_settings(merged[key], value, _path + (str(key),))
+        else:
+            merged[key] = value
+    return merged
+
+
+def _xcalibur_inputs(settings, ms_info):
+    """Keyword arguments of ``build_sample_order`` except the plate and seed."""
+    xcalibur = settings["xcalibur"]
+    date_injection = xcalibur["date_injection"] or date.today().strftime("%Y%m%d")
+    injection_vol = str(xcalibur["injection_vol"])
+
+    def control(name, file_name):
+        block = xcalibur[name]
+        inj_vol = injection_vol if block["inj_vol"] is None else str(block["inj_vol"])
+        return control_block(file_name, block["path"], block["method"], block["position"], inj_vol)
+
+    return {
+        "injection_pos_letter": INJECTION_POS_LETTERS[xcalibur["injection_pos"]],
+        "injection_vol": injection_vol,
+        "method_file": xcalibur["method_file"],
+        "uploaded_dir": xcalibur["uploaded_dir"],
+        "date_injection": date_injection,
+        "controls": xcalibur_controls(
+            control("wash", "wash"), control("qc", "QC_Plasma"), control("qc_between", "QC_" + date_injection)
+        ),
+        "include_qc_between": xcalibur["include_qc_between"],
+        "qc_every": xcalibur["qc_every"],
+        "blank_labels": list(xcalibur["blank_labels"]),
+        "randomize": xcalibur["randomize"],
+        "balance_groups": xcalibur["balance_groups"],
+    }
+
+
+def _chronos_inputs(settings, ms_info):
+    """Keyword arguments of ``build_chronos_table`` except the order."""
+    chronos = settings["chronos"]
+    include_irt = chronos["iRT_samples"] > 0
+    include_standby_prepare = chronos["include_standby_prepare"]
+    return {
+        "evosep_output": chronos["evosep_output"] or settings["xcalibur"]["uploaded_dir"],
+        "evosep_method": chronos["evosep_method"],
+        "xcalibur_sample_method": chronos["xcalibur_sample_method"],
+        "evosep_slot": "EvoSlot " + str(chronos["evosep_slot"]),
+        "evosep_comment": chronos["evosep_comment"] if chronos["evosep_comment"] is not None else ms_info["srm_lot"],
+        # Same values as the Chronos tab with the options unticked
+        "iRT_samples": chronos["iRT_samples"],
+        "iRT_slot": "EvoSlot " + str(chronos["iRT_slot"]) if include_irt else "",
+        "iRT_sample_name": chronos["iRT_sample_name"] if include_irt else "",
+        "xcalibur_irt_method": chronos["xcalibur_irt_method"] if include_irt else "",
+        "include_standby_prepare": include_standby_prepare,
+        "standby_command": chronos["standby_command"] if include_standby_prepare else "",
+        "prepare_command": chronos["prepare_command"] if include_standby_prepare else "",
+    }
+
+
+def plate_geometry(settings):
+    """Plate format of the settings."""
+    plate_format = settings["sample"]["plate_format"]
+    if plate_format not in PLATE_GEOMETRIES:
+        raise ValueError(f"Unknown plate format '{plate_format}', expected one of: {', '.join(PLATE_GEOMETRIES)}")
+    return PLATE_GEOMETRIES[plate_format]
+
+
+def build_plate_files(
+    plate_id, sample_name, annotation, geometry, ms_info, sample_info, xcalibur, chronos, sdrf, seed=None, cache=None
+):
+    """
+    All single-plate artifacts of one plate, from resolved inputs.
+
+    Args:
+        plate_id (str): Plate ID (barcode)
+        sample_name (str): Main cohort name, the label of unannotated wells
+        annotation (str): Plate Design annotation text
+        geometry (PlateGeometry): Plate format
+        ms_info (dict): Output of ``settings.build_ms_info``
+        sample_info (dict): Output of ``settings.build_sample_info``; the plate
+            ID and cohort are replaced by those of this plate
+        xcalibur (dict): Keyword arguments of ``xcalibur.build_sample_order``
+            other than the plate, geometry, ms/sample info and seed
+        chronos (dict): Keyword arguments of ``chronos.build_chronos_table``
+            other than the order
+        sdrf (dict): ms_file, collision_energy and factor_value
+        seed (int): Randomization seed of this plate
+        cache (ArtifactCache): Reuse the files built earlier from the same
+            inputs, by any process (see ``func/artifact_cache.py``)
+
+    Returns:
+        dict: plate_id, seed, n_injections, warnings (parser messages) and
+        files (file name -> bytes, as downloaded from the app)
+    """
+    if cache is not None:
+        key = artifact_key(
+            "plate_files", plate_id, sample_name, annotation, geometry, ms_info, sample_info, xcalibur, chronos, sdrf, seed
+        )
+        return cache.get_or_build(
+            key,
+            lambda: build_plate_files(
+                plate_id, sample_name, annotation, geometry, ms_info, sample_info, xcalibur, chronos, sdrf, seed
+            ),
+        )[0]
+
+    sample_info = {**sample_info, "plate_id": plate_id, "sample_name": sample_name}
+    plate_df, plate_annotation = process_plate_positions(annotation, sample_name, geometry)
+
+    order = build_sample_order(create_plate_df_long(plate_df), geometry, ms_info, sample_info, seed=seed, **xcalibur)
+
+    chronos_table = build_chronos_table(order, **chronos)
+    chronos_csv, chronos_xml = export_chronos_table(chronos_table)
+
+    sdrf_df, _ = build_sdrf(
+        order["plate_df_long"],
+        order["output_order_df"]["File Name"],
+        ms_info,
+        sample_info,
+        sdrf["ms_file"],
+        sdrf["collision_energy"],
+    )
+    sdrf_df = add_factor_value(sdrf_df, sdrf["factor_value"])
+    skyline_csv = skyline_annotations(sdrf_df).to_csv(index=False, encoding="utf-8")
+
+    prefix = [xcalibur["date_injection"], sample_info["proj_name"]]
+    files = {
+        build_download_name(prefix + ["Sample", "Order", plate_id], ".csv"): order["csv_data"].encode("utf-8-sig"),
+        build_download_name(prefix + ["Evosep", "Order", plate_id], ".csv"): chronos_csv.encode("utf-8-sig"),
+        build_download_name(prefix + ["Evosep", "Order", plate_id], ".xml"): chronos_xml,
+        build_download_name(prefix + [plate_id], ".sdrf.tsv"): sdrf_to_tsv(sdrf_df).encode("utf-8"),
+        build_download_name(prefix + ["Skyline", "Annotations", plate_id], ".csv"): skyline_csv.encode("utf-8"),
+    }
+    return {
+        "plate_id": plate_id,
+        "seed": seed,
+        "n_injections": order["plate_df_long"].shape[0],
+        "warnings": plate_annotation.warnings,
+        "files": files,
+    }
+
+
+def plan_plate(plate_id, sample_name, annotation, settings, seed=None, cache=None):
+    """
+    All single-plate artifacts of one plate.
+
+    Args:
+        plate_id (str): Plate ID (barcode)
+        sample_name (str): Main cohort name, the label of unannotated wells
+        annotation (str): Plate Design annotation text
+        settings (dict): Complete settings, see ``DEFAULT_SETTINGS``
+        seed (int): Randomization seed of this plate
+        cache (ArtifactCache): On-disk artifact cache, None for none
+
+    Returns:
+        dict: See ``build_plate_files``
+    """
+    ms_info = build_ms_info(**settings["ms"])
+    return build_plate_files(
+        plate_id,
+        sample_name,
+        annotation,
+        plate_geometry(settings),
+        ms_info,
+        build_sample_info(plate_id=plate_id, sample_name=sample_name, **settings["sample"]),
+        _xcalibur_inputs(settings, ms_info),
+        _chronos_inputs(settings, ms_info),
+        settings["sdrf"],
+        seed,
+        cache,
+    )
+
+
+def plan_plate_task(task):
+    """``plan_plate(*task)``, for process pools."""
+    return plan_plate(*task)
+
+
+def plate_tasks(study, settings, cache=None):
+    """
+    Arguments of ``plan_plate`` for every plate of a study.
+
+    Returns:
+        tuple: (seed, tasks) - base seed (a new one if the order is randomized
+        and no seed is set; plate i uses seed + i) and one argument tuple per
+        plate
+    """
+    xcalibur = settings["xcalibur"]
+    seed = xcalibur["seed"]
+    if xcalibur["randomize"] and seed is None:
+        seed = new_seed()
+    tasks = [
+        (plate_id, sample_name, study.plate_annotation(i), settings, None if seed is None else seed + i, cache)
+        for i, (plate_id, sample_name) in enumerate(zip(study.plate_ids, study.sample_names))
+    ]
+    return seed, tasks
+
+
+def study_artifacts(files):
+    """Artifact names of ``study_files``: chronos-1.csv, chronos-2.csv, ... for several Chronos batches."""
+    n_batches = len(files) - 2
+    chronos = ["chronos.csv"] if n_batches == 1 else [f"chronos-{i}.csv" for i in range(1, n_batches + 1)]
+    return ("xcalibur.csv", *chronos, "sdrf.tsv")
+
+
+def study_files(study, settings, seed=None):
+    """
+    Combined files of the Study tab (Xcalibur, Chronos CSV per batch of 6
+    plates, SDRF), name -> bytes. ``seed`` is the base seed of the plates.
+    """
+    ms_info = build_ms_info(**settings["ms"])
+    sample_info = build_sample_info(
+        plate_id=study.plate_ids[0], sample_name=study.sample_names[0], **settings["sample"]
+    )
+    xcalibur_inputs = _xcalibur_inputs(settings, ms_info)
+    outputs = study_outputs(
+        study,
+        ms_info,
+        sample_info,
+        {**xcalibur_inputs, "seed": seed},
+        _chronos_inputs(settings, ms_info),
+        settings["sdrf"]["ms_file"],
+        settings["sdrf"]["collision_energy"],
+    )
+    prefix = [xcalibur_inputs["date_injection"], sample_info["proj_name"], "Study"]
+    chronos_csvs = outputs["chronos_csvs"]
+    return {
+        build_download_name(prefix + ["Sample", "Order"], ".csv"): outputs["csv"].encode("utf-8-sig"),
+        **{
+            build_download_name(prefix + ["Evosep", "Order"] + chronos_batch_name(i, len(chronos_csvs)), ".csv"): csv.encode("utf-8-sig")
+            for i, csv in enumerate(chronos_csvs)
+        },
+        build_download_name(prefix, ".sdrf.tsv"): outputs["sdrf_tsv"].encode("utf-8"),
+    }
+
+
+def plan_study(manifest, settings, max_workers=None, combined=True, cache=None):
+    """
+    Artifacts of every plate of a study manifest, plates in a process pool.
+
+    Args:
+        manifest (str or file-like): Study manifest (CSV/TSV)
+        settings (dict): Complete settings, see ``DEFAULT_SETTINGS``
+        max_workers (int): Processes for the plates (1: run in this process)
+        combined (bool): Also build the combined files of the Study tab
+        cache (ArtifactCache): On-disk cache of the plate files, None for none
+
+    Returns:
+        dict: seed (base seed), plates (one ``plan_plate`` result per plate)
+        and study (file name -> bytes of the combined files, or None)
+    """
+    study = Study.from_manifest(manifest, plate_geometry(settings))
+    seed, tasks = plate_tasks(study, settings, cache)
+
+    max_workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            plates = list(pool.map(plan_plate_task, tasks))
+    else:
+        plates = [plan_plate_task(task) for task in tasks]
+
+    return {"seed": seed, "plates": plates, "study": study_files(study, settings, seed) if combined else None}
+
+
+def write_artifacts(result, out_dir):
+    """Write the files of a ``plan_study`` result; returns the written paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    for plate in result["plates"]:
+        files.update(plate["files"])
+    files.update(result["study"] or {})
+
+    paths = []
+    for name, data in files.items():
+        path = os.path.join(out_dir, name)
+        with open(path, "wb") as handle:
+            handle.write(data)
+        paths.append(path)
+    return paths
+
+
+def _plate_files_task(task):
+    return plan_plate(*task)["files"]
+
+
+def write_study_bundle(target, manifest, settings, max_workers=None, combined=True, cache=None):
+    """
+    Stream every artifact of a study into a ZIP bundle with a manifest.
+
+    Plates are built in a process pool and written to the archive as they
+    finish, so only the plates in flight are held in memory.
+
+    Args:
+        target (str or file-like): Path or writable binary file of the ZIP
+        manifest (str or file-like): Study manifest (CSV/TSV)
+        settings (dict): Complete settings, see ``DEFAULT_SETTINGS``
+        max_workers (int): Processes for the plates (1: threads of this process)
+        combined (bool): Also add the combined files of the Study tab
+        cache (ArtifactCache): On-disk cache of the plate files, None for none
+
+    Returns:
+        dict: The bundle manifest (file names, sizes and SHA-256 hashes)
+    """
+    if not settings["xcalibur"]["date_injection"]:
+        settings = merge_settings(settings, {"xcalibur": {"date_injection": date.today().strftime("%Y%m%d")}})
+    study = Study.from_manifest(manifest, plate_geometry(settings))
+    seed, tasks = plate_tasks(study, settings, cache)
+    jobs = [(_plate_files_task, task) for task in tasks]
+    if combined:
+        jobs.append((study_files, study, settings, seed))
+    metadata = {"plates": study.plate_ids, "seed": seed, "settings": settings}
+
+    max_workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return write_zip_bundle(target, jobs, max_workers, executor=pool, metadata=metadata)
+    return write_zip_bundle(target, jobs, 1, metadata=metadata)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifest", help="study manifest (CSV/TSV with plate_id, sample_name, annotation)")
+    parser.add_argument("-o", "--out-dir", help="directory for the generated files")
+    parser.add_argument("--zip", help="write one ZIP bundle with a manifest of hashes instead")
+    parser.add_argument("--settings", help="JSON file overriding DEFAULT_SETTINGS")
+    parser.add_argument("--project", help="project name")
+    parser.add_argument("--plate-format", choices=list(PLATE_GEOMETRIES), help="plate format")
+    parser.add_argument("--instrument", help="instrument, e.g. 'Q Exactive HF'")
+    parser.add_argument("--acquisition", help="acquisition technique, e.g. DIA")
+    parser.add_argument("--date", help="injection date as YYYYMMDD (default: today)")
+    parser.add_argument("--seed", type=int, help="randomization seed (default: a new one)")
+    parser.add_argument("--workers", type=int, help="processes for the plates (default: CPU count)")
+    parser.add_argument("--no-study", action="store_true", help="skip the combined study files")
+    parser.add_argument("--cache-dir", help="reuse plate files built earlier with the same inputs (on-disk cache)")
+    args = parser.parse_args(argv)
+    if not args.out_dir and not args.zip:
+        parser.error("one of -o/--out-dir or --zip is required")
+
+    settings = DEFAULT_SETTINGS
+    if args.settings:
+        with open(args.settings, encoding="utf-8") as handle:
+            try:
+                settings = merge_settings(settings, json.load(handle))
+            except ValueError as e:
+                parser.error(f"{args.settings}: {e}")
+    options = {
+        "sample": {"proj_name": args.project, "plate_format": args.plate_format},
+        "ms": {"machine": args.instrument, "acq_tech": args.acquisition},
+        "xcalibur": {"date_injection": args.date, "seed": args.seed},
+    }
+    settings = merge_settings(
+        settings,
+        {section: {key: value for key, value in values.items() if value is not None} for section, values in options.items()},
+    )
+
+    cache = ArtifactCache(args.cache_dir) if args.cache_dir else None
+    try:
+        if args.zip:
+            bundle = write_study_bundle(
+                args.zip, args.manifest, settings, args.workers, combined=not args.no_study, cache=cache
+            )
+            print(f"{len(bundle['files'])} files written to {args.zip} (seed {bundle['metadata']['seed']})")
+            return 0
+        result = plan_study(
+            args.manifest, settings, max_workers=args.workers, combined=not args.no_study, cache=cache
+        )
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    paths = write_artifacts(result, args.out_dir)
+    for plate in result["plates"]:
+        print(f"{plate['plate_id']}: {plate['n_injections']} injections (seed {plate['seed']})")
+        for message in plate["warnings"]:
+            print(f"  warning: {message}", file=sys.stderr)
+    print(f"{len(paths)} files written to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
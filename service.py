@@ -0,0 +1,283 @@
+"""Local HTTP generation service (ASGI) for LIMS integration.
+
+Exposes the builders of the app tabs over HTTP, without Streamlit:
+
+    GET  /health                  status, workers and cache statistics
+    POST /plate/{artifact}        one plate, body:
+                                  {"plate_id": "P001", "sample_name": "Cohort_1",
+                                   "annotation": "Pool;A7\\nEMPTY;A1", "seed": 42,
+                                   "settings": {...}}
+    POST /study/{artifact}        a study manifest, body:
+                                  {"manifest": "<CSV/TSV text>", "plate_id": "P001",
+                                   "settings": {...}}
+                                  without plate_id: the combined study file
+
+Artifacts are ``xcalibur.csv``, ``chronos.csv``, ``chronos.xml``, ``sdrf.tsv``
+and ``skyline.csv`` (plates) and ``xcalibur.csv``, ``chronos.csv`` and
+``sdrf.tsv`` (combined study; above 6 plates ``chronos-1.csv``,
+``chronos-2.csv``, ... one per batch of 6 plates). ``settings`` overrides
+``ms_planner.DEFAULT_SETTINGS``.
+
+The builders run in a process pool, so the event loop keeps accepting
+requests. A request is keyed on a hash of its content (settings included,
+the injection date resolved): finished results are kept in an LRU response
+cache, and concurrent requests with the same key join the computation that is
+already running. A study is built as one batch, all plates in the pool at
+once, so LIMS requests for the plates and files of the same study are served
+from one run. Every artifact of a plate or study is built together, so asking
+for the SDRF after the Xcalibur queue is a cache hit. With ``--cache-dir`` (or
+MS_PLANNER_CACHE_DIR) the plate files are also kept in the on-disk artifact
+cache, shared with the app and kept across restarts.
+
+Run:
+    python service.py --port 8000 --workers 4
+    uvicorn service:app --port 8000
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import ms_planner
+from func.artifact_cache import ArtifactCache
+from func.randomization import new_seed
+from func.study import Study
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xml": "application/xml",
+    "tsv": "text/tab-separated-values; charset=utf-8",
+}
+
+
+class ResponseCache:
+    """LRU of finished results; concurrent requests for a key share one computation."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._running = {}
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+
+    async def get_or_compute(self, key, compute):
+        """
+        Cached result of ``key`` or the result of the coroutine ``compute()``.
+
+        Returns:
+            tuple: (value, status) - status is 'hit', 'miss' or 'joined' (waited
+            for a computation started by an earlier request)
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key], "hit"
+
+        task = self._running.get(key)
+        if task is None:
+            self.misses += 1
+            status = "miss"
+            task = asyncio.ensure_future(compute())
+            self._running[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.joined += 1
+            status = "joined"
+        # A client that disconnects does not cancel the shared computation
+        return await asyncio.shield(task), status
+
+    def _finish(self, key, task):
+        del self._running[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._entries[key] = task.result()
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "joined": self.joined,
+            "running": len(self._running),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+def request_key(kind, payload, settings) -> str:
+    """Content hash of a request."""
+    text = json.dumps([kind, payload, settings], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _settings(body):
+    overrides = body.get("settings") or {}
+    if not isinstance(overrides, dict):
+        raise ValueError("'settings' must be a JSON object.")
+    settings = ms_planner.merge_settings(ms_planner.DEFAULT_SETTINGS, overrides)
+    # Part of the cache key: a request without a date is not served from yesterday
+    if not settings["xcalibur"]["date_injection"]:
+        settings["xcalibur"]["date_injection"] = date.today().strftime("%Y%m%d")
+    return settings
+
+
+def _artifact_response(files, names, artifact, status, seed):
+    artifacts = dict(zip(names, files))
+    if artifact not in artifacts:
+        return JSONResponse(
+            {"error": f"Unknown artifact '{artifact}', expected one of: {', '.join(names)}"}, status_code=404
+        )
+    file_name = artifacts[artifact]
+    headers = {
+        "Content-Disposition": f'attachment; filename="{file_name}"',
+        "X-Cache": status,
+        "X-Randomization-Seed": str(seed),
+    }
+    return Response(files[file_name], media_type=MEDIA_TYPES[artifact.rsplit(".", 1)[1]], headers=headers)
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ValueError("The request body must be JSON.")
+    if not isinstance(body, dict):
+        raise ValueError("The request body must be a JSON object.")
+    return body
+
+
+async def plate_endpoint(request):
+    state = request.app.state
+    body = await _json_body(request)
+    settings = _settings(body)
+    task = (
+        str(body.get("plate_id") or body.get("sample_name") or ""),
+        str(body.get("sample_name") or "Cohort_1"),
+        str(body.get("annotation") or ""),
+        settings,
+        body.get("seed"),
+    )
+    if not task[0]:
+        raise ValueError("'plate_id' or 'sample_name' is required.")
+
+    async def compute():
+        # Without a seed a new one is drawn once; the cached response keeps it
+        seed = task[4]
+        if seed is None and settings["xcalibur"]["randomize"]:
+            seed = new_seed()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            state.pool, ms_planner.plan_plate_task, task[:4] + (seed, state.artifact_cache)
+        )
+
+    result, status = await state.cache.get_or_compute(request_key("plate", task[:3] + task[4:], settings), compute)
+    return _artifact_response(
+        result["files"], ms_planner.PLATE_ARTIFACTS, request.path_params["artifact"], status, result["seed"]
+    )
+
+
+async def study_endpoint(request):
+    state = request.app.state
+    body = await _json_body(request)
+    settings = _settings(body)
+    manifest = body.get("manifest")
+    if not isinstance(manifest, str) or not manifest.strip():
+        raise ValueError("'manifest' (study manifest as CSV/TSV text) is required.")
+
+    async def compute():
+        # One batch: every plate and the combined files in the pool at once
+        loop = asyncio.get_running_loop()
+        study = await loop.run_in_executor(state.pool, _read_study, manifest, settings)
+        seed, tasks = ms_planner.plate_tasks(study, settings, state.artifact_cache)
+        plates = [loop.run_in_executor(state.pool, ms_planner.plan_plate_task, task) for task in tasks]
+        study_files = loop.run_in_executor(state.pool, ms_planner.study_files, study, settings, seed)
+        *plates, study_files = await asyncio.gather(*plates, study_files)
+        return {"seed": seed, "plates": {plate["plate_id"]: plate for plate in plates}, "study": study_files}
+
+    result, status = await state.cache.get_or_compute(request_key("study", manifest, settings), compute)
+    artifact = request.path_params["artifact"]
+    plate_id = body.get("plate_id")
+    if plate_id is None:
+        names = ms_planner.study_artifacts(result["study"])
+        return _artifact_response(result["study"], names, artifact, status, result["seed"])
+    if plate_id not in result["plates"]:
+        return JSONResponse({"error": f"Plate '{plate_id}' is not in the study manifest."}, status_code=404)
+    plate = result["plates"][plate_id]
+    return _artifact_response(plate["files"], ms_planner.PLATE_ARTIFACTS, artifact, status, plate["seed"])
+
+
+def _read_study(manifest, settings):
+    return Study.from_manifest(io.StringIO(manifest), ms_planner.plate_geometry(settings))
+
+
+async def health_endpoint(request):
+    state = request.app.state
+    artifact_cache = state.artifact_cache.stats() if state.artifact_cache is not None else None
+    return JSONResponse(
+        {"status": "ok", "workers": state.max_workers, "cache": state.cache.stats(), "artifact_cache": artifact_cache}
+    )
+
+
+async def _bad_request(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=400)
+
+
+def create_app(max_workers=None, cache_entries=256, cache_dir=None):
+    """ASGI app with its own process pool and response cache (and on-disk plate cache in ``cache_dir``)."""
+    max_workers = max_workers or os.cpu_count() or 1
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.max_workers = max_workers
+        app.state.cache = ResponseCache(cache_entries)
+        app.state.artifact_cache = ArtifactCache(cache_dir) if cache_dir else None
+        app.state.pool = ProcessPoolExecutor(max_workers=max_workers)
+        try:
+            yield
+        finally:
+            app.state.pool.shutdown(cancel_futures=True)
+
+    routes = [
+        Route("/health", health_endpoint),
+        Route("/plate/{artifact}", plate_endpoint, methods=["POST"]),
+        Route("/study/{artifact}", study_endpoint, methods=["POST"]),
+    ]
+    # Invalid input (unknown instrument, bad annotation, unknown setting) is a 400,
+    # anything else (e.g. a KeyError in a builder) a 500
+    handlers = {ValueError: _bad_request}
+    return Starlette(routes=routes, lifespan=lifespan, exception_handlers=handlers)
+
+
+app = create_app(
+    int(os.environ["MS_PLANNER_WORKERS"]) if os.environ.get("MS_PLANNER_WORKERS") else None,
+    cache_dir=os.environ.get("MS_PLANNER_CACHE_DIR"),
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, help="builder processes (default: CPU count)")
+    parser.add_argument("--cache-entries", type=int, default=256, help="results kept in the response cache")
+    parser.add_argument("--cache-dir", help="on-disk plate cache, kept across restarts")
+    args = parser.parse_args(argv)
+    uvicorn.run(create_app(args.workers, args.cache_entries, args.cache_dir), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,69 @@
 from requests import options
 import streamlit as st
 
+from func.settings import (
+    DISSOCIATION_ACCESSION,
+    ENZ_ACCESSION,
+    MS_OPTIONS,
+    ORGANISM_SPECIES,
+    SAMPLE_TYPES,
+    build_ms_info,
+    build_sample_info,
+)
+from func.ontology_index import ontology_index
+
+# SDRF characteristics that can be looked up in the offline ontology terms
+CHARACTERISTIC_FIELDS = ["organism part", "disease", "cell type", "sex", "developmental stage"]
+
+
+def ontology_term(container, field):
+    """Name of the term chosen for an SDRF field, None to keep the default."""
+    query = container.text_input(f"Search {field}", key=f"ontology_{field}", placeholder="type to search")
+    if not query:
+        return None
+    # Prefix search in the memory-mapped index, shared by all sessions
+    matches = ontology_index().search(query, field=field, limit=20)
+    if not matches:
+        container.caption(f"No {field} term matches '{query}'.")
+        return None
+    labels = [f"{term.name} ({term.accession})" for term in matches]
+    choice = container.selectbox(f"Select {field}", labels, key=f"ontology_{field}_term")
+    return matches[labels.index(choice)].name
+
+
 def sample_info():
     
-    # Organism accession
-    organism_species = {
-        "Human": "Homo sapiens",
-        "Rat": "Rattus norvegicus",
-        "Mouse": "Mus musculus",
-        "Cyanobacteria": "Cyanobacteria",
-        "E.coli": "Escherichia coli",
-    }
-    
     # Project
     proj_name = st.sidebar.text_input("Enter your project name", "Project_X")    
     # Organism
-    organism = st.sidebar.selectbox("Select your organism", list(organism_species.keys()), index=0)
+    organism = st.sidebar.selectbox("Select your organism", list(ORGANISM_SPECIES.keys()), index=0)
     # Sample type
-    sample = st.sidebar.selectbox("Select your sample type", ["Plasma", "Serum", "Tissue", "Cell line", "Cell culture"], index=0)
+    sample = st.sidebar.selectbox("Select your sample type", SAMPLE_TYPES, index=0)
+    # Plate format
+    plate_format = st.sidebar.selectbox("Select your plate format", ["96-well", "384-well", "1536-well"], index=0)
     # Plate id 
     plate_id = st.sidebar.text_input("Enter your plate ID (Barcode)", "")
     # Samplee/ cohort name
     sample_name = st.sidebar.text_input("Main cohort name/abbreviation", "Cohort_1")
-    
-        # plate id 
-    if not plate_id:
-        plate_id = sample_name
 
-    # INSERT_YOUR_CODE
+    # SDRF characteristics, 'not available' (organism part: from the sample type) unless chosen
+    characteristics = {}
+    with st.sidebar.expander("SDRF characteristics") as expander:
+        for field in CHARACTERISTIC_FIELDS:
+            term = ontology_term(expander, field)
+            if term is not None:
+                characteristics[field] = term
+
+    # return all values, the plate id defaults to the cohort name
+    sample_info_output = build_sample_info(
+        proj_name, organism, sample, plate_format, plate_id, sample_name, characteristics
+    )
+
     # Warning if proj_name, plate_id or sample_name contain spaces
     space_warnings = []
     if " " in proj_name:
         space_warnings.append("Project name")
-    if " " in plate_id:
+    if " " in sample_info_output["plate_id"]:
         space_warnings.append("Plate ID")
     if " " in sample_name:
         space_warnings.append("Cohort name")
@@ -42,16 +73,6 @@ def sample_info():
             f"Warning: {'/'.join(space_warnings)} should not contain spaces."
         )
 
-
-    # return all values
-    sample_info_output = {
-        "proj_name": proj_name,
-        "organism_species": organism_species[organism],
-        "sample": sample,
-        "plate_id": plate_id,
-        "sample_name": sample_name
-    }
-
     return sample_info_output
 
 def ms_info():
@@ -59,91 +80,28 @@ def ms_info():
     st.sidebar.header("MS setup")
     
     # Instrument
-    machine = st.sidebar.selectbox("Select your instrument", ["Q Exactive HF", "TSQ Altis", "LIT Stellar"])
-    ms_options = {
-        "Q Exactive HF": ["DIA", "DDA","PRM"],
-        "TSQ Altis": ["SRM"],
-        "LIT Stellar": ["DIA", "DDA", "PRM", "SRM"]
-    }
-    
-    ms_analyzers = {
-        "Q Exactive HF": ["DIA", "DDA", "PRM"],
-        "TSQ Altis": ["SRM"],
-        "LIT Stellar": ["DIA", "DDA", "PRM", "SRM"]
-    }
-
-    # Acquisition technique accession
-    ms_acquisition = {
-        "DIA": "NT=Data-Independent Acquisition;AC=NCIT:C161786",
-        "DDA": "NT=Data-Dependent Acquisition;AC=NCIT:C161785",
-        "PRM": "NT=Parallel Reaction Monitoring;AC=MS:1002956",
-        "SRM": "NT=Selected Reaction Monitoring;AC=MS:1000423"
-    }
-
-	
-    ms_accession = {
-        "Q Exactive HF": "NT=Q Exactive HF;AC=MS:1002523",
-        "TSQ Altis": "NT=TSQ Altis;AC=MS:1002874",
-        "LIT Stellar": "NT=Stellar;AC=MS:1003409"
-    }
-    
-    # Acquisition technique 
-    acq_tech = st.sidebar.selectbox("Select your acquisition",ms_options[machine])
+    machine = st.sidebar.selectbox("Select your instrument", list(MS_OPTIONS.keys()))
 
-    # sdrf ms 
-    sdrf_ms = ms_accession[machine]
-
-    # sdrf ms acquisition
-    sdrf_acquisition = ms_acquisition[acq_tech]
+    # Acquisition technique 
+    acq_tech = st.sidebar.selectbox("Select your acquisition", MS_OPTIONS[machine])
     
     # Initialize srm_lot with default value
     srm_lot = None
     
     # Add SRM/Proteomedge panel
     if  acq_tech in ['SRM', 'PRM']: # If SRM  do 
-        # acq_tech = "SRM"
         srm_lot = st.sidebar.text_input('ProteomeEdge Lot number: Lot ', "23233")
         if srm_lot: 
             st.sidebar.markdown(f"The ProteomEdge Lot <span style='color:red'>{srm_lot}</span>", unsafe_allow_html=True)
 
     # Digestion 
-    digestion_enz = st.sidebar.multiselect("Select your tryptic enzyme", ["Trypsin", "Lys-C", "Chymotrypsin"], default=["Trypsin"])
-
-    # Digestion enzyme accession
-    enz_accession = {
-        "Trypsin": "AC=MS:1001251;NT=Trypsin",
-        "Lys-C": "AC=MS:1001309;NT=Lys-C",
-        "Chymotrypsin": "AC=MS:1001306;NT=Chymotrypsin"
-    }
-    
-    # Get the accession from the selected enzymes in list
-    enz_accession_list = [enz_accession[enz] for enz in digestion_enz]
-    
-     # Dissociation method accession
-    dissociation_accession = {
-        "ETD": "NT=Electron Transfer Dissociation;AC=MS:1002592",
-        "CID": "NT=Collision-Induced Dissociation;AC=MS:1000132",
-        "HCD": "NT=Higher-energy Collisional Dissociation;AC=MS:1000422"
-    }
-    
+    digestion_enz = st.sidebar.multiselect("Select your tryptic enzyme", list(ENZ_ACCESSION.keys()), default=["Trypsin"])
+
     # Dissociation
-    dissociation_method = st.sidebar.selectbox("Select your dissociation method", list(dissociation_accession.keys()), index=2)
-    
-    
-   
-    
-    # create dict for all of returns values
-    ms_info_output = {
-        "machine": machine,
-        "srm_lot": srm_lot,
-        "sdrf_ms": sdrf_ms,
-        "acq_tech": acq_tech,
-        "digestion_enz": digestion_enz,
-        "dissociation_method": dissociation_method,
-        "dissociation_accession": dissociation_accession[dissociation_method],
-        "enz_accession_list": enz_accession_list,
-        "sdrf_acquisition": sdrf_acquisition
-    }
+    dissociation_method = st.sidebar.selectbox("Select your dissociation method", list(DISSOCIATION_ACCESSION.keys()), index=2)
+
+    # create dict for all of returns values, with the SDRF accessions
+    ms_info_output = build_ms_info(machine, acq_tech, digestion_enz, dissociation_method, srm_lot)
 
     return ms_info_output
 
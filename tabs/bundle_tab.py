@@ -0,0 +1,153 @@
+import io
+import tempfile
+from datetime import datetime
+
+import streamlit as st
+
+import ms_planner
+from func.artifact_cache import ARTIFACT_CACHE
+from func.bundle import write_zip_bundle
+from func.export_utils import build_download_name
+from func.plate_plot import plate_figures
+from func.sdrf import skyline_annotations
+from func.study import Study, chronos_batch_name
+
+# Archives larger than this are spooled to a temporary file while written
+SPOOL_BYTES = 32 * 2**20
+
+# Keyword arguments of build_sample_order kept by the Xcalibur tab
+XCALIBUR_INPUTS = (
+    "injection_pos_letter",
+    "injection_vol",
+    "method_file",
+    "uploaded_dir",
+    "date_injection",
+    "controls",
+    "include_qc_between",
+    "qc_every",
+    "blank_labels",
+    "balance_groups",
+)
+
+
+def _files(files):
+    return files
+
+
+def _skyline_files(name, sdrf_df):
+    return {name: skyline_annotations(sdrf_df).to_csv(index=False, encoding="utf-8").encode("utf-8")}
+
+
+def _plot_files(names, plate_df, plate_id):
+    return dict(zip(names, plate_figures(plate_df, plate_id)))
+
+
+def _plate_files(*args):
+    return ms_planner.build_plate_files(*args, cache=ARTIFACT_CACHE)["files"]
+
+
+def _zip(jobs, metadata):
+    # Built on click (in a thread of the server), the widgets are not rerun
+    archive = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    write_zip_bundle(archive, jobs, metadata=metadata)
+    archive.seek(0)
+    return archive
+
+
+def plate_bundle_download(ms_info_output, sample_info_output, plate_df, xcalibur, chronos, sdrf):
+    """Sidebar button: every artifact of the current plate in one ZIP."""
+    st.sidebar.markdown("### Download all")
+    if xcalibur is None or chronos is None or sdrf["sdrf_tsv"] is None:
+        st.sidebar.info("Fill in the Xcalibur, Chronos and SDRF tabs to download all files at once.")
+        return
+
+    plate_id = sample_info_output["plate_id"]
+    name_parts = [datetime.now().strftime("%Y%m%d%H%M"), sample_info_output["proj_name"]]
+    jobs = [
+        (
+            _files,
+            {
+                build_download_name(name_parts + ["Sample", "Order", plate_id], ".csv"): xcalibur["csv_data"].encode("utf-8-sig"),
+                build_download_name(name_parts + ["Evosep", "Order", plate_id], ".csv"): chronos["csv_evosep_data"].encode("utf-8-sig"),
+                build_download_name(name_parts + ["Evosep", "Order", plate_id], ".xml"): chronos["xml_evosep_data"],
+                build_download_name(name_parts + [plate_id], ".sdrf.tsv"): sdrf["sdrf_tsv"].encode("utf-8"),
+            },
+        ),
+        (_skyline_files, build_download_name(name_parts + ["Skyline", "Annotations", plate_id], ".csv"), sdrf["sdrf_df"]),
+        (
+            _plot_files,
+            [
+                build_download_name(name_parts + ["Plate", "Map", plate_id], ".png"),
+                build_download_name(name_parts + ["Label", "Counts", plate_id], ".png"),
+            ],
+            plate_df,
+            plate_id,
+        ),
+    ]
+    metadata = {
+        "project": sample_info_output["proj_name"],
+        "plates": [plate_id],
+        "seed": xcalibur["seed"],
+        "instrument": ms_info_output["machine"],
+        "acquisition": ms_info_output["acq_tech"],
+    }
+    st.sidebar.download_button(
+        label="⬇️ Plate bundle (ZIP)",
+        data=lambda: _zip(jobs, metadata),
+        file_name=build_download_name(name_parts + [plate_id, "Bundle"], ".zip"),
+        mime="application/zip",
+        help="Xcalibur order, Chronos CSV/XML, SDRF, Skyline annotations and plate plots, with a manifest of SHA-256 hashes",
+    )
+
+
+def study_bundle_download(manifest, plate_geometry, ms_info_output, sample_info_output, xcalibur, chronos, sdrf, study):
+    """Button of the Study tab: the files of every plate and the combined files in one ZIP."""
+    xcalibur_inputs = {key: xcalibur[key] for key in XCALIBUR_INPUTS}
+    xcalibur_inputs["randomize"] = xcalibur["randomized"]
+    sdrf_inputs = {"ms_file": sdrf["ms_file"], "collision_energy": sdrf["collision_energy"], "factor_value": sdrf["factor_value"]}
+    seed = xcalibur["seed"]
+    name_parts = [datetime.now().strftime("%Y%m%d%H%M"), sample_info_output["proj_name"], "Study"]
+    n_batches = len(study["chronos_csvs"])
+
+    def build():
+        plates = Study.from_manifest(io.BytesIO(manifest), plate_geometry)
+        # Same seeds as the headless planner: plate i uses seed + i
+        jobs = [
+            (
+                _plate_files,
+                plate_id,
+                sample_name,
+                plates.plate_annotation(i),
+                plate_geometry,
+                ms_info_output,
+                sample_info_output,
+                xcalibur_inputs,
+                chronos["chronos_inputs"],
+                sdrf_inputs,
+                None if seed is None else seed + i,
+            )
+            for i, (plate_id, sample_name) in enumerate(zip(plates.plate_ids, plates.sample_names))
+        ]
+        jobs.append(
+            (
+                _files,
+                {
+                    build_download_name(name_parts + ["Sample", "Order"], ".csv"): study["csv"].encode("utf-8-sig"),
+                    **{
+                        build_download_name(name_parts + ["Evosep", "Order"] + chronos_batch_name(i, n_batches), ".csv"): csv.encode("utf-8-sig")
+                        for i, csv in enumerate(study["chronos_csvs"])
+                    },
+                    build_download_name(name_parts, ".sdrf.tsv"): study["sdrf_tsv"].encode("utf-8"),
+                },
+            )
+        )
+        metadata = {"project": sample_info_output["proj_name"], "plates": plates.plate_ids, "seed": seed}
+        return _zip(jobs, metadata)
+
+    st.download_button(
+        label="⬇️ Study bundle (ZIP)",
+        data=build,
+        file_name=build_download_name(name_parts + ["Bundle"], ".zip"),
+        mime="application/zip",
+        help="Files of every plate and the combined study files, with a manifest of SHA-256 hashes",
+    )
@@ -0,0 +1,228 @@
+from datetime import datetime
+
+import streamlit as st
+
+from func.chronos import build_chronos_table, export_chronos_table
+from func.export_utils import build_download_name
+from func.pipeline import run_step
+from func.table_patch import patch_editor
+
+
+def chronos_tab(ms_info_output, sample_info_output, order):
+    # Evosep method
+    st.header("Evosep method for " + ms_info_output["acq_tech"])
+
+    if order is None:
+        st.warning(
+            "Please go to the 'Plate Design' tab first to create the plate layout."
+        )
+        return None
+
+    # Output location
+    evosep_output = st.text_input(
+        "Enter the directory path to save Evosep method file", order["uploaded_dir"]
+    )
+    st.markdown(
+        f"The data will be saved at: <span style='color:red'>{evosep_output}</span>",
+        unsafe_allow_html=True,
+    )
+
+    # Evosep method file
+    evosep_method = st.text_input(
+        "Enter the Evosep experiment machine file (.cam)",
+        "C:\\data\\Evosep\\method.cam",
+    )
+    st.markdown(
+        f"The Evosep method file is from: <span style='color:red'>{evosep_method}</span>",
+        unsafe_allow_html=True,
+    )
+
+    # Xcalibur sample SRM/PRM method
+    xcalibur_sample_method = st.text_input(
+        "Enter the Xcalibur method file (.meth)", "C:\\Xcalibur\\methods.meth"
+    )
+    st.markdown(
+        f"The Xcalibur method file is from: <span style='color:red'>{xcalibur_sample_method}</span>",
+        unsafe_allow_html=True,
+    )
+
+    # Dropdown evosep_slot 1 to 6
+    evosep_slot = st.selectbox("Select Evosep slot", list(range(1, 7)))
+    # st.markdown(f"The Evosep slot is: <span style='color:red'>{evosep_slot}</span>", unsafe_allow_html=True)
+    # Append EvoLot to evosep_slot
+    evosep_slot = "EvoSlot " + str(evosep_slot)
+
+    # Comment
+    evosep_comment = st.text_input(
+        "Enter comment for Evosep", ms_info_output["srm_lot"]
+    )
+    # st.markdown(f"The Evosep comment is: <span style='color:red'>{evosep_comment}</span>", unsafe_allow_html=True)
+
+    # Same injection order as the Xcalibur queue
+    if order["randomized"]:
+        st.success(
+            f"Sample order randomized as in the Xcalibur tab (seed {order['seed']})."
+        )
+    else:
+        st.info("Sample order as in the Xcalibur tab (not randomized).")
+
+    cols = st.columns(2)
+    with cols[0]:
+        st.markdown("### Pre-run: iRT calibration")
+
+        # Tickbox for including iRT method
+        include_irt_method = st.checkbox("Include iRT standards", value=False)
+
+        if include_irt_method:
+            # Dropdown evosep_slot 1 to 6
+            iRT_slot = st.selectbox(
+                "Number of pre-run iRT sample to add", list(range(1, 7))
+            )
+            iRT_slot = "EvoSlot " + str(iRT_slot)
+            # Select total numbers of iRT samples
+            iRT_samples = st.number_input(
+                "Select iRT samples", min_value=1, max_value=10, value=2, step=1
+            )
+
+            # Xcalibur iRT method
+            xcalibur_irt_method = st.text_input(
+                "Enter the Xcalibur iRT method file",
+                "C:\\Xcalibur\\methods\\iRT.meth",
+            )
+            st.markdown(
+                f"The Xcalibur iRT method file is from: <span style='color:red'>{xcalibur_irt_method}</span>",
+                unsafe_allow_html=True,
+            )
+            # iRT sample name
+            iRT_sample_name = st.text_input(
+                "Enter iRT sample name", "iRT_Tag_unscheduled"
+            )
+        else:
+            iRT_samples = 0
+            iRT_slot = ""
+            xcalibur_irt_method = ""
+            iRT_sample_name = ""
+
+    with cols[1]:
+        st.markdown("### Post-run: Standby and Prepare Commands")
+
+        # Tickbox for including standby and prepare commands
+        include_standby_prepare = st.checkbox(
+            "Include Standby and Prepare commands", value=False
+        )
+
+        if include_standby_prepare:
+            # Standby command location
+            standby_command = st.text_input(
+                "Enter the standby command", "C:\\Xcalibur MS standby.cam"
+            )
+            # st.markdown(f"The standby command file is from: <span style='color:red'>{standby_command}</span>", unsafe_allow_html=True)
+
+            # Prepare command file location for
+            prepare_command = st.text_input(
+                "Enter the prepare command", "C:\\Xcalibur MS prepare.cam"
+            )
+            # st.markdown(f"The prepare command file is from: <span style='color:red'>{prepare_command}</span>", unsafe_allow_html=True)
+        else:
+            standby_command = ""
+            prepare_command = ""
+
+    # Rebuilt only when the injection table or one of the settings above changed
+    chronos_inputs = {
+        "evosep_output": evosep_output,
+        "evosep_method": evosep_method,
+        "xcalibur_sample_method": xcalibur_sample_method,
+        "evosep_slot": evosep_slot,
+        "evosep_comment": evosep_comment,
+        "iRT_samples": iRT_samples,
+        "iRT_slot": iRT_slot,
+        "iRT_sample_name": iRT_sample_name,
+        "xcalibur_irt_method": xcalibur_irt_method,
+        "include_standby_prepare": include_standby_prepare,
+        "standby_command": standby_command,
+        "prepare_command": prepare_command,
+    }
+    evosep_final_df = run_step("chronos", build_chronos_table, order=order, **chronos_inputs)
+
+    # Edits are kept per sample name, also when the table is generated again
+    st.subheader("Edit your data here:")
+    evosep_final_df = patch_editor("chronos", evosep_final_df, "Sample Name", use_container_width=True)
+
+    # Serialized again only if the table or one of its edits changed
+    csv_evosep_data, xml_evosep_data = run_step(
+        "chronos_export", export_chronos_table, table=evosep_final_df
+    )
+
+    # Add download buttons for evosep_final_df
+    evosep_csv_name = build_download_name(
+        [
+            datetime.now().strftime("%Y%m%d%H%M"),
+            sample_info_output["proj_name"],
+            "Evosep",
+            "Order",
+            sample_info_output["plate_id"],
+        ],
+        ".csv",
+    )
+    evosep_xml_name = build_download_name(
+        [
+            datetime.now().strftime("%Y%m%d%H%M"),
+            sample_info_output["proj_name"],
+            "Evosep",
+            "Order",
+            sample_info_output["plate_id"],
+        ],
+        ".xml",
+    )
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            label="⬇️ Download CSV",
+            data=csv_evosep_data.encode("utf-8-sig"),
+            file_name=evosep_csv_name,
+            mime="text/csv; charset=utf-8; separator=semicolon",
+        )
+
+    with col2:
+        # Add download button for evosep_final_df as XML
+        st.download_button(
+            label="⬇️ Download XML",
+            data=xml_evosep_data,
+            file_name=evosep_xml_name,
+            mime="application/xml",
+        )
+
+    with col3:
+        # Add copy to clipboard button for XML data
+        if st.button("📋 Copy XML to Clipboard"):
+            st.write(
+                """
+            <script>
+            navigator.clipboard.writeText(`"""
+                + xml_evosep_data.decode("utf-8").replace("`", "\\`")
+                + """`);
+            </script>
+            """,
+                unsafe_allow_html=True,
+            )
+            st.success("XML copied to clipboard!")
+
+    # Display XML results
+    st.markdown("### XML Preview")
+    # Show expandable XML preview
+    with st.expander("View XML (click to expand)"):
+        # Show only first 2000 characters of XML
+        xml_preview = xml_evosep_data.decode("utf-8")
+        st.code(xml_preview, language="xml")
+
+    return {
+        "evosep_final_df": evosep_final_df,
+        "chronos_inputs": chronos_inputs,
+        "csv_evosep_data": csv_evosep_data,
+        "xml_evosep_data": xml_evosep_data,
+        "evosep_output": evosep_output,
+        "evosep_method": evosep_method,
+        "xcalibur_sample_method": xcalibur_sample_method,
+        "evosep_comment": evosep_comment,
+    }
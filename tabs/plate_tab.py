@@ -1,132 +1,182 @@
+import time
+
+import numpy as np
 import streamlit as st
 
-def plate_design_tab(): 
-    st.header("Plate layout new")
-    
-    # Sample types 
+from func.agent import create_agent_chat
+from func.compact_frame import CompactFrame
+from func.pipeline import run_step, stored_output
+from func.plate_optimizer import optimize_plate_assignment, read_sample_manifest
+from func.plate_layout import create_plate_df_long, process_plate_positions
+from func.plate_plot import PLOT_CACHE, plate_dfplot
+from func.plate_plotly import EMPTY_WELL_LABEL, plate_plotly_plot
+
+# Text area for input with example_text 8 rows
+EXAMPLE_TEXT = "Pool;A7,A8,A12\nControl;G12\nControl;H12\nCohort_2;C8\nEMPTY;A1\nCohort_2;RowD\nCohort_2;RowE\nCohort_2;Col9\nCohort_2;Col8"
+
+
+def _init_plate_replace_text(example_text: str) -> None:
+    if "pending_plate_update" in st.session_state:
+        st.session_state.replace_pos_text = st.session_state.pending_plate_update
+        del st.session_state.pending_plate_update
+    if "replace_pos_text" not in st.session_state:
+        st.session_state.replace_pos_text = example_text
+
+
+def _injection_permutation(plate_df_long):
+    """Injection order of the sample order built for this plate, None if there is none yet."""
+    # The Xcalibur tab builds the order after this tab; the stored one is from
+    # the previous rerun and only used if it has the wells of this plate
+    order = stored_output("order")
+    if order is None:
+        return None
+    wells = plate_df_long[plate_df_long["Sample"] != EMPTY_WELL_LABEL]
+    injections = order["plate_df_long"]
+    if len(injections) != len(wells):
+        return None
+    for column in ("Row", "Column", "Sample"):
+        if not np.array_equal(injections[column].to_numpy(dtype=str), wells[column].to_numpy(dtype=str)):
+            return None
+    return order["permutation"]
+
+
+def _plate_assignment_section(sample_info_output, plate_geometry):
+    """Fill the annotation (or a study manifest) from a sample manifest with balanced covariates."""
+    with st.expander("Automatic plate assignment from a sample manifest"):
+        st.markdown(
+            "Upload a sample manifest (CSV or TSV, one row per sample) and choose the covariates to balance, "
+            "e.g. sex, age group and case/control. Samples are placed so that the covariates are not confounded "
+            "with plate, row or column. One plate fills the annotation above, several plates give a study "
+            "manifest for the Study tab."
+        )
+        sample_upload = st.file_uploader("Upload sample manifest", type=["csv", "tsv", "txt"], key="sample_manifest")
+        if sample_upload is None:
+            return
+        manifest_df = read_sample_manifest(sample_upload)
+
+        cols = st.columns(2)
+        with cols[0]:
+            id_column = st.selectbox("Sample ID column", manifest_df.columns.tolist())
+            covariates = st.multiselect(
+                "Covariates to balance", [column for column in manifest_df.columns if column != id_column]
+            )
+        with cols[1]:
+            min_plates = max(1, -(-manifest_df.shape[0] // plate_geometry.n_wells))
+            n_plates = st.number_input("Number of plates", min_value=min_plates, value=min_plates, step=1)
+            time_budget = st.slider("Search time per run (s)", 1, 60, 5)
+            n_restarts = st.slider("Independent runs (in parallel)", 1, 8, 4)
+
+        if st.button("Assign samples", disabled=not covariates):
+            try:
+                with st.spinner("Optimizing plate assignment..."):
+                    assignment = optimize_plate_assignment(
+                        manifest_df,
+                        id_column,
+                        covariates,
+                        plate_geometry,
+                        n_plates=n_plates,
+                        time_budget=time_budget,
+                        n_restarts=n_restarts,
+                    )
+            except ValueError as e:
+                st.error(str(e))
+                return
+            st.session_state.plate_assignment = assignment
+            if assignment.n_plates == 1:
+                # Same route as the agent: replace the annotation text on the next run
+                st.session_state["pending_plate_update"] = assignment.annotation_text()
+                st.rerun()
+
+        assignment = st.session_state.get("plate_assignment")
+        if assignment is None:
+            return
+        st.markdown(
+            f"Imbalance score {assignment.score:.2f} (random placement {assignment.initial_score:.2f}), "
+            f"{assignment.proposals:,} swaps evaluated."
+        )
+        if assignment.n_plates > 1:
+            plate_ids = [f"{sample_info_output['plate_id']}_{i}" for i in range(1, assignment.n_plates + 1)]
+            study_manifest = assignment.study_manifest(plate_ids, sample_info_output["sample_name"])
+            st.dataframe(study_manifest)
+            st.download_button(
+                label="Download study manifest",
+                data=study_manifest.to_csv(sep="\t", index=False).encode("utf-8"),
+                file_name=f"{sample_info_output['proj_name']}_study_manifest.tsv",
+                mime="text/tab-separated-values; charset=utf-8",
+            )
+
+
+def plate_design_tab(sample_info_output, plate_geometry):
+    st.header("Plate layout")
+
+    # Sample types
     st.subheader("A. Cohort name")
-    st.markdown(f"The main cohort samples will be: <span style='color:red'>{sample_name}</span>", unsafe_allow_html=True)
-
-    # plate id 
-    if not plate_id:
-        plate_id = sample_name
-    st.markdown(f"Plate ID: <span style='color:red'>{plate_id}</span>", unsafe_allow_html=True)
-
-
-    st.subheader("B. Control or Pool")
-    st.write("This is a list of control or pool. Important! The 'EMPTY' will be removed in the later steps.")
-    replace_pos = st.text_area("Example Control, Pool or another cohort", "Pool;A7\nControl;G12\nControl;H12\nCohort_2;C8\nEMPTY;A1\nCohort_2;RowD\nCohort_2;RowE\nCohort_2;Col9\nCohort_2;Col8").split('\n')
-    # Filter row in text that contain 'Col' or 'Row' in replace_pos
-    colrow_label = [item for item in replace_pos if ('Col' in item or 'Row' in item)]
-        # Remove row with 'Col' or 'Row in replace_pos
-    replace_pos = [item for item in replace_pos if not ('Col' in item or 'Row' in item)]
-    
-    # Check Col and Row then append to replace pos each well
-    for item in colrow_label:
-        if ';' in item:
-            text, pos = item.split(';')
-            # Check if pos is Row and followed by A-H or Col and followed by 1-12
-            if pos.startswith('Row') and len(pos) == 4 and pos[-1] in 'ABCDEFGH':
-                for number in range(1,13):
-                    replace_pos.append(text + ';' + pos[-1] + str(number))
-            elif pos.startswith('Col') and 4 <=len(pos) <= 5 and pos[3:].isdigit() and 1 <= int(pos[3:]) <= 12:
-                for letter in 'ABCDEFGH':
-                    replace_pos.append(text + ';' + letter + pos[3:])
-            else:
-                st.warning(f"Invalid position format: {item}. It should be like 'Cohort_2;C8'.")
-        else:
-            st.warning(f"Invalid format: {item}. It should be like 'Cohort_2;Col8'.")
-
-#    replace_pos =  pd.Series(replace_pos).unique().tolist()
-
-    # Write a  warning message if the position is mentioned more than one time in text area
-    # Check if the position is mentioned more than one time
-    pos_list = []
-    for item in list(set(replace_pos)):
-        if ';' in item:
-            text, pos = item.split(';')
-            pos_list.append(pos)
-    if len(pos_list) != len(set(pos_list)):
-        st.warning("Position is mentioned more than one time with different labels. Please check your input.")
-
-
-    # Ensure the dataframe has 12 columns and 8 rows
-    data = np.resize(sample_name, (8, 12))
-    plate_df = pd.DataFrame(data, columns=[str(i) for i in range(1, 13)], index=list('ABCDEFGH'))
-    
-    # Replace text in the dataframe based on replace_pos
-    for item in replace_pos:
-        if ';' in item:
-            text, pos = item.split(';')
-            row = pos[0]
-            col = int(pos[1:]) - 1
-            plate_df.at[row, str(col + 1)] = text
-
-    ## Comments for checking
-    # st.write(replace_pos)
-    
-    # format plate_df in a long for mat
-    plate_df_long = plate_df.stack().reset_index()
-    plate_df_long.columns = ['Row', 'Column', 'Sample']
-    
-        # Get unique labels sorted alphabetically
-    unique_labels = sorted(plate_df_long['Sample'].unique())
-
-    # Create a custom palette with colors mapped to labels alphabetically
-    custom_palette = dict(zip(unique_labels, sns.color_palette("colorblind", len(unique_labels))))
-
-        
-    # header 
+
+    st.markdown(
+        f"The main cohort samples will be: <span style='color:red'>{sample_info_output['sample_name']}</span>",
+        unsafe_allow_html=True,
+    )
+    st.markdown(
+        f"Plate ID: <span style='color:red'>{sample_info_output['plate_id']}</span>",
+        unsafe_allow_html=True,
+    )
+    st.markdown(
+        f"Plate format: <span style='color:red'>{plate_geometry.name}</span> "
+        f"({plate_geometry.n_rows} rows {plate_geometry.row_names[0]}–{plate_geometry.row_names[-1]} "
+        f"× {plate_geometry.n_columns} columns)",
+        unsafe_allow_html=True,
+    )
+
+    # Adding pool or control
+    st.subheader("B. Sample annotation")
+    st.write(
+        "Please annotate samples with other cohort besides the main cohort in your plate, for example pool samples or control samples. Importantly, The 'EMPTY' wells will be removed in the later steps."
+    )
+    # Add disclaimer on sensitive information
+    st.markdown(
+        "<span style='color:red'>⚠️ **Disclaimer:** Please ensure that the information you provide does not contain any sensitive or personally identifiable information.</span>",
+        unsafe_allow_html=True,
+    )
+
+    # Text area for input with example_text 8 rows
+    _init_plate_replace_text(EXAMPLE_TEXT)
+
+    text_input = st.text_area(
+        "Example: Control, Pool or another cohort", key="replace_pos_text", height=200
+    )
+    _plate_assignment_section(sample_info_output, plate_geometry)
+
+    # Process plate positions, parsed again only when the text or the plate changed
+    plate_df, plate_annotation = run_step(
+        "plate",
+        process_plate_positions,
+        text_input=text_input,
+        sample_name=sample_info_output["sample_name"],
+        geometry=plate_geometry,
+    )
+    for message in plate_annotation.warnings:
+        st.warning(message)
+
+    # header
     st.subheader("C. Layout of plate")
-    
-    
-    
-    # Heatmap of plate location 
-    # from plate_df to heatmap
-    fig, ax = plt.subplots()
-    # Create a color palette for discrete text
-
-
-    # Plot the heatmap with discrete text colors
-    sns.heatmap(plate_df.isnull(), cbar=False, cmap="coolwarm", ax=ax, linewidths=1, linecolor='darkgrey', alpha=0.1)
-    ax.xaxis.tick_top()  # Move the x-axis labels to the top
-    ax.set_yticklabels(ax.get_yticklabels(), rotation=0)  # Fix label rotation on y-axis
-    ax.set_title(plate_id)  # Add title on top
-
-    # Add text annotations and circles with custom colors
-    for i in range(plate_df.shape[0]):
-        for j in range(plate_df.shape[1]):
-            value = plate_df.iloc[i, j]
-            color = custom_palette.get(value, (1, 1, 1))  # Use custom_palette for colors
-            ax.add_patch(plt.Circle((j + 0.5, i + 0.5), 0.4, color=color, fill=True))
-            ax.text(j + 0.5, i + 0.5, f'{value}', ha='center', va='center', color='white', fontsize=4)
-
-    ax.set_yticklabels(plate_df.index, rotation=0)
-
-    # Display the plot
-    st.pyplot(fig)
-    
-    # Plot barplot from labels of plate_df_long['Sample']
-    fig2, ax2 = plt.subplots()
-    sns.countplot(
-        data=plate_df_long, 
-        x='Sample', 
-        ax=ax2, 
-        order=plate_df_long['Sample'].value_counts().index,  # Reorder by count
-        palette=custom_palette  # Apply the custom palette
+    plot_renderer = st.radio(
+        "Plot renderer", ["Matplotlib (image)", "Plotly (interactive)"], horizontal=True
     )
-    ax2.set_title(f"Sample count in plate {plate_id}")
-    ax2.set_xlabel(None)
-    ax2.set_ylabel("Count")
-
-    # Add count numbers on top of the bars
-    for p in ax2.patches:
-        ax2.text(
-            p.get_x() + p.get_width() / 2.,  # X-coordinate (center of the bar)
-            p.get_height() + 1,           # Y-coordinate (slightly above the bar)
-            int(p.get_height()),            # Text (bar height)
-            ha='center', va='center', fontsize=10, color='black'  # Text alignment and styling
+    plot_start = time.perf_counter()
+    if plot_renderer == "Plotly (interactive)":
+        plate_df_long = plate_plotly_plot(
+            plate_df, sample_info_output["plate_id"], permutation=_injection_permutation(create_plate_df_long(plate_df))
         )
+    else:
+        plate_df_long = plate_dfplot(plate_df, sample_info_output["plate_id"])
+    plot_ms = (time.perf_counter() - plot_start) * 1000
+
+    with st.expander("Debug: plot cache"):
+        st.write({"renderer": plot_renderer, "server time (ms)": round(plot_ms, 1), **PLOT_CACHE.stats()})
+
+    # Store in session state for use in other tabs, in compact form
+    st.session_state.plate_df_long = CompactFrame.from_frame(plate_df_long)
+
+    create_agent_chat()
 
-    # Display the plot
-    st.pyplot(fig2)
\ No newline at end of file
+    return plate_df
@@ -0,0 +1,275 @@
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from func.compact_frame import CompactFrame
+from func.export_utils import build_download_name
+from func.pipeline import run_step
+from func.randomization import new_seed
+from func.xcalibur import (
+    INJECTION_POS_COLORS,
+    INJECTION_POS_LETTERS,
+    WASH_EVERY,
+    build_sample_order,
+    control_block,
+    xcalibur_controls,
+)
+
+
+def _reseed():
+    st.session_state.randomization_seed = new_seed()
+
+
+def xcalibur_tab(ms_info_output, sample_info_output, plate_geometry):
+    st.header(ms_info_output["acq_tech"] + " Injection")
+
+    # Get plate_df_long from session state
+    if "plate_df_long" in st.session_state:
+        plate_df_long = st.session_state.plate_df_long.copy()
+    else:
+        st.warning(
+            "Please go to the 'Plate Design' tab first to create the plate layout."
+        )
+        return None
+
+    # Choices Injection position with select boxes from red green and blue
+    injection_pos = st.selectbox(
+        "1.Select your Autosampler injection position", ["Red", "Green", "Blue"]
+    )
+
+    # Determine the color based on the injection position
+    load_color = INJECTION_POS_COLORS.get(injection_pos, "blue")
+    injection_pos_letter = INJECTION_POS_LETTERS.get(injection_pos, "")
+    # Add color for both injection position and letter
+    st.write(
+        f"The selected injection position is <span style='color:{load_color}'>{injection_pos}</span> with corresponding letter <span style='color:{load_color}'>{injection_pos_letter}</span>.",
+        unsafe_allow_html=True,
+    )
+
+    # Injection volumes (default)
+    injection_vol = 0.1
+
+    injection_vol = st.slider(
+        "2.Select your injection volume", 0.01, 20.0, injection_vol, 0.01
+    )
+    cols = st.columns(2)
+    with cols[0]:
+        # Add suggestion volumn buttons
+        button1, button2, button3, button4, button5 = st.columns(5)
+        if button1.button("0.01 ul", use_container_width=True):
+            injection_vol = 0.01
+        if button2.button("0.1 ul", use_container_width=True):
+            injection_vol = 0.1
+        if button3.button("5.0 ul", use_container_width=True):
+            injection_vol = 5.0
+        if button4.button("10.0 ul", use_container_width=True):
+            injection_vol = 10.0
+        if button5.button("15.0 ul", use_container_width=True):
+            injection_vol = 15.0
+    with cols[1]:
+        injection_vol = st.text_input(
+            "Enter your injection volume (ul)", str(injection_vol)
+        )
+
+    st.markdown(
+        f"Selected injection volume (ul): <span style='color:red'>{injection_vol}</span>",
+        unsafe_allow_html=True,
+    )
+
+    # Path to the data
+    uploaded_dir = st.text_input(
+        "3.Enter the directory path to the data", "C:\data\yourdir"
+    )
+    st.markdown(
+        f"The data will be saved at: <span style='color:red'>{uploaded_dir}</span>",
+        unsafe_allow_html=True,
+    )
+
+    # Path to method file
+    method_file = st.text_input(
+        "4.Enter the directory path to the method file", "C:\Xcalibur\methods\method1"
+    )
+    st.markdown(
+        f"The method file for MS is from: <span style='color:red'>{method_file}</span>",
+        unsafe_allow_html=True,
+    )
+
+    # Date of injection
+    date_injection = st.date_input("5.Date of injection", pd.Timestamp("today"))
+    # format date_injection to YYYYMMDD as text
+    date_injection = date_injection.strftime("%Y%m%d")
+    st.markdown(
+        f"Date of injection: <span style='color:red'>{date_injection}</span>",
+        unsafe_allow_html=True,
+    )
+
+    # QC standard and washes
+    cols = st.columns(3)
+    with cols[0]:
+
+        st.markdown("### Wash")
+
+        ## Wash parameters
+        wash_path = st.text_input("Enter the path to the washes", "C:\\data\\wash")
+        wash_method = st.text_input(
+            "Enter the method file for washes", "C:\\Xcalibur\\methods\\wash"
+        )
+        wash_pos = st.text_input("Enter the position for washes", "G3")
+        injection_vol_wash = st.text_input(
+            "Modify your 'Wash' injection volume (ul)", str(injection_vol)
+        )
+
+        wash_df = control_block("wash", wash_path, wash_method, wash_pos, injection_vol_wash)
+        # st.write(wash_df, index=False)
+
+    with cols[1]:
+        ## QC standard parameters
+        st.markdown("### QC Plasma")
+
+        qc_path = st.text_input("Enter the path to the QC standard", "C:\\data\\QC")
+        qc_method = st.text_input(
+            "Enter the method file for QC standard", "C:\\Xcalibur\\methods\\QC"
+        )
+        qc_pos = st.text_input("Enter the position for QC standard", "GE1")
+        injection_vol_qc = st.text_input(
+            "Modify your 'QC' injection volume (ul)", str(injection_vol)
+        )
+
+        # qc_vol = st.text_input("Enter the volume for QC standard", "0.01")
+        qc_df = control_block("QC_Plasma", qc_path, qc_method, qc_pos, injection_vol_qc)
+
+    with cols[2]:
+        ## QC between samples
+        st.markdown("### QC between samples")
+        qc_between_path = st.text_input(
+            "Enter the path to the between QC standard", "C:\\data\\QC_between"
+        )
+        qc_between_method = st.text_input(
+            "Enter the method file for between QC standard",
+            "C:\\Xcalibur\\methods\\QC_between",
+        )
+        qc_between_pos = st.text_input(
+            "Enter the position for between QC standard", "GE2"
+        )
+        injection_vol_qc_between = st.text_input(
+            "Modify your 'QC between' injection volume (ul)", str(injection_vol)
+        )
+        # Tickbox for including QC between samples
+        include_qc_between = st.checkbox("Include QC between samples", value=True)
+
+        qc_between_df = control_block(
+            "QC_" + date_injection, qc_between_path, qc_between_method, qc_between_pos, injection_vol_qc_between
+        )
+
+    # QC followed by a wash, QC between samples with a wash before/after the run
+    controls = xcalibur_controls(wash_df, qc_df, qc_between_df)
+
+    # Injection schedule
+    st.markdown("### Injection schedule")
+    cols = st.columns(2)
+    with cols[0]:
+        qc_every = st.number_input(
+            "Add QC (+ wash) after every N samples (0: only before and after the run)",
+            min_value=0,
+            max_value=plate_geometry.n_wells,
+            value=0,
+            step=1,
+        )
+    with cols[1]:
+        sample_labels = sorted(plate_df_long["Sample"].unique())
+        blank_labels = st.multiselect(
+            "Add a blank (wash) after high-abundance samples", sample_labels
+        )
+
+    # Download data
+    st.markdown("### Download data")
+
+    # Add randomized sample order tickbox
+    randomize_checkbox_xcalibur = st.checkbox(
+        "Randomize sample order", key="randomize_xcalibur", value=True
+    )
+    if randomize_checkbox_xcalibur:
+        # The seed lives in the session, the order only changes on request
+        if "randomization_seed" not in st.session_state:
+            st.session_state.randomization_seed = new_seed()
+        cols = st.columns(3)
+        with cols[0]:
+            seed = st.number_input(
+                "Randomization seed", min_value=0, max_value=2**31 - 1, step=1, key="randomization_seed"
+            )
+        with cols[1]:
+            st.button("New random order", on_click=_reseed)
+        with cols[2]:
+            balance_groups = st.checkbox(
+                f"Balance sample groups within every {WASH_EVERY} injections", value=True
+            )
+        st.success("Sample order randomized!")
+    else:
+        seed, balance_groups = None, False
+
+    # Rebuilt only when the plate or one of the settings above changed
+    order = run_step(
+        "order",
+        build_sample_order,
+        plate=plate_df_long,
+        geometry=plate_geometry,
+        ms_info=ms_info_output,
+        sample_info=sample_info_output,
+        injection_pos_letter=injection_pos_letter,
+        injection_vol=injection_vol,
+        method_file=method_file,
+        uploaded_dir=uploaded_dir,
+        date_injection=date_injection,
+        controls=controls,
+        include_qc_between=include_qc_between,
+        qc_every=qc_every,
+        blank_labels=blank_labels,
+        randomize=randomize_checkbox_xcalibur,
+        seed=seed,
+        balance_groups=balance_groups,
+    )
+
+    ## export order sample name
+    sample_order_name = build_download_name(
+        [
+            datetime.now().strftime("%Y%m%d%H%M"),
+            sample_info_output["proj_name"],
+            "Sample",
+            "Order",
+            sample_info_output["plate_id"],
+        ],
+        ".csv",
+    )
+
+    # Store output_order_df in session state for SDRF tab, in compact form
+    st.session_state.output_order_df = CompactFrame.from_frame(order["output_order_df"])
+
+    ## Download button for export file
+
+    st.markdown(
+        "The data below is an example for sample order in Xcalibur. The injection order will be randomized and added with wash and qc standard. Be sure with SRM injection"
+    )
+    st.write(order["output_order_df_rand"])
+    st.markdown("Click below to download the data.")
+    # Download button for output_order_df
+    st.download_button(
+        label="Download sample order",
+        data=order["csv_data"].encode("utf-8-sig"),
+        file_name=sample_order_name,
+        mime="text/csv; charset=utf-8",
+    )
+
+    return {
+        **order,
+        "injection_pos_letter": injection_pos_letter,
+        "injection_vol": injection_vol,
+        "uploaded_dir": uploaded_dir,
+        "method_file": method_file,
+        "date_injection": date_injection,
+        "controls": controls,
+        "include_qc_between": include_qc_between,
+        "qc_every": qc_every,
+        "blank_labels": blank_labels,
+        "balance_groups": balance_groups,
+    }
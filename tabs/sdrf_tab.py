@@ -0,0 +1,153 @@
+from datetime import datetime
+
+import numpy as np
+import streamlit as st
+
+from func.export_utils import build_download_name
+from func.ontology_index import ontology_index
+from func.pipeline import run_step
+from func.sdrf import add_factor_value, build_sdrf, sdrf_to_tsv
+from func.sdrf_reader import sdrf_family
+from func.sdrf_template import sdrf_headers
+from func.sdrf_validator import ERROR, SdrfValidator, issues_frame
+from func.table_patch import fill_cells, patch_editor
+
+
+def _build_sdrf_step(order, ms_info, sample_info, ms_file, collision_energy):
+    return build_sdrf(
+        order["plate_df_long"],
+        order["output_order_df"]["File Name"],
+        ms_info,
+        sample_info,
+        ms_file,
+        collision_energy,
+    )
+
+
+def _term_fill(sdrf_df):
+    """Search the ontology terms of an SDRF column and write one into the edits of some rows."""
+    index = ontology_index()
+    fields = set(index.fields())
+    columns = {}
+    for column, header in zip(sdrf_df.columns, sdrf_headers(sdrf_df.columns)):
+        family = sdrf_family(header)
+        if family in ("characteristics", "comment") and header[len(family) + 1:-1] in fields:
+            columns[column] = header
+    if not columns:
+        return
+
+    with st.expander("Fill in an ontology term"):
+        column = st.selectbox("Column", list(columns), format_func=columns.get, key="sdrf_term_column")
+        header = columns[column]
+        family = sdrf_family(header)
+        field = header[len(family) + 1:-1]
+        query = st.text_input(f"Search {field}", key="sdrf_term_query", placeholder="type to search")
+        if not query:
+            return
+        matches = index.search(query, field=field, limit=20)
+        if not matches:
+            st.caption(f"No {field} term matches '{query}', type the value in the table instead.")
+            return
+        labels = [f"{term.name} ({term.accession})" for term in matches]
+        term = matches[labels.index(st.selectbox("Term", labels, key="sdrf_term"))]
+        # Characteristics are names, comments NT=...;AC=... values (with TA=/MT= for modifications)
+        value = term.name if family == "characteristics" else term.sdrf_value
+        st.code(value, language=None)
+
+        rows = ["all rows"]
+        if "characteristics[Sample]" in sdrf_df.columns:
+            rows += [f"Sample {label}" for label in sdrf_df["characteristics[Sample]"].dropna().unique()]
+        target = st.selectbox("Rows", rows, key="sdrf_term_rows")
+        if target == "all rows":
+            positions = range(sdrf_df.shape[0])
+        else:
+            positions = np.flatnonzero(sdrf_df["characteristics[Sample]"].to_numpy() == target[len("Sample "):])
+        st.button(
+            f"Fill {header} of {target}", key="sdrf_term_fill", on_click=fill_cells, args=("sdrf", sdrf_df, list(positions), column, value)
+        )
+
+
+def _validation_report(sdrf_df):
+    # One validator per session: after an edit only the changed cells are checked
+    validator = st.session_state.setdefault("sdrf_validator", SdrfValidator())
+    issues = validator.validate(sdrf_df)
+    if not issues:
+        st.success("SDRF check: no issues found.")
+        return
+    n_errors = sum(issue.level == ERROR for issue in issues)
+    summary = f"SDRF check: {n_errors} errors, {len(issues) - n_errors} warnings."
+    (st.error if n_errors else st.warning)(summary)
+    with st.expander("SDRF issues", expanded=bool(n_errors)):
+        st.dataframe(issues_frame(issues), use_container_width=True, hide_index=True)
+
+
+def sdrf_tab(ms_info_output, sample_info_output, order):
+    st.header("SDRF")
+    ms_file = st.selectbox("MS file output", ["raw", "mzML"])
+    # Collision energy
+    collision_energy = st.text_input("Collision Energy (NCE)", "27")
+
+    settings = {"ms_file": ms_file, "collision_energy": collision_energy, "sdrf_df": None, "sdrf_tsv": None}
+
+    # The sample order is created by the Xcalibur tab
+    if order is None:
+        st.warning(
+            "Please go to the 'Sample Order' tab first to create the sample order."
+        )
+        return settings
+
+    # Create sample properties from Thermo injection table
+    sdrf_df, sample_prop_columns = run_step(
+        "sdrf",
+        _build_sdrf_step,
+        order=order,
+        ms_info=ms_info_output,
+        sample_info=sample_info_output,
+        ms_file=ms_file,
+        collision_energy=collision_energy,
+    )
+    factor_value_col = st.selectbox(
+        "Select column for factor value", sample_prop_columns, index=sample_prop_columns.index("Sample") if "Sample" in sample_prop_columns else 0
+    )
+
+
+    # Add factor values based on selected columns, on a copy: the step output
+    # is shared between reruns
+    sdrf_df = add_factor_value(sdrf_df, factor_value_col)
+
+    # Edits are kept per source name, also when the SDRF is generated again
+    st.subheader("Edit your SDRF data here:")
+    _term_fill(sdrf_df)
+    sdrf_df = patch_editor("sdrf", sdrf_df, "source name", use_container_width=True)
+    _validation_report(sdrf_df)
+
+    # Download SDRF file
+    # fix datetime to YYMMDD
+    sdrf_filename = build_download_name(
+        [
+            datetime.now().strftime("%Y%m%d"),
+            sample_info_output["proj_name"],
+            sample_info_output["plate_id"],
+        ],
+        ".sdrf.tsv",
+    )
+    # UTF-8 BOM and duplicate comment[cleavage agent details] headers
+    sdrf_tsv = run_step("sdrf_export", sdrf_to_tsv, sdrf_df=sdrf_df)
+
+    # Download button
+    st.download_button(
+        label="Download SDRF",
+        data=sdrf_tsv.encode("utf-8"),
+        file_name=sdrf_filename,
+        mime="text/tab-separated-values; charset=utf-8",
+    )
+
+    # Add link to website github.com/thanadol-git/quantms_example/
+    url = "https://www.github.com/thanadol-git/quantms_example/"
+    st.markdown(
+        "The table above numbers repeated headers, e.g. comment[cleavage agent details0]; the downloaded file writes them as repeated comment[cleavage agent details] columns. Check out this [link](%s) for examples."
+        % url
+    )
+
+    settings.update({"sdrf_df": sdrf_df, "sdrf_tsv": sdrf_tsv, "factor_value": factor_value_col})
+    return settings
@@ -0,0 +1,129 @@
+import io
+import tempfile
+from datetime import datetime
+
+import streamlit as st
+
+from func.export_utils import build_download_name
+from func.pipeline import run_step
+from func.sdrf import skyline_annotations
+from func.sdrf_reader import read_sdrf
+from func.skyline import (
+    annotation_values,
+    read_skyline_annotations,
+    skyline_annotation_settings,
+    write_skyline_annotations,
+)
+
+# Uploads larger than this are converted straight to the CSV, without the editor
+STREAM_UPLOAD_BYTES = 20 * 2**20
+
+
+def _stream_csv(upload):
+    # Built on click; the upload is copied into a new reader so reruns are not affected
+    target = tempfile.SpooledTemporaryFile(max_size=STREAM_UPLOAD_BYTES)
+    write_skyline_annotations(io.BytesIO(upload.getvalue()), target)
+    target.seek(0)
+    return target
+
+
+def _stream_settings(upload):
+    # Values only, the CSV is not written
+    conversion = read_skyline_annotations(io.BytesIO(upload.getvalue()))
+    return skyline_annotation_settings(conversion.annotations).encode("utf-8")
+
+
+def skyline_tab(sample_info_output, sdrf_df):
+    st.header("Skyline")
+
+    # Upload SDRF file
+    st.markdown(
+        "Use SDRF file or Upload your SDRF file here to generate Skyline annotation file."
+    )
+    sdrf_upload = st.file_uploader(
+        "Upload SDRF file",
+        type=[
+            "sdrf.tsv",
+            "tsv",
+        ],
+    )
+
+    # Add dropdown for selecting file to process
+    anno_file = st.selectbox(
+        "Select SDRF file to process",
+        ["Use generated SDRF", "Upload SDRF file"],
+        key="sdrf_choice",
+    )
+
+    name_parts = [datetime.now().strftime("%Y%m%d%H%M"), sample_info_output["proj_name"], "Skyline"]
+    skyline_anno_filename = build_download_name(name_parts + ["Annotations", sample_info_output["plate_id"]], ".csv")
+    settings_filename = build_download_name(name_parts + ["Annotation", "Settings", sample_info_output["plate_id"]], ".xml")
+    with_settings = st.checkbox(
+        "Also download the annotation definitions (Skyline settings XML)",
+        key="skyline_settings",
+        help="Annotation definitions to add to the Skyline document before importing the CSV",
+    )
+
+    if anno_file == "Upload SDRF file":
+        if sdrf_upload is None:
+            st.warning("Please upload an SDRF file.")
+            return
+        if sdrf_upload.size > STREAM_UPLOAD_BYTES:
+            # Large repository SDRF: streamed from the upload to the CSV on click
+            st.info(
+                f"Large SDRF file ({sdrf_upload.size / 2**20:.0f} MiB): the annotations are converted "
+                "directly to the CSV, without the editor."
+            )
+            st.download_button(
+                label="Download Skyline Annotation",
+                data=lambda: _stream_csv(sdrf_upload),
+                file_name=skyline_anno_filename,
+                mime="text/csv; charset=utf-8",
+            )
+            if with_settings:
+                st.download_button(
+                    label="Download Skyline Annotation Settings",
+                    data=lambda: _stream_settings(sdrf_upload),
+                    file_name=settings_filename,
+                    mime="application/xml",
+                )
+            return
+        # Only the characteristics are used, repeated headers stay grouped
+        try:
+            upload_sdrf_df = read_sdrf(sdrf_upload, families=["characteristics"])
+        except ValueError as error:
+            st.error(f"Could not read the SDRF file: {error}")
+            return
+        st.success("SDRF file uploaded successfully!")
+    else:
+        st.info("Using generated SDRF file from previous section.")
+        # Use the sdrf_df from previous section
+        if sdrf_df is None:
+            st.warning("Please generate the SDRF file in the SDRF section first.")
+            return
+        else:
+            upload_sdrf_df = sdrf_df
+
+    skyline_anno = run_step("skyline", skyline_annotations, sdrf_df=upload_sdrf_df)
+
+    st.subheader("Sample Annotations for Skyline")
+
+    # Display skyline_anno with data editor
+    skyline_anno = st.data_editor(skyline_anno, use_container_width=True)
+
+    # Download skyline_anno as csv
+    skyline_anno_csv = skyline_anno.to_csv(index=False, encoding="utf-8")
+
+    st.download_button(
+        label="Download Skyline Annotation",
+        data=skyline_anno_csv.encode("utf-8"),
+        file_name=skyline_anno_filename,
+        mime="text/csv; charset=utf-8",
+    )
+    if with_settings:
+        st.download_button(
+            label="Download Skyline Annotation Settings",
+            data=skyline_annotation_settings(annotation_values(skyline_anno)).encode("utf-8"),
+            file_name=settings_filename,
+            mime="application/xml",
+        )
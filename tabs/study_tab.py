@@ -0,0 +1,111 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from func.export_utils import build_download_name
+from func.pipeline import run_step
+from func.study import Study, chronos_batch_name, study_outputs
+from tabs.bundle_tab import study_bundle_download
+
+
+def _build_study(manifest, geometry, **settings):
+    outputs = study_outputs(Study.from_manifest(io.BytesIO(manifest), geometry), **settings)
+    # Plain values only, the step is kept in the disk cache
+    counts = outputs["sample_counts"]
+    return {
+        **outputs,
+        "n_plates": int(outputs["n_plates"]),
+        "n_injections": int(outputs["n_injections"]),
+        "sample_counts": {str(label): int(count) for label, count in counts.items()},
+    }
+
+
+# Multi-plate study, uses the settings of the Xcalibur, Chronos and SDRF tabs
+def study_tab(ms_info_output, sample_info_output, plate_geometry, xcalibur, chronos, sdrf):
+    st.header("Multi-plate study")
+    st.markdown(
+        "Upload a study manifest (CSV or TSV) with the columns `plate_id`, `sample_name` and optionally "
+        "`annotation` (one `Label;Position` entry per row, same syntax as the Plate Design tab). "
+        "All plates are combined into one Xcalibur order, one Chronos table per batch of 6 plates (EvoSlot 1–6) "
+        "and one SDRF, using the settings of the Xcalibur, Chronos and SDRF tabs (randomization included)."
+    )
+    manifest_upload = st.file_uploader("Upload study manifest", type=["csv", "tsv", "txt"])
+
+    if manifest_upload is None:
+        st.info("No study manifest uploaded.")
+        return
+    if xcalibur is None or chronos is None:
+        st.warning("Please fill in the Xcalibur and Chronos tabs first.")
+        return
+
+    # Only the settings are passed, not the single-plate tables
+    xcalibur_settings = {key: value for key, value in xcalibur.items() if key not in ("plate_df_long", "output_order_df", "output_order_df_rand", "permutation", "csv_data", "randomized")}
+    xcalibur_settings["randomize"] = xcalibur["randomized"]
+    chronos_settings = {key: chronos[key] for key in ("evosep_method", "xcalibur_sample_method", "evosep_output", "evosep_comment")}
+    try:
+        study = run_step(
+            "study",
+            _build_study,
+            manifest=manifest_upload.getvalue(),
+            geometry=plate_geometry,
+            ms_info=ms_info_output,
+            sample_info=sample_info_output,
+            xcalibur=xcalibur_settings,
+            chronos=chronos_settings,
+            ms_file=sdrf["ms_file"],
+            collision_energy=sdrf["collision_energy"],
+        )
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    for message in study["warnings"]:
+        st.warning(message)
+    st.markdown(
+        f"{study['n_plates']} plates ({plate_geometry.name}), {study['n_injections']} injections."
+    )
+    st.write(pd.Series(study["sample_counts"], name="count").rename_axis("Sample"))
+
+    study_name_parts = [
+        datetime.now().strftime("%Y%m%d%H%M"),
+        sample_info_output["proj_name"],
+        "Study",
+    ]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            label="⬇️ Xcalibur order",
+            data=study["csv"].encode("utf-8-sig"),
+            file_name=build_download_name(study_name_parts + ["Sample", "Order"], ".csv"),
+            mime="text/csv; charset=utf-8",
+        )
+    with col2:
+        n_batches = len(study["chronos_csvs"])
+        for i, chronos_csv in enumerate(study["chronos_csvs"]):
+            batch_name = chronos_batch_name(i, n_batches)
+            st.download_button(
+                label=" ".join(["⬇️ Chronos CSV"] + batch_name),
+                data=chronos_csv.encode("utf-8-sig"),
+                file_name=build_download_name(study_name_parts + ["Evosep", "Order"] + batch_name, ".csv"),
+                mime="text/csv; charset=utf-8",
+            )
+    with col3:
+        st.download_button(
+            label="⬇️ SDRF",
+            data=study["sdrf_tsv"].encode("utf-8"),
+            file_name=build_download_name(study_name_parts, ".sdrf.tsv"),
+            mime="text/tab-separated-values; charset=utf-8",
+        )
+
+    study_bundle_download(
+        manifest_upload.getvalue(),
+        plate_geometry,
+        ms_info_output,
+        sample_info_output,
+        xcalibur,
+        chronos,
+        sdrf,
+        study,
+    )